@@ -1,12 +1,33 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
-from models.database import init_db, db_config
-from routes import translations, databases, languages, tags, export
+from models.database import db_config, DATABASE_HEADER, UnknownDatabaseError
+from models.migrations import migrate_databases
+from models.log_archive import archive_databases
+from models.metrics import metrics
+from routes import translations, databases, languages, tags, export, stats, duplicates, metrics as metrics_routes
+
+DATABASE_PREFIX = '/api/db/'
+
+class DatabasePrefixMiddleware:
+    """将 /api/db/<数据库名>/... 转换为 /api/... 并通过请求头选择数据库"""
+    
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+    
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(DATABASE_PREFIX):
+            db_name, _, rest = path[len(DATABASE_PREFIX):].partition('/')
+            if db_name:
+                environ['PATH_INFO'] = '/api/' + rest
+                environ['HTTP_' + DATABASE_HEADER.upper().replace('-', '_')] = db_name
+        return self.wsgi_app(environ, start_response)
 
 def create_app():
     """创建Flask应用"""
     app = Flask(__name__)
     CORS(app)
+    app.wsgi_app = DatabasePrefixMiddleware(app.wsgi_app)
     
     # 注册蓝图
     app.register_blueprint(translations.translations_bp)
@@ -14,10 +35,28 @@ def create_app():
     app.register_blueprint(languages.languages_bp)
     app.register_blueprint(tags.tags_bp)
     app.register_blueprint(export.export_bp)
+    app.register_blueprint(stats.stats_bp)
+    app.register_blueprint(duplicates.duplicates_bp)
+    app.register_blueprint(metrics_routes.metrics_bp)
+    
+    # 记录每个接口的请求数、耗时与 SQL 执行情况
+    metrics.install(app)
+    
+    # 每个请求通过请求头或 URL 前缀选择数据库，未指定时使用当前数据库
+    app.before_request(db_config.select_request_database)
+    
+    @app.errorhandler(UnknownDatabaseError)
+    def unknown_database(e):
+        return jsonify({'success': False, 'error': str(e)}), 404
+    
+    # 请求结束时归还数据库连接
+    app.teardown_appcontext(db_config.connections.teardown)
+    
+    # 检查数据库结构版本，只对版本落后的数据库执行迁移
+    migrate_databases()
     
-    # 初始化数据库
-    with app.app_context():
-        init_db()
+    # 超过保留期限的操作日志移入归档文件
+    archive_databases()
     
     return app
 
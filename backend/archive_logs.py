@@ -0,0 +1,43 @@
+"""
+将超过保留期限的操作日志移入归档文件
+
+用法：
+    python archive_logs.py [databases/default.db ...] [--days 90]
+
+不指定数据库时处理数据库目录下的所有数据库。服务启动时也会自动执行一次，
+长期运行的服务可以通过定时任务调用本脚本。
+"""
+
+import argparse
+import os
+import sys
+
+from models.database import db_config
+from models.log_archive import LOG_RETENTION_DAYS, archive_databases, archive_expired_logs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='将超过保留期限的操作日志移入按月归档的 gzip 文件')
+    parser.add_argument('databases', nargs='*', help='数据库文件路径（默认处理所有数据库）')
+    parser.add_argument('--days', type=int, default=LOG_RETENTION_DAYS, help='日志在数据库中保留的天数')
+    args = parser.parse_args(argv)
+
+    if not args.databases:
+        for db_name, archived in archive_databases(args.days).items():
+            print(f'{db_name}: 归档 {archived} 条日志')
+        return 0
+
+    for db_path in args.databases:
+        if not os.path.exists(db_path):
+            print(f'数据库 {db_path} 不存在', file=sys.stderr)
+            return 1
+
+        with db_config.connections.connection(db_path) as conn:
+            archived = archive_expired_logs(conn, db_path, args.days)
+        print(f'{db_path}: 归档 {archived} 条日志')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
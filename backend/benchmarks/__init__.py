@@ -0,0 +1,10 @@
+"""
+性能基准测试
+
+生成指定规模的数据库，通过 Flask 测试客户端执行列表、搜索、导出、批量写入与标签等场景，
+输出各场景的耗时分位数、SQL 语句数量与内存峰值（JSON），并可与基线结果比较。
+
+用法（在 backend 目录下）：
+    python -m benchmarks --keys 100000 --languages 29 --output result.json
+    python -m benchmarks --keys 100000 --baseline baseline.json
+"""
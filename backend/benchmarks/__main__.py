@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from models.database import LANGUAGES, LAYOUT_LONG, LAYOUT_PER_LANGUAGE, db_config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='运行后端性能基准测试')
+    parser.add_argument('--keys', type=int, default=10000, help='英文条目数')
+    parser.add_argument('--languages', type=int, default=len(LANGUAGES), help='激活的语言数（含英文）')
+    parser.add_argument('--tags', type=int, default=10, help='标签数')
+    parser.add_argument('--fill-ratio', type=float, default=0.8, help='每个条目在每种语言上有翻译的概率')
+    parser.add_argument('--storage', choices=[LAYOUT_PER_LANGUAGE, LAYOUT_LONG], default=LAYOUT_PER_LANGUAGE,
+                        help='翻译存储布局')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子')
+    parser.add_argument('--iterations', type=int, default=20, help='每个场景的计时次数')
+    parser.add_argument('--heavy-iterations', type=int, default=3, help='导出等耗时场景的计时次数')
+    parser.add_argument('--warmup', type=int, default=2, help='每个场景计时前的预热次数')
+    parser.add_argument('--scenario', action='append', help='只运行指定场景（可重复）')
+    parser.add_argument('--db-dir', help='生成数据库的目录（默认使用临时目录）')
+    parser.add_argument('--output', help='结果 JSON 文件路径（默认输出到标准输出）')
+    parser.add_argument('--baseline', help='与之比较的基线结果 JSON 文件')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='p50 耗时或 SQL 数量增加超过该比例时视为回归，返回码为 1')
+    args = parser.parse_args(argv)
+
+    # 在导入应用（启动时会迁移数据库目录）之前切换到基准测试的数据库目录
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix='transflow-bench-')
+    os.makedirs(db_dir, exist_ok=True)
+    db_config.db_dir = db_dir
+    db_config.set_current_db('bench')
+
+    from .dataset import generate_database
+    from .runner import compare, run_benchmarks
+
+    db_path = os.path.join(db_dir, 'bench.db')
+    print(f'生成数据库 {db_path}：{args.keys} 条 × {args.languages} 种语言 ...', file=sys.stderr)
+    start = time.perf_counter()
+    active = generate_database(
+        db_path, args.keys, args.languages, args.tags, args.fill_ratio,
+        LAYOUT_LONG if args.storage == LAYOUT_LONG else None, args.seed
+    )
+    generate_seconds = time.perf_counter() - start
+
+    from app import app
+
+    dataset = {
+        'keys': args.keys,
+        'tags': args.tags,
+        'fill_ratio': args.fill_ratio,
+        'storage': args.storage,
+        'seed': args.seed,
+        'generate_seconds': round(generate_seconds, 2),
+        'active_languages': active,
+    }
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        results = run_benchmarks(
+            app, 'bench.db', dataset, args.iterations, args.heavy_iterations, args.warmup,
+            args.scenario, args.seed
+        )
+    finally:
+        sys.stdout = stdout
+        if not args.db_dir:
+            db_config.connections.close_all()
+            shutil.rmtree(db_dir, ignore_errors=True)
+    # ru_maxrss 在 Linux 上的单位为 KB
+    results['meta']['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows, regressed = compare(results, baseline, args.max_regression)
+
+    print(f"\n{'场景':<24}{'p50(ms)':>10}{'基线':>10}{'比例':>8}{'SQL':>8}{'基线':>8}", file=sys.stderr)
+    for name, after, before, ratio, queries, base_queries, flag in rows:
+        print(
+            f"{name:<24}{after:>10.2f}{before if before is not None else '-':>10}"
+            f"{f'{ratio:.2f}' if ratio is not None else '-':>8}{queries:>8}"
+            f"{base_queries if base_queries is not None else '-':>8}  {flag}",
+            file=sys.stderr
+        )
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
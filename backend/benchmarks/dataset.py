@@ -0,0 +1,79 @@
+"""
+生成基准测试用的数据库
+
+数据库通过 init_db 创建，条目、标签与翻译按参数批量写入（写入时触发器照常维护
+搜索索引、标签计数与统计表，翻译记忆索引与接口的写操作一样在每批提交前更新），
+相同参数与随机种子生成的数据完全一致。
+"""
+
+import os
+import random
+
+from models.database import LANGUAGES, db_config, init_db, set_language_activation_status
+from models.storage import get_storage
+from models.tags import resolve_tag_ids
+from models.translation_memory import flush_translation_memory
+
+# 生成英文文本使用的词表，搜索场景从中取词
+WORDS = [
+    'account', 'action', 'address', 'alert', 'archive', 'button', 'cancel', 'cart', 'change',
+    'checkout', 'close', 'comment', 'confirm', 'connect', 'copy', 'create', 'dashboard', 'delete',
+    'download', 'draft', 'edit', 'email', 'error', 'export', 'filter', 'folder', 'history', 'import',
+    'invoice', 'language', 'loading', 'login', 'logout', 'message', 'notification', 'order', 'password',
+    'payment', 'profile', 'project', 'refresh', 'report', 'retry', 'save', 'search', 'settings',
+    'share', 'status', 'submit', 'success', 'team', 'update', 'upload', 'user', 'warning', 'window'
+]
+
+# 每批写入的条目数
+GENERATE_BATCH_SIZE = 10000
+
+
+def english_text(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6)))
+
+
+def generate_database(db_path, keys=10000, languages=len(LANGUAGES), tags=10, fill_ratio=0.8,
+                      layout=None, seed=1):
+    """生成基准测试数据库
+
+    keys 为英文条目数，languages 为激活的语言数（含英文，按 LANGUAGES 顺序取前若干个），
+    tags 为标签数，fill_ratio 为每个条目在每种语言上有翻译的概率。返回激活的语言列表。
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    init_db(db_path, layout)
+
+    rng = random.Random(seed)
+    active = LANGUAGES[:max(1, min(languages, len(LANGUAGES)))]
+    storage = get_storage(db_path)
+
+    with db_config.connections.connection(db_path) as conn:
+        cursor = conn.cursor()
+        tag_ids = list(resolve_tag_ids(cursor, [f'tag_{i}' for i in range(tags)]).values())
+
+        for start in range(0, keys, GENERATE_BATCH_SIZE):
+            count = min(GENERATE_BATCH_SIZE, keys - start)
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM english')
+            first_id = cursor.fetchone()[0] + 1
+
+            texts = [english_text(rng) for _ in range(count)]
+            cursor.executemany('''
+                INSERT INTO english (english_text, translation_key, tag_id) VALUES (?, ?, ?)
+            ''', [
+                (text, f'key.{start + i}', rng.choice(tag_ids) if tag_ids else None)
+                for i, text in enumerate(texts)
+            ])
+
+            for lang in active[1:]:
+                storage.upsert_texts(cursor, lang, {
+                    first_id + i: f'[{lang}] {text}'
+                    for i, text in enumerate(texts)
+                    if rng.random() < fill_ratio
+                })
+            flush_translation_memory(cursor)
+            conn.commit()
+
+    for lang in LANGUAGES[len(active):]:
+        set_language_activation_status(db_path, lang, False)
+
+    return active
@@ -0,0 +1,225 @@
+"""
+基准测试场景与执行
+
+每个场景通过 Flask 测试客户端发出请求，记录每次请求的耗时、SQL 语句数量，
+并额外执行一次统计 Python 内存分配峰值（tracemalloc 会拖慢执行，不计入耗时）。
+"""
+
+import platform
+import random
+import sqlite3
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from models.database import DATABASE_HEADER, LANGUAGES, db_config
+from models.export_cache import export_cache
+
+from .dataset import WORDS, english_text
+
+
+class QueryCounter:
+    """统计当前线程执行的 SQL 语句数量（包括触发器与全文索引内部执行的语句）"""
+
+    def __init__(self):
+        self.count = 0
+        self.thread_id = threading.get_ident()
+
+    def install(self, conn, db_path):
+        conn.set_trace_callback(self._trace)
+
+    def _trace(self, statement):
+        # 后台线程（如操作日志写入）的语句不计入请求
+        if threading.get_ident() == self.thread_id:
+            self.count += 1
+
+
+class Scenario:
+    def __init__(self, name, request, setup=None, heavy=False):
+        # request(client, rng) 发出一次（或一组）请求，返回响应列表
+        self.name = name
+        self.request = request
+        # setup() 在每次计时前执行，不计入耗时
+        self.setup = setup
+        # 耗时较长的场景（如全量导出）使用较少的执行次数
+        self.heavy = heavy
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build_scenarios(languages, keys, tags):
+    """根据数据集参数构建场景列表"""
+    translated = languages[1] if len(languages) > 1 else 'english'
+    middle_page = max(1, keys // 50 // 2)
+
+    def get(url):
+        return lambda client, rng: [client.get(url)]
+
+    def search(client, rng):
+        return [client.get(f'/api/search?q={rng.choice(WORDS)}&limit=50')]
+
+    def suggest(client, rng):
+        return [client.get('/api/translations/suggest', query_string={'q': english_text(rng)})]
+
+    def batch_update(client, rng):
+        entries = [
+            {'english_id': rng.randint(1, keys), 'translations': {translated: f'updated {rng.random()}'}}
+            for _ in range(100)
+        ]
+        return [client.put('/api/translations/batch', json={'entries': entries})]
+
+    def bulk_import(client, rng):
+        entries = [
+            {'key': f'bench.{rng.getrandbits(48)}', 'english': f'imported {rng.choice(WORDS)}',
+             'tag': 'tag_0', 'translations': {translated: 'imported'}}
+            for _ in range(100)
+        ]
+        return [client.post('/api/translations/import', json={'entries': entries})]
+
+    def single_write(client, rng):
+        return [client.post('/api/translations', json={
+            'english': f'single {rng.choice(WORDS)}',
+            'translations': {translated: 'single'}
+        })]
+
+    def tag_create_delete(client, rng):
+        name = f'bench_{rng.getrandbits(32)}'
+        return [client.post('/api/tags', json={'name': name}), client.delete(f'/api/tags/{name}')]
+
+    scenarios = [
+        Scenario('list_first_page', get('/api/translations?page=1&limit=50')),
+        Scenario('list_middle_page', get(f'/api/translations?page={middle_page}&limit=50')),
+        Scenario('list_language', get(f'/api/translations?language={translated}&limit=50')),
+        Scenario('search', search),
+        Scenario('suggest', suggest),
+        Scenario('export_language', get(f'/api/export/{translated}'), setup=export_cache.clear, heavy=True),
+        Scenario('export_language_cached', get(f'/api/export/{translated}')),
+        Scenario('export_all', get('/api/export'), setup=export_cache.clear, heavy=True),
+        Scenario('batch_update', batch_update),
+        Scenario('bulk_import', bulk_import),
+        Scenario('single_write', single_write),
+        Scenario('tags_list', get('/api/tags?with_counts=1')),
+        Scenario('stats', get('/api/stats')),
+    ]
+    if tags:
+        scenarios += [
+            Scenario('list_tag', get('/api/translations?tag=tag_0&limit=50')),
+            Scenario('tag_info', get('/api/tags/tag_0/info')),
+            Scenario('tag_create_delete', tag_create_delete),
+        ]
+    return scenarios
+
+
+def run_scenario(client, scenario, counter, iterations, warmup, seed):
+    rng = random.Random(seed)
+    timings = []
+    queries = []
+
+    for i in range(warmup + iterations):
+        if scenario.setup:
+            scenario.setup()
+        counter.count = 0
+        start = time.perf_counter()
+        responses = scenario.request(client, rng)
+        elapsed = time.perf_counter() - start
+
+        for response in responses:
+            if response.status_code >= 400:
+                raise RuntimeError(f'{scenario.name}: {response.status_code} {response.get_data(as_text=True)[:200]}')
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(counter.count)
+
+    # 单独执行一次统计内存峰值
+    if scenario.setup:
+        scenario.setup()
+    tracemalloc.start()
+    scenario.request(client, rng)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'latency_ms': {
+            'min': round(min(timings), 3),
+            'mean': round(sum(timings) / len(timings), 3),
+            'p50': round(percentile(timings, 0.5), 3),
+            'p90': round(percentile(timings, 0.9), 3),
+            'p99': round(percentile(timings, 0.99), 3),
+            'max': round(max(timings), 3),
+        },
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 1),
+            'max': max(queries),
+        },
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(app, db_name, dataset, iterations=20, heavy_iterations=3, warmup=2, only=None, seed=1):
+    """执行全部（或 only 指定的）场景，返回可序列化为 JSON 的结果"""
+    counter = QueryCounter()
+    # 已打开的连接没有安装跟踪，关闭后由新连接安装
+    db_config.connections.close_all()
+    db_config.connections.open_hooks.append(counter.install)
+
+    client = app.test_client()
+    client.environ_base['HTTP_' + DATABASE_HEADER.upper().replace('-', '_')] = db_name
+
+    results = {}
+    try:
+        for scenario in build_scenarios(dataset['active_languages'], dataset['keys'], dataset['tags']):
+            if only and scenario.name not in only:
+                continue
+            count = heavy_iterations if scenario.heavy else iterations
+            results[scenario.name] = run_scenario(client, scenario, counter, count, warmup, seed)
+            print(f"  {scenario.name}: p50 {results[scenario.name]['latency_ms']['p50']} ms, "
+                  f"{results[scenario.name]['queries']['mean']} 条 SQL")
+    finally:
+        db_config.connections.open_hooks.remove(counter.install)
+
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'dataset': {key: value for key, value in dataset.items() if key != 'active_languages'},
+            'languages': len(dataset['active_languages']),
+            'all_languages': len(LANGUAGES),
+        },
+        'scenarios': results,
+    }
+
+
+def compare(results, baseline, max_regression=0.2):
+    """与基线结果比较，返回 (比较行列表, 是否有回归)
+
+    p50 耗时或平均 SQL 数量增加超过 max_regression（比例）时视为回归。
+    """
+    rows = []
+    regressed = False
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            rows.append((name, current['latency_ms']['p50'], None, None, current['queries']['mean'], None, ''))
+            continue
+
+        before = previous['latency_ms']['p50']
+        after = current['latency_ms']['p50']
+        ratio = after / before if before else None
+        worse = (ratio is not None and ratio > 1 + max_regression) or \
+            current['queries']['mean'] > previous['queries']['mean'] * (1 + max_regression)
+        regressed = regressed or worse
+        rows.append((
+            name, after, before, ratio, current['queries']['mean'], previous['queries']['mean'],
+            '回归' if worse else ''
+        ))
+    return rows, regressed
@@ -0,0 +1,48 @@
+"""
+将数据库中各激活语言的翻译导出为独立的 JSON 文件（{key: 翻译内容}）
+
+用法：
+    python export_languages.py databases/default.db --out exports/default [--language french ...]
+
+导出过程流式写入文件，内存占用与条目数量无关；不指定语言时导出所有激活的语言。
+"""
+
+import argparse
+import os
+import sys
+
+from models.database import db_config, active_languages
+from models.export_engine import export_to_directory
+from models.storage import get_storage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='将各语言的翻译导出为独立的 JSON 文件')
+    parser.add_argument('database', help='数据库文件路径')
+    parser.add_argument('--out', required=True, help='导出目录（每种语言一个 <语言>.json 文件）')
+    parser.add_argument('--language', action='append', help='只导出指定语言（可重复，默认导出所有激活的语言）')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        print(f'数据库 {args.database} 不存在', file=sys.stderr)
+        return 1
+
+    languages = active_languages(args.database)
+    if args.language:
+        inactive = [lang for lang in args.language if lang not in languages]
+        if inactive:
+            print(f"不支持或未激活的语言: {', '.join(inactive)}", file=sys.stderr)
+            return 1
+        languages = [lang for lang in languages if lang in args.language]
+
+    with db_config.connections.connection(args.database) as conn:
+        paths = export_to_directory(conn, get_storage(args.database), languages, args.out)
+
+    for lang, path in paths.items():
+        print(f'{lang}: {path}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+检测英文内容重复与近似重复的条目，报告保存在数据库中，可通过 /api/duplicates 查看
+
+用法：
+    python find_duplicates.py [databases/default.db ...] [--threshold 0.8]
+
+不指定数据库时处理数据库目录下的所有数据库。/api/duplicates/scan 也在后台启动本脚本；
+同一数据库已有检测在进行时跳过该数据库。
+"""
+
+import argparse
+import os
+import sys
+
+from models.database import db_config, add_operation_log
+from models.duplicates import DEFAULT_THRESHOLD, ScanInProgressError, scan_database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='检测英文内容完全重复与近似重复的条目')
+    parser.add_argument('databases', nargs='*', help='数据库文件路径（默认处理所有数据库）')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='近似重复的最低相似度（trigram 集合的 Jaccard 系数）')
+    # 由 /api/duplicates/scan 启动时，接口已标记检测开始
+    parser.add_argument('--started', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    db_paths = args.databases or [
+        os.path.join(db_config.db_dir, db_name) for db_name in db_config.get_available_databases()
+    ]
+
+    code = 0
+    for db_path in db_paths:
+        if not os.path.exists(db_path):
+            print(f'数据库 {db_path} 不存在', file=sys.stderr)
+            return 1
+
+        try:
+            with db_config.connections.connection(db_path) as conn:
+                report = scan_database(conn, args.threshold, args.started)
+        except ScanInProgressError as e:
+            print(f'{db_path}: {e}', file=sys.stderr)
+            code = 1
+            continue
+
+        # 记录操作日志（进程退出时写入）
+        add_operation_log(db_path, '重复检测', report['redundant_entries'],
+                          f"完全重复 {report['exact_clusters']} 组，近似重复 {report['near_clusters']} 组")
+
+        print(f"{db_path}: {report['entries']} 条，完全重复 {report['exact_clusters']} 组，"
+              f"近似重复 {report['near_clusters']} 组，可合并 {report['redundant_entries']} 条，"
+              f"耗时 {report['seconds']} 秒")
+
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+将数据库迁移为单表存储布局
+
+用法：
+    python migrate_storage.py databases/default.db [--batch-size 5000]
+
+迁移可以在服务运行期间进行：数据分批复制，迁移期间的写入通过触发器同步，
+最后在一个短事务中切换布局。
+"""
+
+import argparse
+import os
+import sys
+
+from models.storage import MIGRATION_BATCH_SIZE, migrate_to_long_format
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='将每语言一张表的数据库迁移为单表存储布局')
+    parser.add_argument('databases', nargs='+', help='数据库文件路径')
+    parser.add_argument('--batch-size', type=int, default=MIGRATION_BATCH_SIZE, help='每批复制的行数')
+    args = parser.parse_args(argv)
+
+    def progress(language, last_id):
+        print(f'  {language}: 已复制到 id {last_id}')
+
+    for db_path in args.databases:
+        if not os.path.exists(db_path):
+            print(f'数据库 {db_path} 不存在', file=sys.stderr)
+            return 1
+
+        print(f'迁移 {db_path} ...')
+        if migrate_to_long_format(db_path, args.batch_size, progress):
+            print(f'{db_path} 已迁移为单表布局')
+        else:
+            print(f'{db_path} 已是单表布局，跳过')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,2 +1,2 @@
 # Models package
-from .database import init_db, db_config, DatabaseConfig, LANGUAGES
+from .database import init_db, db_config, DatabaseConfig, LANGUAGES, active_languages
@@ -0,0 +1,143 @@
+"""
+批量修改与批量删除
+
+多个条目的修改或删除在一个事务中用集合操作完成，并返回逐条结果。
+"""
+
+from .page_loader import MAX_BATCH_SIZE
+from .tags import resolve_tag_ids
+
+
+def _chunks(items, size=MAX_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _is_id(value):
+    # bool 是 int 的子类，true / false 不能作为 id
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def existing_english_ids(cursor, english_ids):
+    """返回实际存在的英文条目 id 集合"""
+    found = set()
+    for batch in _chunks(list(english_ids)):
+        placeholders = ','.join('?' * len(batch))
+        cursor.execute(f'SELECT id FROM english WHERE id IN ({placeholders})', batch)
+        found.update(row[0] for row in cursor.fetchall())
+    return found
+
+
+def batch_update(cursor, storage, entries, languages):
+    """批量修改条目，调用方负责提交事务
+
+    每个条目包含 english_id 以及可选的 english、key、tag、translations，
+    只修改提供了的字段。返回 (逐条结果, 成功修改的条目数)。
+    """
+    results = []
+    valid = {}
+
+    for entry in entries:
+        english_id = entry.get('english_id') if isinstance(entry, dict) else None
+        if not _is_id(english_id):
+            results.append({'english_id': english_id, 'success': False, 'error': 'english_id 无效'})
+            continue
+
+        if english_id in valid:
+            results.append({'english_id': english_id, 'success': False, 'error': 'english_id 重复'})
+            continue
+
+        if 'english' in entry and not entry['english']:
+            results.append({'english_id': english_id, 'success': False, 'error': '英文内容不能为空'})
+            continue
+
+        translations = entry.get('translations') or {}
+        if not isinstance(translations, dict):
+            results.append({'english_id': english_id, 'success': False, 'error': 'translations 必须是对象'})
+            continue
+
+        invalid = [lang for lang in translations if lang not in languages or lang == 'english']
+        if invalid:
+            results.append({
+                'english_id': english_id, 'success': False,
+                'error': f"不支持或未激活的语言: {', '.join(invalid)}"
+            })
+            continue
+
+        values = [entry.get('english'), entry.get('key'), entry.get('tag')] + list(translations.values())
+        if any(value is not None and not isinstance(value, str) for value in values):
+            results.append({'english_id': english_id, 'success': False, 'error': '翻译内容必须是字符串'})
+            continue
+
+        valid[english_id] = entry
+        results.append({'english_id': english_id, 'success': True})
+
+    existing = existing_english_ids(cursor, valid)
+    for result in results:
+        if result['success'] and result['english_id'] not in existing:
+            result['success'] = False
+            result['error'] = '翻译不存在'
+            valid.pop(result['english_id'], None)
+
+    tag_ids = resolve_tag_ids(cursor, [entry.get('tag') for entry in valid.values()])
+
+    # 未提供的字段保持原值（key、tag 可显式置空）
+    cursor.executemany('''
+        UPDATE english
+        SET english_text = COALESCE(?, english_text),
+            translation_key = CASE WHEN ? THEN ? ELSE translation_key END,
+            tag_id = CASE WHEN ? THEN ? ELSE tag_id END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', [
+        (
+            entry.get('english'),
+            'key' in entry, entry.get('key'),
+            'tag' in entry, tag_ids.get(entry.get('tag')),
+            english_id
+        )
+        for english_id, entry in valid.items()
+    ])
+
+    for lang in languages:
+        if lang == 'english':
+            continue
+        values = {
+            english_id: entry['translations'][lang]
+            for english_id, entry in valid.items()
+            if lang in (entry.get('translations') or {})
+        }
+        if values:
+            storage.upsert_texts(cursor, lang, values)
+
+    # 与单条修改一致：各语言翻译中的 key 跟随英文条目的 key
+    storage.sync_keys(cursor, languages, [
+        english_id for english_id, entry in valid.items()
+        if 'key' in entry or entry.get('translations')
+    ])
+
+    return results, len(valid)
+
+
+def batch_delete(cursor, english_ids):
+    """批量删除条目（级联删除各语言翻译），调用方负责提交事务
+
+    返回 (逐条结果, 删除的条目数)。
+    """
+    ids = [english_id for english_id in english_ids if _is_id(english_id)]
+    existing = existing_english_ids(cursor, ids)
+
+    for batch in _chunks(sorted(existing)):
+        placeholders = ','.join('?' * len(batch))
+        cursor.execute(f'DELETE FROM english WHERE id IN ({placeholders})', batch)
+
+    results = []
+    for english_id in english_ids:
+        if not _is_id(english_id):
+            results.append({'english_id': english_id, 'success': False, 'error': 'english_id 无效'})
+        elif english_id in existing:
+            results.append({'english_id': english_id, 'success': True})
+        else:
+            results.append({'english_id': english_id, 'success': False, 'error': '翻译不存在'})
+
+    return results, len(existing)
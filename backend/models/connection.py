@@ -0,0 +1,157 @@
+"""
+SQLite 连接管理
+
+为每个数据库文件维护一个连接池。连接在打开时统一设置 PRAGMA，
+请求内通过 get() 获取的连接在 Flask 请求结束时自动归还连接池。
+
+同一进程可以同时服务多个数据库：连接池按最近使用顺序保存，最多保留 max_databases 个
+数据库的空闲连接，超过数量或空闲超过 idle_timeout 秒的数据库的空闲连接会被关闭。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+
+from .metrics import InstrumentedConnection, metrics
+
+# 连接打开时执行一次的 PRAGMA 设置
+CONNECTION_PRAGMAS = (
+    ('journal_mode', 'WAL'),        # 写操作不再阻塞读操作
+    ('synchronous', 'NORMAL'),      # WAL 模式下兼顾安全与性能
+    ('foreign_keys', 'ON'),         # 启用 ON DELETE CASCADE
+    ('cache_size', -16000),         # 页缓存约 16MB
+    ('mmap_size', 268435456),       # 内存映射 256MB
+    ('busy_timeout', 5000),         # 锁等待 5 秒
+    ('temp_store', 'MEMORY'),
+)
+
+
+class ConnectionManager:
+    def __init__(self, max_idle=8, pragmas=CONNECTION_PRAGMAS, max_databases=32, idle_timeout=300):
+        self.max_idle = max_idle
+        self.pragmas = pragmas
+        self.max_databases = max_databases
+        self.idle_timeout = idle_timeout
+        # {数据库路径: (空闲连接列表, 最近使用时间)}，按最近使用顺序排列
+        self._pools = OrderedDict()
+        self._lock = threading.Lock()
+        # 新连接打开后依次调用的函数 hook(conn, db_path)，用于统计、跟踪 SQL 等
+        self.open_hooks = [metrics.connection_opened]
+
+    @staticmethod
+    def _key(db_path):
+        return os.path.abspath(db_path)
+
+    def _open(self, db_path):
+        """打开新连接并设置 PRAGMA"""
+        # 连接在线程间复用（同一时刻只被一个请求持有）
+        conn = sqlite3.connect(db_path, check_same_thread=False, factory=InstrumentedConnection)
+        for name, value in self.pragmas:
+            conn.execute(f'PRAGMA {name} = {value}')
+        for hook in self.open_hooks:
+            hook(conn, db_path)
+        return conn
+
+    def acquire(self, db_path):
+        """从连接池获取连接，连接池为空时新建"""
+        key = self._key(db_path)
+        with self._lock:
+            entry = self._pools.get(key)
+            if entry and entry[0]:
+                self._pools.move_to_end(key)
+                return entry[0].pop()
+        return self._open(key)
+
+    def release(self, db_path, conn):
+        """归还连接，未提交的事务会被回滚"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+
+        key = self._key(db_path)
+        with self._lock:
+            pool = self._pools.pop(key, ([], 0))[0]
+            keep = len(pool) < self.max_idle
+            if keep:
+                pool.append(conn)
+            self._pools[key] = (pool, time.monotonic())
+            evicted = self._evict_locked()
+        if not keep:
+            evicted.append(conn)
+        for idle in evicted:
+            idle.close()
+
+    def _evict_locked(self):
+        """移除最久未使用的数据库（超出数量或空闲超时）的连接池，返回需要关闭的连接"""
+        evicted = []
+        deadline = time.monotonic() - self.idle_timeout
+        while self._pools:
+            key, (pool, last_used) = next(iter(self._pools.items()))
+            if len(self._pools) <= self.max_databases and last_used >= deadline:
+                break
+            del self._pools[key]
+            evicted.extend(pool)
+        return evicted
+
+    def get(self, db_path):
+        """获取当前请求使用的连接，同一请求内对同一数据库复用同一连接"""
+        if not has_app_context():
+            raise RuntimeError('get() 只能在 Flask 应用上下文中使用，请改用 connection()')
+
+        connections = g.setdefault('_db_connections', {})
+        key = self._key(db_path)
+        conn = connections.get(key)
+        if conn is None:
+            conn = self.acquire(key)
+            connections[key] = conn
+        return conn
+
+    @contextmanager
+    def connection(self, db_path):
+        """获取连接的上下文管理器
+
+        在 Flask 应用上下文中返回请求级连接（由 teardown 统一归还），
+        否则从连接池借出并在退出时归还。
+        """
+        if has_app_context():
+            yield self.get(db_path)
+            return
+
+        conn = self.acquire(db_path)
+        try:
+            yield conn
+        finally:
+            self.release(db_path, conn)
+
+    def teardown(self, exc=None):
+        """Flask 请求结束时归还本请求使用的所有连接"""
+        connections = g.pop('_db_connections', None)
+        if not connections:
+            return
+        for key, conn in connections.items():
+            self.release(key, conn)
+
+    def invalidate(self, db_path):
+        """关闭指定数据库的空闲连接（例如数据库文件被删除或替换后）"""
+        key = self._key(db_path)
+        with self._lock:
+            pool = self._pools.pop(key, ([], 0))[0]
+        for conn in pool:
+            conn.close()
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            pools = [pool for pool, last_used in self._pools.values()]
+            self._pools.clear()
+        for pool in pools:
+            for conn in pool:
+                conn.close()
@@ -0,0 +1,54 @@
+"""
+翻译条目数量缓存
+
+按数据库和标签缓存英文条目总数，避免每次分页请求都执行 COUNT(*)。
+缓存的数量对应读取时的数据版本（data_version），版本变化（包括其他进程的写操作）时重新统计；
+本进程的写操作也可以调用 invalidate_translation_counts 立即失效。
+"""
+
+import os
+import threading
+
+from .database import get_data_version
+from .metrics import metrics
+
+# {数据库绝对路径: (数据版本, {标签（None 表示全部）: 数量})}
+_count_cache = {}
+_count_lock = threading.Lock()
+
+
+def count_translations(cursor, db_path, tag=None):
+    """获取条目数量（可按标签筛选），优先使用缓存"""
+    key = os.path.abspath(db_path)
+    version = get_data_version(cursor)
+    with _count_lock:
+        cached = _count_cache.get(key)
+        count = cached[1].get(tag) if cached is not None and cached[0] == version else None
+    metrics.record_cache('translation_counts', count is not None)
+    if count is not None:
+        return count
+
+    if tag is None:
+        cursor.execute('SELECT COUNT(*) FROM english')
+    else:
+        # 标签的条目数量由触发器维护在 tags.entry_count 中
+        cursor.execute('SELECT entry_count FROM tags WHERE name = ?', (tag,))
+    row = cursor.fetchone()
+    count = row[0] if row else 0
+
+    # 数量在读取版本之后统计，期间有写操作时只会比版本新，下次读取发现版本变化会重新统计
+    with _count_lock:
+        cached = _count_cache.get(key)
+        if cached is None or cached[0] != version:
+            cached = _count_cache[key] = (version, {})
+        cached[1][tag] = count
+    return count
+
+
+def invalidate_translation_counts(db_path=None):
+    """使数量缓存失效，db_path 为空时清空全部缓存"""
+    with _count_lock:
+        if db_path is None:
+            _count_cache.clear()
+        else:
+            _count_cache.pop(os.path.abspath(db_path), None)
@@ -1,52 +1,172 @@
 import sqlite3
 import os
 import glob
+import threading
 from datetime import datetime
+from flask import g, has_request_context, request
+from .connection import ConnectionManager
+from .metrics import metrics
+from .oplog import OperationLogWriter, register_shutdown_flush
+from .language_registry import LANGUAGES
+from .row_cache import invalidate_row_fragments
 
-# 支持的语言列表
-LANGUAGES = [
-    'english', 'chinese', 'thai', 'czech', 'slovak', 'italian', 'polish', 
-    'latin', 'dutch', 'portuguese', 'greek', 'balkan', 'bulgarian', 'turkish', 
-    'french', 'german', 'ukrainian', 'russian', 'south_african', 'arabic', 
-    'norwegian', 'finnish', 'macedonian', 'estonian', 'slovenian', 'indonesian', 'swedish',
-    'japanese', 'korean'
-]
+# 翻译存储布局：每种语言一张表（默认），或所有语言存放在 translations 单表中
+LAYOUT_PER_LANGUAGE = 'per_language'
+LAYOUT_LONG = 'long'
+
+# 按请求选择数据库：请求头，或 URL 前缀 /api/db/<数据库名>/...（由 app 中的中间件转换为该请求头）
+DATABASE_HEADER = 'X-Transflow-Database'
+
+class UnknownDatabaseError(LookupError):
+    """请求选择的数据库不存在"""
+
+# 数据库目录中记录当前数据库名称的文件（所有工作进程共享，切换数据库时写入）
+CURRENT_DB_FILE = '.current_db'
 
 class DatabaseConfig:
     def __init__(self, db_dir='databases', default_db='default.db'):
         self.db_dir = db_dir
+        self.default_db = default_db
+        # 最近一次解析出的当前数据库路径
         self.current_db = os.path.join(db_dir, default_db)
+        # 上次读取的当前数据库文件的 (修改时间, 大小) 与其中的数据库名称，文件未变化时不重新读取
+        self._current_file_state = None
+        self._current_file_name = None
+        # 已知存在的数据库名称，只在遇到未知名称或列出数据库时扫描目录
+        self._known_databases = None
+        self._lock = threading.Lock()
+        # 数据库连接池
+        self.connections = ConnectionManager()
+    
+    def _current_db_file(self):
+        return os.path.join(self.db_dir, CURRENT_DB_FILE)
+    
+    def _read_current_db(self):
+        """读取共享的当前数据库路径，没有记录时使用默认数据库"""
+        try:
+            stat = os.stat(self._current_db_file())
+        except FileNotFoundError:
+            return os.path.join(self.db_dir, self.default_db)
+        
+        state = (stat.st_mtime_ns, stat.st_size)
+        if state != self._current_file_state:
+            with open(self._current_db_file(), encoding='utf-8') as f:
+                self._current_file_name = f.read().strip() or self.default_db
+            self._current_file_state = state
+        return os.path.join(self.db_dir, self._current_file_name)
     
     def get_current_db(self):
-        # 检查当前数据库是否存在，如果不存在则尝试切换到其他可用数据库
-        if not os.path.exists(self.current_db):
-            available_dbs = self.get_available_databases()
+        """获取本次请求使用的数据库路径
+
+        请求指定了数据库时使用该数据库（由 select_request_database 解析），
+        否则使用数据库目录中记录的当前数据库（由所有工作进程共享）。
+        数据库文件不存在时（例如已被删除）改用其他可用数据库，不会连接并重新创建空文件。
+        """
+        if has_request_context() and g.get('_db_path'):
+            return g._db_path
+        
+        db_path = self._read_current_db()
+        if os.path.exists(db_path):
+            self.current_db = db_path
+            return db_path
+        
+        with self._lock:
+            # 当前数据库不存在时尝试切换到其他可用数据库
+            available_dbs = sorted(self.get_available_databases())
             if available_dbs:
-                # 切换到第一个可用的数据库
-                self.current_db = os.path.join(self.db_dir, available_dbs[0])
+                # 使用第一个可用的数据库
+                db_path = os.path.join(self.db_dir, available_dbs[0])
             else:
                 # 如果没有可用数据库，创建默认数据库并初始化
-                self.current_db = os.path.join(self.db_dir, 'default.db')
-                if not os.path.exists(self.db_dir):
-                    os.makedirs(self.db_dir)
-                # 初始化新创建的数据库
-                init_db(self.current_db)
+                db_path = os.path.join(self.db_dir, self.default_db)
+                if not os.path.exists(db_path):
+                    if not os.path.exists(self.db_dir):
+                        os.makedirs(self.db_dir)
+                    # 初始化新创建的数据库
+                    init_db(db_path)
+                    self._add_known(os.path.basename(db_path))
+            self.current_db = db_path
         
-        return self.current_db
+        return db_path
+    
+    def connect(self, db_path=None):
+        """获取当前请求的数据库连接（请求结束时自动归还连接池）"""
+        if db_path is None:
+            db_path = self.get_current_db()
+        return self.connections.get(db_path)
     
     def set_current_db(self, db_name):
+        """切换当前数据库（写入数据库目录，对所有工作进程生效）"""
         if not db_name.endswith('.db'):
             db_name += '.db'
+        
+        if not os.path.exists(self.db_dir):
+            os.makedirs(self.db_dir)
+        
+        # 先写入临时文件再替换，其他进程不会读到写了一半的内容
+        path = self._current_db_file()
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(db_name)
+        os.replace(temp_path, path)
+        
         self.current_db = os.path.join(self.db_dir, db_name)
         return self.current_db
     
+    def resolve_database(self, db_name):
+        """将数据库名称解析为路径，数据库不存在时抛出 UnknownDatabaseError
+
+        每次都确认文件存在（可能已被其他进程删除，连接不存在的文件会创建空数据库）；
+        首次遇到的数据库（例如启动后复制进来的）先升级结构。
+        """
+        if not db_name.endswith('.db'):
+            db_name += '.db'
+        if not db_name.replace('_', '').replace('.', '').isalnum():
+            raise UnknownDatabaseError(f'数据库 {db_name} 不存在')
+        
+        db_path = os.path.join(self.db_dir, db_name)
+        if not os.path.exists(db_path):
+            self._discard_known(db_name)
+            raise UnknownDatabaseError(f'数据库 {db_name} 不存在')
+        
+        known = self._known_databases
+        if known is not None and db_name in known:
+            return db_path
+        
+        if db_name not in self.get_available_databases():
+            raise UnknownDatabaseError(f'数据库 {db_name} 不存在')
+        
+        from .migrations import migrate_database
+        migrate_database(db_path)
+        return db_path
+    
+    def select_request_database(self):
+        """根据请求头选择本次请求使用的数据库（在 before_request 中调用）"""
+        db_name = request.headers.get(DATABASE_HEADER)
+        if db_name:
+            g._db_path = self.resolve_database(db_name)
+    
+    def request_selects_database(self):
+        """本次请求是否指定了数据库"""
+        return has_request_context() and bool(g.get('_db_path'))
+    
+    def _add_known(self, db_name):
+        if self._known_databases is not None:
+            self._known_databases = self._known_databases | {db_name}
+    
+    def _discard_known(self, db_name):
+        if self._known_databases is not None:
+            self._known_databases = self._known_databases - {db_name}
+    
     def get_available_databases(self):
         """获取所有可用的数据库文件"""
         if not os.path.exists(self.db_dir):
             os.makedirs(self.db_dir)
         
         db_files = glob.glob(os.path.join(self.db_dir, '*.db'))
-        return [os.path.basename(db) for db in db_files]
+        databases = [os.path.basename(db) for db in db_files]
+        self._known_databases = frozenset(databases)
+        return databases
     
     def create_database(self, db_name):
         """创建新数据库"""
@@ -66,83 +186,142 @@ class DatabaseConfig:
         try:
             conn = sqlite3.connect(db_path)
             conn.close()
+            self._add_known(db_name)
             return True, db_path
         except Exception as e:
             return False, str(e)
 
 def init_language_activation_table(db_path):
     """初始化语言激活状态表"""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # 创建语言激活状态表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS language_activation (
-            language TEXT PRIMARY KEY,
-            is_active BOOLEAN DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # 初始化所有语言为激活状态
-    for lang in LANGUAGES:
+    with db_config.connections.connection(db_path) as conn:
+        cursor = conn.cursor()
+        
+        # 创建语言激活状态表
         cursor.execute('''
-            INSERT OR IGNORE INTO language_activation (language, is_active) 
-            VALUES (?, 1)
-        ''', (lang,))
+            CREATE TABLE IF NOT EXISTS language_activation (
+                language TEXT PRIMARY KEY,
+                is_active BOOLEAN DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # 初始化所有语言为激活状态
+        for lang in LANGUAGES:
+            cursor.execute('''
+                INSERT OR IGNORE INTO language_activation (language, is_active) 
+                VALUES (?, 1)
+            ''', (lang,))
+        
+        conn.commit()
+
+# 语言激活状态缓存 {数据库绝对路径: (数据版本, {语言: 是否激活})}
+# 激活状态变化时递增 data_version，数据版本变化（包括其他进程的写操作）时重新加载
+_activation_cache = {}
+_activation_lock = threading.Lock()
+
+def _activation_cache_key(db_path):
+    return os.path.abspath(db_path)
+
+def _load_language_activation(db_path):
+    """从数据库加载所有语言的激活状态，返回 (数据版本, {语言: 是否激活})"""
+    with db_config.connections.connection(db_path) as conn:
+        cursor = conn.cursor()
+        
+        # 检查语言激活状态表是否存在，如果不存在则创建
+        cursor.execute('''
+            SELECT name FROM sqlite_master WHERE type='table' AND name='language_activation'
+        ''')
+        
+        if not cursor.fetchone():
+            init_language_activation_table(db_path)
+        
+        # 先读取版本：期间有写操作时缓存的版本偏旧，下次读取会重新加载
+        version = get_data_version(cursor)
+        cursor.execute('SELECT language, is_active FROM language_activation')
+        stored = dict(cursor.fetchall())
     
-    conn.commit()
-    conn.close()
+    # 未记录的语言默认视为激活
+    return version, {lang: bool(stored.get(lang, True)) for lang in LANGUAGES}
+
+def _get_activation_map(db_path):
+    key = _activation_cache_key(db_path)
+    with db_config.connections.connection(db_path) as conn:
+        version = get_data_version(conn.cursor())
+    
+    with _activation_lock:
+        cached = _activation_cache.get(key)
+        hit = cached is not None and cached[0] == version
+        metrics.record_cache('language_activation', hit)
+        if not hit:
+            cached = _load_language_activation(db_path)
+            _activation_cache[key] = cached
+        return cached[1]
+
+def invalidate_language_activation(db_path=None):
+    """使语言激活状态缓存失效，db_path 为空时清空全部缓存"""
+    with _activation_lock:
+        if db_path is None:
+            _activation_cache.clear()
+        else:
+            _activation_cache.pop(_activation_cache_key(db_path), None)
+
+def active_languages(db_path):
+    """获取指定数据库的激活语言列表（按 LANGUAGES 顺序）"""
+    status = _get_activation_map(db_path)
+    return [lang for lang in LANGUAGES if status[lang]]
 
 def get_language_activation_status(db_path, language):
     """获取指定数据库和语言的激活状态"""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # 检查语言激活状态表是否存在，如果不存在则创建
-    cursor.execute('''
-        SELECT name FROM sqlite_master WHERE type='table' AND name='language_activation'
-    ''')
-    
-    if not cursor.fetchone():
-        init_language_activation_table(db_path)
-    
-    # 获取语言激活状态
-    cursor.execute('''
-        SELECT is_active FROM language_activation WHERE language = ?
-    ''', (language,))
-    
-    result = cursor.fetchone()
-    conn.close()
-    
-    return result[0] if result else True
+    return _get_activation_map(db_path).get(language, True)
 
 def set_language_activation_status(db_path, language, is_active):
     """设置指定数据库和语言的激活状态"""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # 检查语言激活状态表是否存在，如果不存在则创建
-    cursor.execute('''
-        SELECT name FROM sqlite_master WHERE type='table' AND name='language_activation'
-    ''')
-    
-    if not cursor.fetchone():
-        init_language_activation_table(db_path)
+    with db_config.connections.connection(db_path) as conn:
+        cursor = conn.cursor()
+        
+        # 检查语言激活状态表是否存在，如果不存在则创建
+        cursor.execute('''
+            SELECT name FROM sqlite_master WHERE type='table' AND name='language_activation'
+        ''')
+        
+        if not cursor.fetchone():
+            init_language_activation_table(db_path)
+        
+        # 更新语言激活状态
+        cursor.execute('''
+            UPDATE language_activation 
+            SET is_active = ?, updated_at = CURRENT_TIMESTAMP 
+            WHERE language = ?
+        ''', (is_active, language))
+        version = bump_data_version(cursor)
+        
+        conn.commit()
     
-    # 更新语言激活状态
-    cursor.execute('''
-        UPDATE language_activation 
-        SET is_active = ?, updated_at = CURRENT_TIMESTAMP 
-        WHERE language = ?
-    ''', (is_active, language))
+    # 返回的语言变化，清空该数据库的条目片段缓存
+    invalidate_row_fragments(db_path, version=version)
     
-    conn.commit()
-    conn.close()
+    # 写穿更新缓存（期间有其他写操作时由版本检查重新加载）
+    key = _activation_cache_key(db_path)
+    with _activation_lock:
+        cached = _activation_cache.get(key)
+        if cached is not None and cached[0] == version - 1:
+            _activation_cache[key] = (version, {**cached[1], language: bool(is_active)})
+        else:
+            _activation_cache.pop(key, None)
 
-def init_db(db_path=None):
-    """初始化数据库"""
+def init_db(db_path=None, layout=None):
+    """初始化数据库
+
+    layout 为 LAYOUT_LONG 时新数据库使用单表布局；已迁移为单表布局的数据库保持不变。
+    """
+    from .search import install_search_index, mark_search_index_ready
+    from .storage import create_long_format_table, invalidate_storage
+    from .migrations import SCHEMA_VERSION, apply_migrations
+    from .tags import install_tag_count_triggers
+    from .stats import install_stats
+    from .translation_memory import install_translation_memory
+    
     if db_path is None:
         db_path = 'databases/default.db'
     
@@ -151,98 +330,193 @@ def init_db(db_path=None):
     if not os.path.exists(db_dir):
         os.makedirs(db_dir)
     
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # 创建英文表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS english (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            english_text TEXT NOT NULL,
-            translation_key TEXT,
-            tag TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # 为每种语言创建翻译表
-    for lang in LANGUAGES:
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS {lang} (
+    with db_config.connections.connection(db_path) as conn:
+        cursor = conn.cursor()
+        
+        # 已有数据库先升级到当前结构版本
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'english'")
+        if cursor.fetchone():
+            apply_migrations(conn)
+        
+        # 创建英文表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS english (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                english_id INTEGER NOT NULL,
-                {lang}_text TEXT,
+                english_text TEXT NOT NULL,
+                translation_key TEXT,
+                tag_id INTEGER REFERENCES tags (id) ON DELETE SET NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (english_id) REFERENCES english (id) ON DELETE CASCADE
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_english_tag_id ON english (tag_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_english_translation_key ON english (translation_key)')
+        
+        # 创建元数据表（记录数据版本、存储布局等）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS app_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        long_format = get_storage_layout(cursor) == LAYOUT_LONG
+        if layout == LAYOUT_LONG and not long_format:
+            # 已有数据的数据库需要通过 migrate_to_long_format 迁移
+            cursor.execute('SELECT COUNT(*) FROM english')
+            if cursor.fetchone()[0]:
+                raise ValueError('已有数据的数据库请使用迁移工具转换为单表布局')
+            long_format = True
+        
+        if long_format:
+            # 单表布局：所有语言的翻译存放在 translations 表中
+            create_long_format_table(cursor)
+            cursor.execute('''
+                INSERT INTO app_meta (key, value) VALUES ('long_format', 1)
+                ON CONFLICT (key) DO UPDATE SET value = 1
+            ''')
+        else:
+            # 为每种语言创建翻译表
+            for lang in LANGUAGES:
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {lang} (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        english_id INTEGER NOT NULL,
+                        {lang}_text TEXT,
+                        translation_key TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (english_id) REFERENCES english (id) ON DELETE CASCADE
+                    )
+                ''')
+                if lang != 'english':
+                    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{lang}_english_id ON {lang} (english_id)')
+        
+        # 创建标签表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tags (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL,
+                entry_count INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # 标签条目数量由触发器维护
+        install_tag_count_triggers(cursor)
+        
+        # 创建操作日志表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS operation_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                operation_type TEXT NOT NULL,
+                entry_count INTEGER DEFAULT 0,
+                description TEXT,
+                operation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_operation_logs_date ON operation_logs (operation_date)')
+        
+        # 创建全文搜索索引
+        tokenizer = install_search_index(cursor)
+        
+        # 创建翻译进度统计
+        install_stats(cursor)
+        
+        # 创建翻译记忆索引
+        install_translation_memory(cursor)
+        
+        # 新建的数据库已是当前结构版本
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        
+        conn.commit()
+    
+    # 初始化语言激活状态表（在应用上下文之外使用另一个连接，需在上面的事务提交后执行）
+    init_language_activation_table(db_path)
+    
+    mark_search_index_ready(db_path, tokenizer)
     
-    # 创建标签表
+    # 数据库重新初始化后重新加载激活状态与存储布局
+    invalidate_language_activation(db_path)
+    invalidate_storage(db_path)
+    
+    return True
+
+def get_data_version(cursor):
+    """获取数据版本号，每次写操作后递增，用于判断缓存是否过期"""
+    try:
+        cursor.execute("SELECT value FROM app_meta WHERE key = 'data_version'")
+    except sqlite3.OperationalError:
+        # 旧数据库没有元数据表
+        return 0
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def get_storage_layout(cursor):
+    """获取数据库的翻译存储布局（记录在元数据表中）"""
+    try:
+        cursor.execute("SELECT value FROM app_meta WHERE key = 'long_format'")
+    except sqlite3.OperationalError:
+        return LAYOUT_PER_LANGUAGE
+    row = cursor.fetchone()
+    return LAYOUT_LONG if row and row[0] else LAYOUT_PER_LANGUAGE
+
+def bump_data_version(cursor):
+    """递增数据版本号并返回新的版本号，应在写操作的事务中调用"""
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tags (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
         )
     ''')
-    
-    # 创建操作日志表
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS operation_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            operation_type TEXT NOT NULL,
-            entry_count INTEGER DEFAULT 0,
-            description TEXT,
-            operation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+        INSERT INTO app_meta (key, value) VALUES ('data_version', 1)
+        ON CONFLICT (key) DO UPDATE SET value = value + 1
     ''')
-    
-    # 初始化语言激活状态表
-    init_language_activation_table(db_path)
-    
-    conn.commit()
-    conn.close()
-    
-    return True
+    return get_data_version(cursor)
 
 def add_operation_log(db_path, operation_type, entry_count, description=""):
-    """添加操作日志"""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT INTO operation_logs (operation_type, entry_count, description)
-        VALUES (?, ?, ?)
-    ''', (operation_type, entry_count, description))
-    
-    conn.commit()
-    conn.close()
+    """添加操作日志（放入缓冲队列，由后台线程批量写入）"""
+    operation_log_writer.add(db_path, operation_type, entry_count, description)
 
-def get_operation_logs(db_path, limit=10):
-    """获取操作日志"""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+def get_log_version(db_path):
+    """操作日志的版本（最新日志的 id），新增日志后变化"""
+    operation_log_writer.flush(db_path)
     
-    cursor.execute('''
-        SELECT operation_type, entry_count, description, operation_date
-        FROM operation_logs
-        ORDER BY operation_date DESC
-        LIMIT ?
-    ''', (limit,))
-    
-    logs = []
-    for row in cursor.fetchall():
-        logs.append({
-            'operation_type': row[0],
-            'entry_count': row[1],
-            'description': row[2],
-            'operation_date': row[3]
-        })
-    
-    conn.close()
-    return logs
+    with db_config.connections.connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT MAX(id) FROM operation_logs')
+        return cursor.fetchone()[0] or 0
+
+def get_operation_logs(db_path, limit=10, before=None):
+    """获取一页操作日志（新的在前），数据库中的日志读完后继续读取归档
+
+    before 为上一页返回的游标位置 (operation_date, id)，返回 (日志列表, 下一页游标)。
+    """
+    from .log_archive import fetch_logs, fetch_archived_logs, encode_log_cursor
+
+    # 先写入队列中尚未写入的日志，保证读取到刚刚完成的操作
+    operation_log_writer.flush(db_path)
+
+    # 多读一条判断是否还有下一页
+    with db_config.connections.connection(db_path) as conn:
+        logs = fetch_logs(conn.cursor(), limit + 1, before)
+
+    if len(logs) <= limit:
+        anchor = (logs[-1]['operation_date'], logs[-1]['id']) if logs else before
+        logs += fetch_archived_logs(db_path, limit + 1 - len(logs), anchor)
+
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = encode_log_cursor(logs[-1]['operation_date'], logs[-1]['id'])
+
+    return logs, next_cursor
 
 # 全局数据库配置实例
 db_config = DatabaseConfig()
+
+# 操作日志缓冲写入器，进程退出时写入剩余日志
+operation_log_writer = OperationLogWriter(db_config.connections)
+register_shutdown_flush(operation_log_writer)
@@ -0,0 +1,355 @@
+"""
+重复条目检测
+
+找出英文内容重复的条目，按簇报告各条目的 key 与已有翻译的语言：
+
+  exact  规范化（统一大小写与空白）后完全相同的英文内容，按内容哈希分组
+  near   内容相近（trigram 集合的 Jaccard 系数不低于阈值）的英文内容
+
+近似重复使用 MinHash（单次哈希 + 旋转填充的分桶 MinHash）与 LSH 分段：签名在某一段上完全相同的
+内容才作为候选，候选再按 MinHash 估计值过滤并精确计算相似度，不需要两两比较所有条目。
+
+检测由 find_duplicates.py 执行（/api/duplicates/scan 在后台启动该脚本），结果保存在数据库的
+duplicate_reports 表中（只保留最近一次），/api/duplicates 读取。进行中的检测记录在 duplicate_scans 表中，
+同一数据库同一时刻只运行一个检测（跨进程有效）。
+"""
+
+import hashlib
+import json
+import operator
+import time
+from datetime import datetime
+
+from .database import get_data_version
+from .translation_memory import normalize, trigrams
+
+REPORT_TABLE = 'duplicate_reports'
+SCAN_TABLE = 'duplicate_scans'
+
+# 进行中的检测超过该时间（秒）仍未完成时视为已中断，允许重新开始
+SCAN_TIMEOUT = 30 * 60
+
+# 默认的近似重复相似度阈值
+DEFAULT_THRESHOLD = 0.8
+
+# MinHash 签名长度与 LSH 每段的长度（32 = 8 段 × 4），
+# 相似度 0.8 的内容成为候选的概率约 98%，0.5 的约 40%
+SIGNATURE_SIZE = 32
+BAND_ROWS = 4
+
+# 签名分桶：哈希值的高 5 位为桶号，其余位为桶内的值
+_BUCKET_SHIFT = 27
+_VALUE_MASK = (1 << _BUCKET_SHIFT) - 1
+
+# MinHash 估计值低于 阈值 - ESTIMATE_MARGIN 的候选不再精确计算
+ESTIMATE_MARGIN = 0.15
+
+# IN 查询每批的条目数
+_BATCH_SIZE = 900
+
+
+def text_hash(normalized):
+    """规范化后英文内容的哈希"""
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def minhash_signature(text):
+    """规范化文本的 trigram 集合的 MinHash 签名（长度 SIGNATURE_SIZE 的元组）
+
+    使用 Python 内置的字符串哈希（每个进程的哈希种子不同），签名只能在同一次检测中比较。
+    """
+    padded = f' {text} '
+    values = {hash(padded[i:i + 3]) & 0xFFFFFFFF for i in range(len(padded) - 2)}
+    # 按值从大到小写入，每个桶最后保留的是桶内最小的值
+    bins = {value >> _BUCKET_SHIFT: value & _VALUE_MASK for value in sorted(values, reverse=True)}
+
+    if len(bins) == SIGNATURE_SIZE:
+        return tuple(bins[index] for index in range(SIGNATURE_SIZE))
+
+    # 空桶使用右侧最近的非空桶的值（加上距离的偏移），使签名仍可按位置比较；
+    # 从右向左绕行两圈，第二圈时每个空桶右侧最近的非空桶都已确定
+    signature = [0] * SIGNATURE_SIZE
+    nearest = distance = 0
+    for position in range(2 * SIGNATURE_SIZE - 1, -1, -1):
+        index = position % SIGNATURE_SIZE
+        value = bins.get(index)
+        if value is None:
+            distance += 1
+            value = nearest + (distance << _BUCKET_SHIFT)
+        else:
+            nearest, distance = value, 0
+        signature[index] = value
+    return tuple(signature)
+
+
+def _estimate(left, right):
+    """由签名估计的相似度（相同位置的比例）"""
+    return sum(map(operator.eq, left, right)) / SIGNATURE_SIZE
+
+
+def _jaccard(left, right):
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
+
+
+class _DisjointSet:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, left, right):
+        left, right = self.find(left), self.find(right)
+        if left != right:
+            self.parent[max(left, right)] = min(left, right)
+
+
+def _near_duplicate_groups(texts, threshold):
+    """对去重后的内容列表做近似重复聚类，返回 {代表下标: (下标列表, 最低相似度)}"""
+    signatures = [minhash_signature(text) for text in texts]
+    groups = _DisjointSet(len(texts))
+    similarities = {}
+    gram_cache = {}
+
+    def grams_of(index):
+        grams = gram_cache.get(index)
+        if grams is None:
+            grams = gram_cache[index] = trigrams(texts[index])
+        return grams
+
+    for start in range(0, SIGNATURE_SIZE, BAND_ROWS):
+        buckets = {}
+        for index, band in enumerate([signature[start:start + BAND_ROWS] for signature in signatures]):
+            members = buckets.get(band)
+            if members is None:
+                buckets[band] = [index]
+            else:
+                members.append(index)
+
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            # 每个桶只与第一个内容比较（其他段上的桶会补充遗漏的组合），避免桶内两两比较
+            first = members[0]
+            for other in members[1:]:
+                if groups.find(first) == groups.find(other):
+                    continue
+                if _estimate(signatures[first], signatures[other]) < threshold - ESTIMATE_MARGIN:
+                    continue
+                similarity = _jaccard(grams_of(first), grams_of(other))
+                if similarity >= threshold:
+                    root_similarity = min(
+                        similarity,
+                        similarities.get(groups.find(first), 1.0),
+                        similarities.get(groups.find(other), 1.0)
+                    )
+                    groups.union(first, other)
+                    similarities[groups.find(first)] = root_similarity
+
+    clusters = {}
+    for index in range(len(texts)):
+        clusters.setdefault(groups.find(index), []).append(index)
+
+    return {
+        root: (members, similarities.get(root, 1.0))
+        for root, members in clusters.items() if len(members) > 1
+    }
+
+
+def _translated_languages(cursor, english_ids):
+    """{english_id: [已有非空翻译的语言]}"""
+    languages = {}
+    for start in range(0, len(english_ids), _BATCH_SIZE):
+        batch = english_ids[start:start + _BATCH_SIZE]
+        cursor.execute(f'''
+            SELECT english_id, language FROM translated_languages
+            WHERE english_id IN ({','.join('?' * len(batch))})
+        ''', batch)
+        for english_id, language in cursor.fetchall():
+            languages.setdefault(english_id, []).append(language)
+    return languages
+
+
+def find_duplicates(cursor, threshold=DEFAULT_THRESHOLD):
+    """检测重复与近似重复的条目，返回检测报告"""
+    started = time.perf_counter()
+    version = get_data_version(cursor)
+
+    cursor.execute('SELECT id, english_text, translation_key FROM english')
+    rows = cursor.fetchall()
+
+    # 完全重复：按规范化内容的哈希分组
+    by_hash = {}
+    texts = []
+    for english_id, text, key in rows:
+        normalized = normalize(text)
+        digest = text_hash(normalized)
+        entries = by_hash.get(digest)
+        if entries is None:
+            entries = by_hash[digest] = []
+            texts.append((digest, normalized))
+        entries.append((english_id, text, key))
+
+    # 近似重复：只对去重后的内容聚类
+    near_groups = _near_duplicate_groups([text for digest, text in texts], threshold)
+
+    clusters = []
+    grouped = set()
+    for members, similarity in near_groups.values():
+        digests = [texts[index][0] for index in members]
+        grouped.update(digests)
+        clusters.append(('near', similarity, [entry for digest in digests for entry in by_hash[digest]]))
+    for digest, entries in by_hash.items():
+        if len(entries) > 1 and digest not in grouped:
+            clusters.append(('exact', 1.0, entries))
+
+    english_ids = [english_id for kind, similarity, entries in clusters for english_id, text, key in entries]
+    languages = _translated_languages(cursor, english_ids)
+
+    report_clusters = []
+    for kind, similarity, entries in clusters:
+        members = []
+        covered = set()
+        for english_id, text, key in sorted(entries):
+            translated = sorted(languages.get(english_id, []))
+            covered.update(translated)
+            members.append({
+                'english_id': english_id,
+                'key': key,
+                'english': text,
+                'languages': translated
+            })
+        report_clusters.append({
+            'kind': kind,
+            'similarity': round(similarity, 4),
+            'size': len(members),
+            'languages': sorted(covered),
+            'members': members
+        })
+    report_clusters.sort(key=lambda cluster: (-cluster['size'], cluster['members'][0]['english_id']))
+
+    return {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'data_version': version,
+        'threshold': threshold,
+        'entries': len(rows),
+        'exact_clusters': sum(1 for cluster in report_clusters if cluster['kind'] == 'exact'),
+        'near_clusters': sum(1 for cluster in report_clusters if cluster['kind'] == 'near'),
+        # 合并后可以减少的条目数
+        'redundant_entries': sum(cluster['size'] - 1 for cluster in report_clusters),
+        'seconds': round(time.perf_counter() - started, 3),
+        'clusters': report_clusters
+    }
+
+
+class ScanInProgressError(RuntimeError):
+    """同一数据库已有检测正在进行"""
+
+
+def _create_tables(cursor):
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {REPORT_TABLE} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            report TEXT NOT NULL
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {SCAN_TABLE} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            started_at REAL NOT NULL,
+            threshold REAL NOT NULL
+        )
+    ''')
+
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def start_scan(conn, threshold):
+    """标记检测开始，已有未超时的检测在进行时返回 False"""
+    cursor = conn.cursor()
+    _create_tables(cursor)
+    conn.commit()
+
+    # 加写锁后检查，多个进程同时开始时只有一个成功
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute(f'SELECT started_at FROM {SCAN_TABLE} WHERE id = 1')
+        row = cursor.fetchone()
+        if row is not None and time.time() - row[0] < SCAN_TIMEOUT:
+            conn.rollback()
+            return False
+        cursor.execute(f'INSERT OR REPLACE INTO {SCAN_TABLE} (id, started_at, threshold) VALUES (1, ?, ?)',
+                       (time.time(), threshold))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+
+def finish_scan(conn):
+    """清除进行中的检测标记"""
+    cursor = conn.cursor()
+    if _table_exists(cursor, SCAN_TABLE):
+        cursor.execute(f'DELETE FROM {SCAN_TABLE}')
+        conn.commit()
+
+
+def scan_status(cursor):
+    """进行中的检测 {'started_at', 'threshold'}，没有时返回 None"""
+    if not _table_exists(cursor, SCAN_TABLE):
+        return None
+    cursor.execute(f'SELECT started_at, threshold FROM {SCAN_TABLE} WHERE id = 1')
+    row = cursor.fetchone()
+    if row is None or time.time() - row[0] >= SCAN_TIMEOUT:
+        return None
+    return {
+        'started_at': datetime.fromtimestamp(row[0]).strftime('%Y-%m-%d %H:%M:%S'),
+        'threshold': row[1]
+    }
+
+
+def save_report(conn, report):
+    """保存检测报告（替换之前的报告）并清除进行中的检测标记"""
+    cursor = conn.cursor()
+    _create_tables(cursor)
+    cursor.execute(f'INSERT OR REPLACE INTO {REPORT_TABLE} (id, report) VALUES (1, ?)',
+                   (json.dumps(report, ensure_ascii=False),))
+    cursor.execute(f'DELETE FROM {SCAN_TABLE}')
+    conn.commit()
+
+
+def load_report(cursor):
+    """读取最近一次的检测报告，没有时返回 None"""
+    if not _table_exists(cursor, REPORT_TABLE):
+        return None
+    cursor.execute(f'SELECT report FROM {REPORT_TABLE} WHERE id = 1')
+    row = cursor.fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def scan_database(conn, threshold=DEFAULT_THRESHOLD, started=False):
+    """检测并保存报告，返回报告
+
+    started 为真时调用方已通过 start_scan 标记检测开始；否则先标记，
+    已有检测在进行时抛出 ScanInProgressError。
+    """
+    if not started and not start_scan(conn, threshold):
+        raise ScanInProgressError('已有重复检测正在进行')
+
+    try:
+        report = find_duplicates(conn.cursor(), threshold)
+        save_report(conn, report)
+    except Exception:
+        conn.rollback()
+        finish_scan(conn)
+        raise
+    return report
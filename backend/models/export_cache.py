@@ -0,0 +1,80 @@
+"""
+导出结果缓存
+
+缓存已生成的导出内容（原文与 gzip 压缩版本），按 (数据库, 语言, 格式) 索引，
+并记录生成时的数据版本。数据版本未变化时直接返回缓存内容，不再执行导出查询。
+缓存按最近最少使用（LRU）淘汰，总条目数与总字节数均有上限。
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from .metrics import metrics
+
+ExportArtifact = namedtuple('ExportArtifact', ['version', 'etag', 'body', 'gzip_body'])
+
+
+def build_artifact(version, body):
+    """根据导出内容生成缓存条目（强 ETag 为内容摘要）"""
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    return ExportArtifact(version, etag, body, gzip.compress(body, compresslevel=6))
+
+
+class ExportCache:
+    def __init__(self, max_entries=64, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(db_path, language, export_format):
+        return (os.path.abspath(db_path), language, export_format)
+
+    @staticmethod
+    def _artifact_size(artifact):
+        return len(artifact.body) + len(artifact.gzip_body)
+
+    def get(self, key, version):
+        """获取与数据版本一致的缓存条目，不存在或已过期时返回 None"""
+        with self._lock:
+            artifact = self._entries.get(key)
+            if artifact is not None and artifact.version != version:
+                self._remove(key)
+                artifact = None
+            if artifact is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache('export', artifact is not None)
+        return artifact
+
+    def put(self, key, artifact):
+        size = self._artifact_size(artifact)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = artifact
+            self._size += size
+
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def _remove(self, key):
+        artifact = self._entries.pop(key)
+        self._size -= self._artifact_size(artifact)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# 全局导出缓存实例
+export_cache = ExportCache()
@@ -0,0 +1,98 @@
+"""
+全语言导出引擎
+
+英文表与各语言翻译各顺序读取一次（均按 english_id 排序），在内存中做归并连接，
+查询次数只与语言数量有关（单表布局下所有语言只需一次扫描）。导出结果写入 sink，可以汇总为字典，
+也可以直接写入每种语言各自的文件。
+"""
+
+import json
+import os
+
+# 每次从游标读取的行数
+EXPORT_BATCH_SIZE = 1000
+
+
+class DictSink:
+    """将导出结果汇总为 {语言: {key: 翻译内容}}"""
+
+    def __init__(self, languages):
+        self.data = {lang: {} for lang in languages}
+
+    def write(self, language, key, text):
+        self.data[language][key] = text
+
+    def close(self):
+        pass
+
+
+class JsonFileSink:
+    """将每种语言的导出结果流式写入 {out_dir}/{语言}.json"""
+
+    def __init__(self, out_dir, languages):
+        os.makedirs(out_dir, exist_ok=True)
+        self.paths = {}
+        self._files = {}
+        self._counts = {}
+        for lang in languages:
+            path = os.path.join(out_dir, f'{lang}.json')
+            handle = open(path, 'w', encoding='utf-8')
+            handle.write('{')
+            self.paths[lang] = path
+            self._files[lang] = handle
+            self._counts[lang] = 0
+
+    def write(self, language, key, text):
+        handle = self._files[language]
+        prefix = '\n  ' if self._counts[language] == 0 else ',\n  '
+        handle.write(f'{prefix}{json.dumps(key, ensure_ascii=False)}: {json.dumps(text, ensure_ascii=False)}')
+        self._counts[language] += 1
+
+    def close(self):
+        for lang, handle in self._files.items():
+            handle.write('\n}\n' if self._counts[lang] else '}\n')
+            handle.close()
+        self._files = {}
+
+
+def _iter_rows(cursor):
+    while True:
+        rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def export_all_languages(conn, storage, languages, sink):
+    """导出所有有 key 的条目在各语言下的非空翻译，写入 sink
+
+    返回处理的英文条目数。
+    """
+    english = conn.execute('''
+        SELECT id, english_text, translation_key FROM english
+        WHERE translation_key IS NOT NULL AND TRIM(translation_key) != ''
+        ORDER BY id
+    ''')
+    merger = storage.text_merger(conn, languages)
+    export_english = 'english' in languages
+
+    entry_count = 0
+    for english_id, content, key in _iter_rows(english):
+        entry_count += 1
+
+        if export_english and content and content.strip():
+            sink.write('english', key, content)
+
+        for lang, text in merger.texts_for(english_id).items():
+            if text and text.strip():
+                sink.write(lang, key, text)
+
+    sink.close()
+    return entry_count
+
+
+def export_to_directory(conn, storage, languages, out_dir):
+    """将各语言导出为 out_dir 下的独立 JSON 文件，返回 {语言: 文件路径}"""
+    sink = JsonFileSink(out_dir, languages)
+    export_all_languages(conn, storage, languages, sink)
+    return sink.paths
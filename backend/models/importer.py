@@ -0,0 +1,219 @@
+"""
+批量导入
+
+将 JSON 语言文件（key -> 文本）或 CSV 文件解析为导入记录，
+在一个事务中按 translation_key 批量写入英文表与各语言翻译。
+"""
+
+import csv
+import io
+
+from .page_loader import MAX_BATCH_SIZE
+from .tags import resolve_tag_ids
+
+
+class ImportFormatError(ValueError):
+    """导入数据格式错误（整个请求无法处理）"""
+
+
+def _flatten(data, prefix=''):
+    """将嵌套的语言文件展开为 {a.b.c: 文本}"""
+    flat = {}
+    for key, value in data.items():
+        full_key = f'{prefix}.{key}' if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(_flatten(value, full_key))
+        else:
+            flat[full_key] = value
+    return flat
+
+
+def parse_json_payload(payload):
+    """解析 JSON 导入数据
+
+    支持两种格式：
+      {"language": "french", "data": {"key": "文本", ...}, "tag": "可选"}
+      {"entries": [{"key": ..., "english": ..., "tag": ..., "translations": {...}}, ...]}
+    """
+    if not isinstance(payload, dict):
+        raise ImportFormatError('导入数据格式错误')
+
+    if 'entries' in payload:
+        entries = payload['entries']
+        if not isinstance(entries, list):
+            raise ImportFormatError('entries 必须是数组')
+        records = []
+        for entry in entries:
+            if not isinstance(entry, dict):
+                entry = {}
+            records.append({
+                'key': entry.get('key'),
+                'english': entry.get('english'),
+                'tag': entry.get('tag'),
+                'translations': entry.get('translations') or {}
+            })
+        return records
+
+    language = payload.get('language')
+    data = payload.get('data')
+    if not language or not isinstance(data, dict):
+        raise ImportFormatError('需要提供 language 与 data')
+
+    tag = payload.get('tag')
+    records = []
+    for key, text in _flatten(data).items():
+        if language == 'english':
+            records.append({'key': key, 'english': text, 'tag': tag, 'translations': {}})
+        else:
+            records.append({'key': key, 'english': None, 'tag': tag, 'translations': {language: text}})
+    return records
+
+
+def parse_csv(text, languages):
+    """解析 CSV 导入数据，表头为 key、english、tag（可选）及各语言名称"""
+    reader = csv.DictReader(io.StringIO(text.lstrip('\ufeff')))
+    if not reader.fieldnames:
+        raise ImportFormatError('CSV 文件为空')
+
+    fields = [name.strip() for name in reader.fieldnames]
+    reader.fieldnames = fields
+
+    key_field = 'key' if 'key' in fields else 'translation_key'
+    if key_field not in fields:
+        raise ImportFormatError('CSV 缺少 key 列')
+
+    unknown = [name for name in fields if name not in (key_field, 'english', 'tag') and name not in languages]
+    if unknown:
+        raise ImportFormatError(f"CSV 包含不支持或未激活的语言列: {', '.join(unknown)}")
+
+    language_fields = [name for name in fields if name in languages and name != 'english']
+
+    records = []
+    for row in reader:
+        records.append({
+            'key': row.get(key_field),
+            'english': row.get('english') or None,
+            'tag': row.get('tag') or None,
+            # 空单元格不覆盖已有翻译
+            'translations': {lang: row[lang] for lang in language_fields if row.get(lang)}
+        })
+    return records
+
+
+def _chunks(items, size=MAX_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _existing_ids(cursor, keys):
+    """查询已存在的 key，返回 {key: english_id}（重复 key 取最早的条目）"""
+    ids = {}
+    for batch in _chunks(keys):
+        placeholders = ','.join('?' * len(batch))
+        cursor.execute(f'''
+            SELECT translation_key, MIN(id) FROM english
+            WHERE translation_key IN ({placeholders})
+            GROUP BY translation_key
+        ''', batch)
+        ids.update(cursor.fetchall())
+    return ids
+
+
+def import_records(cursor, storage, records, languages):
+    """按 translation_key 批量新增或更新，调用方负责提交事务
+
+    返回 (统计信息, 逐行错误列表)。
+    """
+    errors = []
+    merged = {}
+
+    # 校验并合并同一 key 的多条记录（后出现的覆盖先出现的）
+    for row_number, record in enumerate(records, 1):
+        key = record.get('key')
+        key = key.strip() if isinstance(key, str) else key
+        if not key or not isinstance(key, str):
+            errors.append({'row': row_number, 'key': key, 'error': 'key 不能为空'})
+            continue
+
+        translations = record.get('translations') or {}
+        if not isinstance(translations, dict):
+            errors.append({'row': row_number, 'key': key, 'error': 'translations 必须是对象'})
+            continue
+
+        invalid = [lang for lang in translations if lang not in languages or lang == 'english']
+        if invalid:
+            errors.append({'row': row_number, 'key': key, 'error': f"不支持或未激活的语言: {', '.join(invalid)}"})
+            continue
+
+        values = [record.get('english')] + list(translations.values())
+        if any(value is not None and not isinstance(value, str) for value in values):
+            errors.append({'row': row_number, 'key': key, 'error': '翻译内容必须是字符串'})
+            continue
+
+        entry = merged.setdefault(key, {'row': row_number, 'english': None, 'tag': None, 'translations': {}})
+        entry['row'] = row_number
+        if record.get('english'):
+            entry['english'] = record['english']
+        if record.get('tag'):
+            entry['tag'] = record['tag']
+        entry['translations'].update(translations)
+
+    existing = _existing_ids(cursor, list(merged))
+
+    # 新 key 需要英文内容才能创建条目
+    new_rows = []
+    for key, entry in list(merged.items()):
+        if key in existing:
+            continue
+        if not entry['english']:
+            errors.append({'row': entry['row'], 'key': key, 'error': 'key 不存在且未提供英文内容'})
+            del merged[key]
+            continue
+        new_rows.append((entry['english'], key, entry['tag']))
+
+    # 导入数据中出现的标签自动创建
+    tag_ids = resolve_tag_ids(cursor, [entry['tag'] for entry in merged.values()])
+
+    cursor.executemany('''
+        INSERT INTO english (english_text, translation_key, tag_id)
+        VALUES (?, ?, ?)
+    ''', [(english, key, tag_ids.get(tag)) for english, key, tag in new_rows])
+
+    cursor.executemany('''
+        UPDATE english
+        SET english_text = COALESCE(?, english_text), tag_id = COALESCE(?, tag_id), updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', [
+        (entry['english'], tag_ids.get(entry['tag']), existing[key])
+        for key, entry in merged.items()
+        if key in existing and (entry['english'] or entry['tag'])
+    ])
+
+    # 新建条目的 id
+    created_ids = _existing_ids(cursor, [row[1] for row in new_rows])
+    ids = dict(existing)
+    ids.update(created_ids)
+
+    translation_count = 0
+    for lang in languages:
+        if lang == 'english':
+            continue
+
+        values = {ids[key]: entry['translations'][lang] for key, entry in merged.items() if lang in entry['translations']}
+        if not values:
+            continue
+
+        storage.upsert_texts(cursor, lang, values)
+        translation_count += len(values)
+
+    # 与单条新增一致：导入的翻译写入英文条目的 key
+    storage.sync_keys(cursor, languages, list(ids.values()))
+
+    stats = {
+        'total': len(records),
+        'created': len(new_rows),
+        'updated': len(merged) - len(new_rows),
+        'translations': translation_count,
+        'failed': len(errors)
+    }
+    return stats, errors
@@ -0,0 +1,72 @@
+"""
+语言注册表
+
+支持的语言及其元数据（BCP-47 代码、中英文名称、本地名称、书写方向），在导入时构建一次。
+LANGUAGES 的顺序即语言在数据库、搜索索引和接口中的顺序，只能在末尾追加新语言。
+"""
+
+import json
+from functools import lru_cache
+
+# (语言, BCP-47 代码, 中文名称, 英文名称, 本地名称, 书写方向)
+_REGISTRY = (
+    ('english', 'en', '英文', 'English', 'English', 'ltr'),
+    ('chinese', 'zh', '中文', 'Chinese', '中文', 'ltr'),
+    ('thai', 'th', '泰语', 'Thai', 'ไทย', 'ltr'),
+    ('czech', 'cs', '捷克语', 'Czech', 'Čeština', 'ltr'),
+    ('slovak', 'sk', '斯洛伐克语', 'Slovak', 'Slovenčina', 'ltr'),
+    ('italian', 'it', '意大利语', 'Italian', 'Italiano', 'ltr'),
+    ('polish', 'pl', '波兰语', 'Polish', 'Polski', 'ltr'),
+    ('latin', 'la', '拉丁语', 'Latin', 'Latina', 'ltr'),
+    ('dutch', 'nl', '荷兰语', 'Dutch', 'Nederlands', 'ltr'),
+    ('portuguese', 'pt', '葡萄牙语', 'Portuguese', 'Português', 'ltr'),
+    ('greek', 'el', '希腊语', 'Greek', 'Ελληνικά', 'ltr'),
+    # 巴尔干语指塞尔维亚-克罗地亚语（拉丁字母）
+    ('balkan', 'sh', '巴尔干语', 'Balkan', 'Srpskohrvatski', 'ltr'),
+    ('bulgarian', 'bg', '保加利亚语', 'Bulgarian', 'Български', 'ltr'),
+    ('turkish', 'tr', '土耳其语', 'Turkish', 'Türkçe', 'ltr'),
+    ('french', 'fr', '法语', 'French', 'Français', 'ltr'),
+    ('german', 'de', '德语', 'German', 'Deutsch', 'ltr'),
+    ('ukrainian', 'uk', '乌克兰语', 'Ukrainian', 'Українська', 'ltr'),
+    ('russian', 'ru', '俄语', 'Russian', 'Русский', 'ltr'),
+    # 南非语即阿非利卡语
+    ('south_african', 'af', '南非语', 'South African', 'Afrikaans', 'ltr'),
+    ('arabic', 'ar', '阿拉伯语', 'Arabic', 'العربية', 'rtl'),
+    ('norwegian', 'no', '挪威语', 'Norwegian', 'Norsk', 'ltr'),
+    ('finnish', 'fi', '芬兰语', 'Finnish', 'Suomi', 'ltr'),
+    ('macedonian', 'mk', '马其顿语', 'Macedonian', 'Македонски', 'ltr'),
+    ('estonian', 'et', '爱沙尼亚语', 'Estonian', 'Eesti', 'ltr'),
+    ('slovenian', 'sl', '斯洛文尼亚语', 'Slovenian', 'Slovenščina', 'ltr'),
+    ('indonesian', 'id', '印尼语', 'Indonesian', 'Bahasa Indonesia', 'ltr'),
+    ('swedish', 'sv', '瑞典语', 'Swedish', 'Svenska', 'ltr'),
+    ('japanese', 'ja', '日语', 'Japanese', '日本語', 'ltr'),
+    ('korean', 'ko', '韩语', 'Korean', '한국어', 'ltr'),
+)
+
+# 支持的语言列表
+LANGUAGES = [row[0] for row in _REGISTRY]
+
+# {语言: {'code', 'zh', 'en', 'native', 'dir'}}
+LANGUAGE_INFO = {
+    lang: {'code': code, 'zh': zh, 'en': en, 'native': native, 'dir': direction}
+    for lang, code, zh, en, native, direction in _REGISTRY
+}
+
+# 与 jsonify 的输出格式一致（按键排序、ASCII 转义、紧凑分隔符）
+_LANGUAGE_INFO_JSON = json.dumps(LANGUAGE_INFO, sort_keys=True, separators=(',', ':'))
+
+
+def language_code(language):
+    """返回语言的 BCP-47 代码，未知语言返回 None"""
+    info = LANGUAGE_INFO.get(language)
+    return info['code'] if info else None
+
+
+@lru_cache(maxsize=64)
+def languages_payload(active_languages):
+    """/api/languages 的响应体（bytes），active_languages 为激活语言的元组
+
+    语言元数据只序列化一次，按激活语言组合缓存整个响应体。
+    """
+    active = json.dumps(list(active_languages), separators=(',', ':'))
+    return f'{{"language_names":{_LANGUAGE_INFO_JSON},"languages":{active},"success":true}}\n'.encode('utf-8')
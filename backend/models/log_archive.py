@@ -0,0 +1,203 @@
+"""
+操作日志分页与归档
+
+operation_logs 按 (operation_date, id) 倒序分页，游标记录上一页最后一条日志的位置，
+翻页只读取 operation_date 索引上的一段，与日志总数无关。
+
+超过保留期限的日志按月追加写入 gzip 压缩的 JSONL 归档文件后从数据库删除：
+
+  databases/log_archive/<数据库名>/2024-01.jsonl.gz
+
+归档文件只追加不修改（每次追加一个 gzip 成员），查询日志时数据库中的日志读完后
+按月份倒序继续读取归档，游标在两者之间通用。归档与删除在同一个写事务中进行，
+写入归档后、提交前中断可能导致同一日志重复写入归档，读取时按 id 去重。
+"""
+
+import base64
+import bisect
+import glob
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from .database import db_config
+
+# 日志在数据库中保留的天数
+LOG_RETENTION_DAYS = 90
+
+# 每批归档的日志数量
+ARCHIVE_BATCH_SIZE = 5000
+
+ARCHIVE_SUFFIX = '.jsonl.gz'
+
+LOG_COLUMNS = ('id', 'operation_type', 'entry_count', 'description', 'operation_date')
+
+# 缓存解析结果的归档月份数量
+ARCHIVE_CACHE_SIZE = 12
+
+# {归档文件路径: ((修改时间, 大小), (位置列表, 日志列表))}，最近使用的在后
+_archive_cache = OrderedDict()
+_archive_lock = threading.Lock()
+
+
+def encode_log_cursor(operation_date, log_id):
+    """生成日志分页游标（指向上一页最后一条日志）"""
+    payload = json.dumps([operation_date, log_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_log_cursor(token):
+    """解析日志分页游标，返回 (operation_date, id)，游标无效时抛出 ValueError"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        operation_date, log_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('无效的分页游标')
+
+    if not isinstance(operation_date, str) or not isinstance(log_id, int):
+        raise ValueError('无效的分页游标')
+    return operation_date, log_id
+
+
+def archive_dir(db_path):
+    """数据库对应的归档目录"""
+    db_name = os.path.splitext(os.path.basename(db_path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'log_archive', db_name)
+
+
+def list_archives(db_path):
+    """列出数据库的归档文件，按月份倒序返回 [{'month', 'size'}, ...]"""
+    archives = []
+    for path in glob.glob(os.path.join(archive_dir(db_path), '*' + ARCHIVE_SUFFIX)):
+        month = os.path.basename(path)[:-len(ARCHIVE_SUFFIX)]
+        archives.append({'month': month, 'size': os.path.getsize(path)})
+    archives.sort(key=lambda archive: archive['month'], reverse=True)
+    return archives
+
+
+def _to_log(row):
+    return dict(zip(LOG_COLUMNS, row))
+
+
+def fetch_logs(cursor, limit, before=None):
+    """从数据库读取一页日志（新的在前），before 为 (operation_date, id) 游标位置"""
+    if before is None:
+        cursor.execute(f'''
+            SELECT {', '.join(LOG_COLUMNS)} FROM operation_logs
+            ORDER BY operation_date DESC, id DESC
+            LIMIT ?
+        ''', (limit,))
+    else:
+        cursor.execute(f'''
+            SELECT {', '.join(LOG_COLUMNS)} FROM operation_logs
+            WHERE operation_date < ? OR (operation_date = ? AND id < ?)
+            ORDER BY operation_date DESC, id DESC
+            LIMIT ?
+        ''', (before[0], before[0], before[1], limit))
+    return [_to_log(row) for row in cursor.fetchall()]
+
+
+def _read_archive(path):
+    """读取并解析一个月的归档，返回按 (operation_date, id) 升序排列的 (位置列表, 日志列表)
+
+    解析结果按文件的修改时间与大小缓存，翻页时不重复解压整个归档；追加写入后重新读取。
+    """
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _archive_lock:
+        cached = _archive_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            _archive_cache.move_to_end(path)
+            return cached[1]
+
+    logs = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                log = json.loads(line)
+                logs[log['id']] = log
+    ordered = sorted(logs.values(), key=lambda log: (log['operation_date'], log['id']))
+    parsed = ([(log['operation_date'], log['id']) for log in ordered], ordered)
+
+    with _archive_lock:
+        _archive_cache[path] = (signature, parsed)
+        _archive_cache.move_to_end(path)
+        while len(_archive_cache) > ARCHIVE_CACHE_SIZE:
+            _archive_cache.popitem(last=False)
+    return parsed
+
+
+def fetch_archived_logs(db_path, limit, before=None):
+    """从归档文件读取一页日志（新的在前），只读取游标所在月份及更早的归档"""
+    logs = []
+    for archive in list_archives(db_path):
+        if len(logs) >= limit:
+            break
+        if before is not None and archive['month'] > before[0][:7]:
+            continue
+
+        path = os.path.join(archive_dir(db_path), archive['month'] + ARCHIVE_SUFFIX)
+        positions, month_logs = _read_archive(path)
+        end = len(month_logs) if before is None else bisect.bisect_left(positions, tuple(before))
+        start = max(end - (limit - len(logs)), 0)
+        logs.extend(reversed(month_logs[start:end]))
+
+    return logs
+
+
+def archive_expired_logs(conn, db_path, retention_days=LOG_RETENTION_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """将超过保留期限的日志移入归档文件，返回归档的日志数量"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+    directory = archive_dir(db_path)
+    cursor = conn.cursor()
+    archived = 0
+
+    while True:
+        # 加写锁，多个进程同时归档时不会重复写入
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute(f'''
+            SELECT {', '.join(LOG_COLUMNS)} FROM operation_logs
+            WHERE operation_date < ?
+            ORDER BY operation_date, id
+            LIMIT ?
+        ''', (cutoff, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            break
+
+        by_month = {}
+        for row in rows:
+            log = _to_log(row)
+            by_month.setdefault(str(log['operation_date'])[:7], []).append(log)
+
+        os.makedirs(directory, exist_ok=True)
+        for month, logs in by_month.items():
+            with open(os.path.join(directory, month + ARCHIVE_SUFFIX), 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                    for log in logs:
+                        f.write((json.dumps(log, ensure_ascii=False) + '\n').encode('utf-8'))
+                raw.flush()
+                os.fsync(raw.fileno())
+
+        cursor.executemany('DELETE FROM operation_logs WHERE id = ?', [(row[0],) for row in rows])
+        conn.commit()
+        archived += len(rows)
+
+        if len(rows) < batch_size:
+            break
+
+    return archived
+
+
+def archive_databases(retention_days=LOG_RETENTION_DAYS):
+    """将数据库目录下所有数据库中过期的日志归档，返回 {数据库文件名: 归档的日志数量}"""
+    results = {}
+    for db_name in db_config.get_available_databases():
+        db_path = os.path.join(db_config.db_dir, db_name)
+        with db_config.connections.connection(db_path) as conn:
+            results[db_name] = archive_expired_logs(conn, db_path, retention_days)
+    return results
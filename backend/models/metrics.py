@@ -0,0 +1,238 @@
+"""
+运行指标
+
+记录每个接口的请求数与耗时分布、每个请求执行的 SQL 语句数与耗时、新建的数据库连接数
+以及各缓存的命中情况，由 /api/metrics 以 Prometheus 文本格式输出。
+
+SQL 统计通过连接池打开的 InstrumentedConnection 完成：cursor 的 execute / executemany
+计时，耗时超过 slow_query_threshold（毫秒）的语句连同参数形状（类型而非取值）记录到
+transflow.slow_query 日志。
+
+指标保存在进程内存中，多进程部署（serve.py）时每个工作进程分别统计。
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+
+from flask import g, has_app_context, request
+
+slow_query_logger = logging.getLogger('transflow.slow_query')
+
+# 耗时分布的桶上界（秒）
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# 每个请求执行的 SQL 语句数分布的桶上界
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f'{self.name}{_labels(self.label_names, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # {标签: [各桶计数..., 总和, 总数]}
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, list(state)) for labels, state in self._values.items())
+        for labels, state in items:
+            names = self.label_names + ('le',)
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}')
+            lines.append(f'{self.name}_bucket{_labels(names, labels + ("+Inf",))} {state[-1]}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {round(state[-2], 6)}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {state[-1]}')
+        return lines
+
+
+class Metrics:
+    def __init__(self):
+        # 慢查询阈值（毫秒），None 表示不记录
+        self.slow_query_threshold = 100
+        self.requests = Counter(
+            'transflow_http_requests_total', '按接口统计的请求数', ('endpoint', 'method', 'status'))
+        self.request_seconds = Histogram(
+            'transflow_http_request_duration_seconds', '按接口统计的请求耗时', ('endpoint',))
+        self.request_statements = Histogram(
+            'transflow_sql_statements_per_request', '每个请求执行的 SQL 语句数', ('endpoint',),
+            STATEMENT_BUCKETS)
+        self.request_sql_seconds = Histogram(
+            'transflow_sql_seconds_per_request', '每个请求执行 SQL 语句的耗时', ('endpoint',))
+        self.sql_statements = Counter(
+            'transflow_sql_statements_total', '执行的 SQL 语句数（请求外执行的记为 endpoint="-"）', ('endpoint',))
+        self.sql_seconds = Counter(
+            'transflow_sql_seconds_total', '执行 SQL 语句的总耗时', ('endpoint',))
+        self.slow_queries = Counter(
+            'transflow_sql_slow_queries_total', '超过慢查询阈值的 SQL 语句数', ('endpoint',))
+        self.connections_opened = Counter(
+            'transflow_db_connections_opened_total', '新建的数据库连接数')
+        self.cache_requests = Counter(
+            'transflow_cache_requests_total', '缓存查询次数', ('cache', 'result'))
+
+    def all(self):
+        return (
+            self.requests, self.request_seconds, self.request_statements, self.request_sql_seconds,
+            self.sql_statements, self.sql_seconds, self.slow_queries, self.connections_opened, self.cache_requests
+        )
+
+    def render(self):
+        """以 Prometheus 文本格式输出所有指标"""
+        lines = []
+        for metric in self.all():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def record_cache(self, cache, hit, count=1):
+        if count:
+            self.cache_requests.inc(cache, 'hit' if hit else 'miss', amount=count)
+
+    def connection_opened(self, conn, db_path):
+        self.connections_opened.inc()
+
+    def record_statement(self, sql, params, seconds, many=False):
+        """记录一条 SQL 语句的执行（由 InstrumentedCursor 调用）"""
+        endpoint = '-'
+        if has_app_context():
+            endpoint = g.get('_metrics_endpoint', '-')
+            g._sql_statements = g.get('_sql_statements', 0) + 1
+            g._sql_seconds = g.get('_sql_seconds', 0) + seconds
+
+        self.sql_statements.inc(endpoint)
+        self.sql_seconds.inc(endpoint, amount=seconds)
+
+        threshold = self.slow_query_threshold
+        if threshold is not None and seconds * 1000 >= threshold:
+            self.slow_queries.inc(endpoint)
+            slow_query_logger.warning(
+                '慢查询 %.1f ms [%s] %s 参数: %s',
+                seconds * 1000, endpoint, ' '.join(sql.split()), param_shape(params, many)
+            )
+
+    def install(self, app):
+        """为 Flask 应用注册请求计时"""
+
+        @app.before_request
+        def start_request_timer():
+            g._metrics_start = time.perf_counter()
+            g._metrics_endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        @app.after_request
+        def record_request(response):
+            start = g.get('_metrics_start')
+            if start is not None:
+                endpoint = g._metrics_endpoint
+                self.requests.inc(endpoint, request.method, str(response.status_code))
+                self.request_seconds.observe(time.perf_counter() - start, endpoint)
+                self.request_statements.observe(g.get('_sql_statements', 0), endpoint)
+                self.request_sql_seconds.observe(g.get('_sql_seconds', 0), endpoint)
+            return response
+
+
+def param_shape(params, many=False):
+    """描述参数的形状（类型与数量），不包含参数值"""
+    if many:
+        rows = params if isinstance(params, (list, tuple)) else list(params)
+        first = param_shape(rows[0]) if rows else '()'
+        return f'{len(rows)} 行 × {first}'
+    if params is None:
+        return '()'
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in params.items()) + '}'
+
+    names = [type(value).__name__ for value in params]
+    parts = []
+    for name in names:
+        # 连续相同类型的参数合并显示，如 IN (?, ?, ...) 的大量参数
+        if parts and parts[-1][0] == name:
+            parts[-1][1] += 1
+        else:
+            parts.append([name, 1])
+    return '(' + ', '.join(name if count == 1 else f'{name} × {count}' for name, count in parts) + ')'
+
+
+metrics = Metrics()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql, params=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            metrics.record_statement(sql, params, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            metrics.record_statement(sql, seq_of_params, time.perf_counter() - start, many=True)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """统计 SQL 执行次数与耗时的连接（connection.execute 同样经过 InstrumentedCursor）"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
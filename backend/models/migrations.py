@@ -0,0 +1,156 @@
+"""
+数据库结构迁移
+
+数据库的结构版本记录在 PRAGMA user_version 中。启动时只读取每个数据库的版本号，
+低于 SCHEMA_VERSION 时按顺序执行尚未执行的迁移，每个迁移在一个事务中完成。
+新增迁移时在 MIGRATIONS 末尾追加函数，迁移需要可以重复执行。
+"""
+
+import os
+
+from .database import LANGUAGES, db_config, init_db
+from .tags import install_tag_count_triggers, recount_tags
+from .stats import install_stats
+from .translation_memory import install_translation_memory
+
+
+def _table_names(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _columns(cursor, table):
+    cursor.execute(f'PRAGMA table_info({table})')
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _add_missing_indexes(cursor):
+    """版本 1：语言表补充 translation_key 列，为 english_id、tag、translation_key 建立索引"""
+    tables = _table_names(cursor)
+
+    for lang in LANGUAGES:
+        if lang == 'english' or lang not in tables:
+            continue
+        if 'translation_key' not in _columns(cursor, lang):
+            cursor.execute(f'ALTER TABLE {lang} ADD COLUMN translation_key TEXT')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{lang}_english_id ON {lang} (english_id)')
+
+    if 'tag' in _columns(cursor, 'english'):
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_english_tag ON english (tag)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_english_translation_key ON english (translation_key)')
+
+
+def _link_english_tags(cursor):
+    """版本 2：english.tag 文本列改为引用 tags 的 tag_id，标签条目数量由触发器维护"""
+    if 'entry_count' not in _columns(cursor, 'tags'):
+        cursor.execute('ALTER TABLE tags ADD COLUMN entry_count INTEGER NOT NULL DEFAULT 0')
+
+    columns = _columns(cursor, 'english')
+    if 'tag_id' not in columns:
+        cursor.execute('ALTER TABLE english ADD COLUMN tag_id INTEGER REFERENCES tags (id) ON DELETE SET NULL')
+
+    if 'tag' in columns:
+        # 英文表中出现过但未创建的标签补充到标签表
+        cursor.execute('''
+            INSERT OR IGNORE INTO tags (name)
+            SELECT DISTINCT tag FROM english WHERE tag IS NOT NULL AND tag != ''
+        ''')
+        cursor.execute('''
+            UPDATE english SET tag_id = (SELECT id FROM tags WHERE tags.name = english.tag)
+            WHERE tag IS NOT NULL AND tag != ''
+        ''')
+        cursor.execute('DROP INDEX IF EXISTS idx_english_tag')
+        cursor.execute('ALTER TABLE english DROP COLUMN tag')
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_english_tag_id ON english (tag_id)')
+    install_tag_count_triggers(cursor)
+    recount_tags(cursor)
+
+
+def _add_translation_stats(cursor):
+    """版本 3：创建由触发器维护的翻译进度统计表，并根据已有数据计算"""
+    install_stats(cursor)
+
+
+def _index_operation_logs(cursor):
+    """版本 4：为 operation_logs.operation_date 建立索引，用于日志分页与归档"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_operation_logs_date ON operation_logs (operation_date)')
+
+
+def _add_translation_memory(cursor):
+    """版本 5：创建翻译记忆的 trigram 索引，并为已有条目建立索引"""
+    install_translation_memory(cursor)
+
+
+# 按版本顺序排列的迁移，第 n 个迁移将数据库升级到版本 n
+MIGRATIONS = [
+    _add_missing_indexes,
+    _link_english_tags,
+    _add_translation_stats,
+    _index_operation_logs,
+    _add_translation_memory,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(cursor):
+    cursor.execute('PRAGMA user_version')
+    return cursor.fetchone()[0]
+
+
+def apply_migrations(conn):
+    """在连接上执行尚未执行的迁移，返回执行的迁移数量"""
+    cursor = conn.cursor()
+    applied = 0
+
+    while get_schema_version(cursor) < SCHEMA_VERSION:
+        # 加写锁后重新读取版本，避免多个进程重复执行同一迁移
+        cursor.execute('BEGIN IMMEDIATE')
+        version = get_schema_version(cursor)
+        if version >= SCHEMA_VERSION:
+            conn.rollback()
+            break
+
+        MIGRATIONS[version](cursor)
+        cursor.execute(f'PRAGMA user_version = {version + 1}')
+        conn.commit()
+        applied += 1
+
+    return applied
+
+
+def migrate_database(db_path):
+    """将数据库升级到当前结构版本，返回执行的迁移数量
+
+    已是最新版本时只读取一次 user_version。
+    """
+    with db_config.connections.connection(db_path) as conn:
+        cursor = conn.cursor()
+        if get_schema_version(cursor) >= SCHEMA_VERSION:
+            return 0
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'english'")
+        initialized = cursor.fetchone() is not None
+
+    if not initialized:
+        # 尚未初始化的空数据库：init_db 创建完整结构并执行迁移
+        init_db(db_path)
+        return SCHEMA_VERSION
+
+    with db_config.connections.connection(db_path) as conn:
+        return apply_migrations(conn)
+
+
+def migrate_databases():
+    """启动时将数据库目录下的所有数据库升级到当前结构版本
+
+    返回 {数据库文件名: 执行的迁移数量}。
+    """
+    # 没有任何数据库时创建并初始化默认数据库
+    db_config.get_current_db()
+
+    results = {}
+    for db_name in db_config.get_available_databases():
+        results[db_name] = migrate_database(os.path.join(db_config.db_dir, db_name))
+    return results
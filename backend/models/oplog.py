@@ -0,0 +1,163 @@
+"""
+操作日志缓冲写入
+
+写操作记录的日志先放入内存队列，由后台线程按时间间隔或队列长度批量写入，
+每个数据库一批只提交一次事务，不再在请求中单独打开连接、插入并提交。
+写入失败（例如其他进程长时间持有写锁）时这批日志放回队列，按递增的间隔重试，
+连续失败 MAX_WRITE_ATTEMPTS 次后才丢弃。
+进程退出时自动写入剩余日志；flush() 可用于测试或读取日志前强制写入。
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# 后台线程的写入间隔（秒）
+FLUSH_INTERVAL = 1.0
+
+# 队列中的日志达到该数量时立即写入
+FLUSH_BATCH_SIZE = 200
+
+# 写入失败后的重试间隔（秒，每次失败后加倍）与最多尝试次数
+RETRY_BACKOFF = 1.0
+MAX_WRITE_ATTEMPTS = 5
+
+
+class OperationLogWriter:
+    def __init__(self, connections, flush_interval=FLUSH_INTERVAL, batch_size=FLUSH_BATCH_SIZE):
+        self.connections = connections
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = []
+        self._lock = threading.Lock()
+        # 保证同一时刻只有一个线程在写入，flush() 返回时日志已提交
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        # 写入失败的数据库 {数据库路径: (连续失败次数, 下次重试的时间)}
+        self._failures = {}
+        self._stopped = False
+        self._thread = None
+
+    def add(self, db_path, operation_type, entry_count, description=''):
+        """记录一条日志（时间取记录时刻，与写入数据库的时间无关）"""
+        # 与 CURRENT_TIMESTAMP 的格式一致（UTC）
+        operation_date = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        entry = (os.path.abspath(db_path), operation_type, entry_count, description, operation_date)
+
+        with self._lock:
+            self._pending.append(entry)
+            pending = len(self._pending)
+            self._ensure_thread()
+
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='operation-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush(retry_due_only=True)
+            except Exception:
+                logger.exception('写入操作日志失败')
+
+    def flush(self, db_path=None, retry_due_only=False):
+        """立即写入队列中的日志，db_path 指定时只写入该数据库的日志，返回写入条数
+
+        写入失败的日志放回队列；retry_due_only 为真时（后台线程）跳过还未到重试时间的数据库。
+        """
+        key = os.path.abspath(db_path) if db_path else None
+
+        with self._flush_lock:
+            now = time.monotonic()
+            waiting = {
+                path for path, (attempts, retry_at) in self._failures.items()
+                if retry_due_only and retry_at > now
+            }
+
+            def selected(entry):
+                return (key is None or entry[0] == key) and entry[0] not in waiting
+
+            with self._lock:
+                batch = [entry for entry in self._pending if selected(entry)]
+                self._pending = [entry for entry in self._pending if not selected(entry)]
+
+            if not batch:
+                return 0
+
+            by_database = {}
+            for entry in batch:
+                by_database.setdefault(entry[0], []).append(entry)
+
+            written = 0
+            for path, entries in by_database.items():
+                if self._write(path, [entry[1:] for entry in entries]):
+                    self._failures.pop(path, None)
+                    written += len(entries)
+                else:
+                    self._retry_later(path, entries)
+
+        return written
+
+    def _retry_later(self, db_path, entries):
+        """将写入失败的日志放回队首（保持顺序），连续失败过多时丢弃"""
+        attempts = self._failures.get(db_path, (0, 0))[0] + 1
+        if attempts >= MAX_WRITE_ATTEMPTS:
+            self._failures.pop(db_path, None)
+            logger.error('操作日志连续 %d 次写入失败，丢弃 %d 条: %s', attempts, len(entries), db_path)
+            return
+
+        self._failures[db_path] = (attempts, time.monotonic() + RETRY_BACKOFF * 2 ** (attempts - 1))
+        with self._lock:
+            self._pending[:0] = entries
+
+    def _write(self, db_path, rows):
+        """写入一个数据库的日志，返回是否成功（失败时由调用方重试）"""
+        # 数据库已被删除时丢弃日志，避免重新创建空数据库文件
+        if not os.path.exists(db_path):
+            return True
+
+        # 使用单独的连接，不影响请求中未提交的事务
+        conn = self.connections.acquire(db_path)
+        try:
+            conn.executemany('''
+                INSERT INTO operation_logs (operation_type, entry_count, description, operation_date)
+                VALUES (?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+            return True
+        except Exception:
+            logger.warning('写入操作日志失败，稍后重试: %s', db_path, exc_info=True)
+            return False
+        finally:
+            self.connections.release(db_path, conn)
+
+    def close(self):
+        """停止后台线程并写入剩余日志"""
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+        # 仍未写入的日志不再保留（fork 前调用时避免子进程继承后重复写入）
+        with self._lock:
+            if self._pending:
+                logger.error('停止时仍有 %d 条操作日志未能写入，已丢弃', len(self._pending))
+                self._pending = []
+            self._failures.clear()
+
+
+def register_shutdown_flush(writer):
+    """进程退出时写入剩余日志"""
+    atexit.register(writer.close)
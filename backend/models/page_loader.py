@@ -0,0 +1,82 @@
+"""
+分页数据加载器
+
+一次性批量获取一页英文条目在所有激活语言下的翻译，
+查询次数只与语言数量有关，与每页条目数无关。
+"""
+
+import base64
+import json
+
+# SQLite 默认的绑定参数上限为 999，分批查询时每批不超过该数量
+MAX_BATCH_SIZE = 900
+
+
+def _chunks(items, size=MAX_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def page_languages(languages, language=None):
+    """返回条目中包含的语言：language 指定且已激活时只返回该语言"""
+    if language and language in languages:
+        return [language]
+    return languages
+
+
+def load_translation_page(cursor, storage, rows, languages, language=None):
+    """将英文表查询结果组装为接口返回的翻译条目列表
+
+    rows 为 (id, english_text, translation_key, tag, created_at, updated_at) 元组，
+    language 指定时只返回该语言的翻译。
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+
+    # 只返回单一语言时，无需查询其他语言
+    query_languages = page_languages(languages, language)
+
+    texts = storage.fetch_texts(cursor, query_languages, [row[0] for row in rows])
+
+    translations = []
+    for english_id, content, key, tag, created_at, updated_at in rows:
+        translations_dict = {}
+        for lang in query_languages:
+            if lang == 'english':
+                translations_dict[lang] = content
+            else:
+                translations_dict[lang] = texts[lang].get(english_id)
+
+        translations.append({
+            'english_id': english_id,
+            'english': content,
+            'key': key,
+            'tag': tag,
+            'tags': [tag] if tag else [],
+            'translations': translations_dict,
+            'created_at': created_at,
+            'updated_at': updated_at
+        })
+
+    return translations
+
+
+def encode_cursor(direction, english_id):
+    """生成分页游标，direction 为 'after'（更早的条目）或 'before'（更新的条目）"""
+    payload = json.dumps({direction: english_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """解析分页游标，返回 (direction, english_id)，游标无效时抛出 ValueError"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        (direction, english_id), = payload.items()
+    except Exception:
+        raise ValueError('无效的分页游标')
+
+    if direction not in ('after', 'before') or not isinstance(english_id, int):
+        raise ValueError('无效的分页游标')
+    return direction, english_id
@@ -0,0 +1,175 @@
+"""
+翻译条目 JSON 片段缓存
+
+列表与搜索接口按 (数据库, english_id, 返回的语言列表) 缓存每个条目序列化后的 JSON 字节，
+命中的条目既不查询各语言的翻译也不重新编码，响应体由缓存的片段直接拼接。
+
+缓存按条目数与总字节数限制大小，超出时淘汰最久未使用的片段。每个数据库记录缓存内容
+对应的数据版本（data_version）：写操作提交后调用 invalidate_row_fragments 删除受影响的条目
+并推进版本；其他进程的写操作使版本变化时，读取方发现版本不一致会清空该数据库的缓存。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+from .metrics import metrics
+from .page_loader import load_translation_page, page_languages
+
+DEFAULT_MAX_ENTRIES = 50000
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# 拼接响应体时占位的字符串（序列化后为 "\u0000rows\u0000"，不会与正常数据冲突）
+_ROWS_PLACEHOLDER = '\0rows\0'
+
+
+class RowFragmentCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # {(数据库, english_id, 语言元组): 片段}，按最近使用排序
+        self._entries = OrderedDict()
+        # {(数据库, english_id): {缓存键}}
+        self._by_row = {}
+        # {数据库: 缓存内容对应的数据版本}
+        self._versions = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def size(self):
+        """缓存片段的总字节数"""
+        with self._lock:
+            return self._size
+
+    def _remove_locked(self, key):
+        fragment = self._entries.pop(key)
+        self._size -= len(fragment)
+        row = key[:2]
+        keys = self._by_row.get(row)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_row[row]
+
+    def _clear_locked(self, db_key):
+        for key in [key for key in self._entries if key[0] == db_key]:
+            self._remove_locked(key)
+
+    def get_many(self, db_path, version, english_ids, languages):
+        """返回 {english_id: 片段}，version 为读取数据之前查询到的数据版本"""
+        db_key = os.path.abspath(db_path)
+        languages = tuple(languages)
+        found = {}
+        with self._lock:
+            if self._versions.get(db_key) != version:
+                self._clear_locked(db_key)
+                self._versions[db_key] = version
+                return found
+
+            for english_id in english_ids:
+                key = (db_key, english_id, languages)
+                fragment = self._entries.get(key)
+                if fragment is not None:
+                    self._entries.move_to_end(key)
+                    found[english_id] = fragment
+        return found
+
+    def put_many(self, db_path, version, languages, fragments):
+        """缓存 {english_id: 片段}，期间数据版本已变化时不缓存"""
+        db_key = os.path.abspath(db_path)
+        languages = tuple(languages)
+        with self._lock:
+            if self._versions.get(db_key) != version:
+                return
+
+            for english_id, fragment in fragments.items():
+                key = (db_key, english_id, languages)
+                if key in self._entries:
+                    self._remove_locked(key)
+                self._entries[key] = fragment
+                self._by_row.setdefault(key[:2], set()).add(key)
+                self._size += len(fragment)
+
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                self._remove_locked(next(iter(self._entries)))
+
+    def invalidate(self, db_path, english_ids=None, version=None):
+        """写操作提交后调用：删除指定条目的片段，english_ids 为空时清空该数据库的缓存
+
+        version 为写操作递增后的数据版本，恰好比缓存的版本大 1 时只删除指定条目，
+        否则（期间有其他写操作）清空该数据库的缓存。
+        """
+        db_key = os.path.abspath(db_path)
+        with self._lock:
+            known = self._versions.get(db_key)
+            if english_ids is not None and version is not None and known is not None and version == known + 1:
+                for english_id in english_ids:
+                    for key in list(self._by_row.get((db_key, english_id), ())):
+                        self._remove_locked(key)
+            else:
+                self._clear_locked(db_key)
+
+            if version is None:
+                self._versions.pop(db_key, None)
+            else:
+                self._versions[db_key] = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_row.clear()
+            self._versions.clear()
+            self._size = 0
+
+
+row_cache = RowFragmentCache()
+
+
+def invalidate_row_fragments(db_path, english_ids=None, version=None):
+    """使条目片段缓存失效（见 RowFragmentCache.invalidate）"""
+    row_cache.invalidate(db_path, english_ids, version)
+
+
+def _dumps(value):
+    # 与 jsonify 的非调试输出一致（紧凑分隔符、按键排序）
+    return current_app.json.dumps(value, separators=(',', ':'))
+
+
+def load_translation_fragments(cursor, storage, rows, languages, language, db_path, version):
+    """与 load_translation_page 相同，但返回每个条目序列化后的 JSON 片段，优先使用缓存
+
+    version 为查询 rows 之前读取的数据版本，只为缓存未命中的条目查询翻译。
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+
+    query_languages = page_languages(languages, language)
+    fragments = row_cache.get_many(db_path, version, [row[0] for row in rows], query_languages)
+
+    missing = [row for row in rows if row[0] not in fragments]
+    metrics.record_cache('row_fragments', True, len(rows) - len(missing))
+    metrics.record_cache('row_fragments', False, len(missing))
+
+    if missing:
+        entries = load_translation_page(cursor, storage, missing, languages, language)
+        fresh = {entry['english_id']: _dumps(entry).encode('utf-8') for entry in entries}
+        row_cache.put_many(db_path, version, query_languages, fresh)
+        fragments.update(fresh)
+
+    return [fragments[row[0]] for row in rows]
+
+
+def fragment_response(payload, field, fragments):
+    """生成与 jsonify(payload) 相同的 JSON 响应，payload[field] 为条目片段拼接成的数组"""
+    head, tail = _dumps({**payload, field: _ROWS_PLACEHOLDER}).split(_dumps(_ROWS_PLACEHOLDER), 1)
+    body = b''.join((head.encode('utf-8'), b'[', b','.join(fragments), b']', tail.encode('utf-8'), b'\n'))
+    return current_app.response_class(body, mimetype=current_app.json.mimetype)
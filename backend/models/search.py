@@ -0,0 +1,308 @@
+"""
+全文搜索索引
+
+基于 SQLite FTS5 为英文内容、翻译 key 以及所有激活语言的翻译建立索引，
+由触发器与英文表、各语言表（或长表 translations）保持同步。
+
+索引中每条记录对应 (英文条目, 语言) 的一段文本，rowid 编码为
+english_id * SLOT_COUNT + 语言槽位，因此可以按 rowid 精确更新/删除，
+并按槽位限定搜索语言。
+"""
+
+import os
+import sqlite3
+import threading
+
+from .database import LANGUAGES, LAYOUT_LONG, db_config, get_storage_layout
+from .tags import TAG_JOIN, TAG_FILTER
+
+SEARCH_TABLE = 'search_index'
+
+# 每个英文条目在索引中占用的槽位数，槽位 0..len(LANGUAGES)-1 对应各语言
+SLOT_COUNT = 64
+KEY_SLOT = SLOT_COUNT - 1
+
+# trigram 分词器（SQLite 3.34+）支持任意子串匹配，适用于中日韩等无空格文本
+TRIGRAM_AVAILABLE = sqlite3.sqlite_version_info >= (3, 34, 0)
+
+# 已确认建立索引的数据库 {数据库绝对路径: (schema_version, 分词器)}
+# 表结构变化（包括其他进程替换数据库文件、增删语言表）时重新检查
+_ready = {}
+_ready_lock = threading.Lock()
+
+
+def search_slot(language):
+    """获取语言（或 'key'）在索引中的槽位"""
+    if language == 'key':
+        return KEY_SLOT
+    return LANGUAGES.index(language)
+
+
+def slot_language(slot):
+    """槽位对应的语言名称"""
+    if slot == KEY_SLOT:
+        return 'key'
+    return LANGUAGES[slot]
+
+
+def _text_condition(column):
+    return f"{column} IS NOT NULL AND {column} != ''"
+
+
+def install_language_search_triggers(cursor, language):
+    """为语言表创建同步索引的触发器"""
+    slot = search_slot(language)
+    column = f'{language}_text'
+    rowid = f'english_id * {SLOT_COUNT} + {slot}'
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{language}_ai AFTER INSERT ON {language}
+        WHEN {_text_condition('NEW.' + column)}
+        BEGIN
+            INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, content)
+            VALUES (NEW.{rowid}, NEW.{column});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{language}_au AFTER UPDATE OF {column}, english_id ON {language}
+        BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.{rowid};
+            INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, content)
+            SELECT NEW.{rowid}, NEW.{column} WHERE {_text_condition('NEW.' + column)};
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{language}_ad AFTER DELETE ON {language}
+        BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.{rowid};
+        END
+    ''')
+
+
+def _slot_expression(column):
+    """由语言名称列计算槽位的 SQL 表达式，未知语言为 NULL"""
+    cases = ' '.join(f"WHEN '{lang}' THEN {slot}" for slot, lang in enumerate(LANGUAGES))
+    return f'(CASE {column} {cases} END)'
+
+
+def install_long_format_search_triggers(cursor):
+    """为长表 translations 创建同步索引的触发器"""
+    new_rowid = f"NEW.english_id * {SLOT_COUNT} + {_slot_expression('NEW.language')}"
+    old_rowid = f"OLD.english_id * {SLOT_COUNT} + {_slot_expression('OLD.language')}"
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_translations_ai AFTER INSERT ON translations
+        WHEN {_text_condition('NEW.text')} AND {new_rowid} IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, content) VALUES ({new_rowid}, NEW.text);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_translations_au AFTER UPDATE OF text, english_id, language ON translations
+        BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = {old_rowid};
+            INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, content)
+            SELECT {new_rowid}, NEW.text WHERE {_text_condition('NEW.text')} AND {new_rowid} IS NOT NULL;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_translations_ad AFTER DELETE ON translations
+        BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = {old_rowid};
+        END
+    ''')
+
+
+def _install_english_search_triggers(cursor):
+    base = f'id * {SLOT_COUNT}'
+    key = f'id * {SLOT_COUNT} + {KEY_SLOT}'
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_english_ai AFTER INSERT ON english
+        BEGIN
+            INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, content) VALUES (NEW.{base}, NEW.english_text);
+            INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, content)
+            SELECT NEW.{key}, NEW.translation_key WHERE {_text_condition('NEW.translation_key')};
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_english_au AFTER UPDATE OF english_text, translation_key ON english
+        BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid IN (OLD.{base}, OLD.{key});
+            INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, content) VALUES (NEW.{base}, NEW.english_text);
+            INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, content)
+            SELECT NEW.{key}, NEW.translation_key WHERE {_text_condition('NEW.translation_key')};
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_english_ad AFTER DELETE ON english
+        BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid BETWEEN OLD.{base} AND OLD.{base} + {SLOT_COUNT - 1};
+        END
+    ''')
+
+
+def _existing_language_tables(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    tables = {row[0] for row in cursor.fetchall()}
+    return [lang for lang in LANGUAGES if lang != 'english' and lang in tables]
+
+
+def rebuild_search_index(cursor):
+    """根据英文表和各语言表重建全部索引数据"""
+    cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+    cursor.execute(f'''
+        INSERT INTO {SEARCH_TABLE} (rowid, content)
+        SELECT id * {SLOT_COUNT}, english_text FROM english
+    ''')
+    cursor.execute(f'''
+        INSERT INTO {SEARCH_TABLE} (rowid, content)
+        SELECT id * {SLOT_COUNT} + {KEY_SLOT}, translation_key FROM english
+        WHERE {_text_condition('translation_key')}
+    ''')
+    if get_storage_layout(cursor) == LAYOUT_LONG:
+        cursor.execute(f'''
+            INSERT INTO {SEARCH_TABLE} (rowid, content)
+            SELECT english_id * {SLOT_COUNT} + slot, text
+            FROM (SELECT english_id, text, {_slot_expression('language')} AS slot FROM translations)
+            WHERE slot IS NOT NULL AND {_text_condition('text')}
+        ''')
+        return
+
+    for lang in _existing_language_tables(cursor):
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, content)
+            SELECT english_id * {SLOT_COUNT} + {search_slot(lang)}, {lang}_text FROM {lang}
+            WHERE {_text_condition(lang + '_text')}
+            ORDER BY id DESC
+        ''')
+
+
+def install_search_index(cursor):
+    """创建索引表与触发器，索引表为新建时导入已有数据
+
+    返回索引使用的分词器名称。
+    """
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,))
+    row = cursor.fetchone()
+    created = row is None
+
+    if created:
+        tokenizer = 'trigram' if TRIGRAM_AVAILABLE else 'unicode61'
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(content, tokenize = '{tokenizer}')
+        ''')
+    else:
+        tokenizer = 'trigram' if 'trigram' in row[0] else 'unicode61'
+
+    _install_english_search_triggers(cursor)
+    if get_storage_layout(cursor) == LAYOUT_LONG:
+        install_long_format_search_triggers(cursor)
+    else:
+        for lang in _existing_language_tables(cursor):
+            install_language_search_triggers(cursor, lang)
+
+    if created:
+        rebuild_search_index(cursor)
+
+    return tokenizer
+
+
+def remove_language_from_search_index(cursor, language):
+    """删除某语言的全部索引数据（语言表被删除或停用前调用）"""
+    cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid % {SLOT_COUNT} = ?', (search_slot(language),))
+
+
+def _schema_version(cursor):
+    return cursor.execute('PRAGMA schema_version').fetchone()[0]
+
+
+def ensure_search_index(db_path):
+    """确保数据库已建立搜索索引，返回分词器（表结构未变化时不重复检查）"""
+    key = os.path.abspath(db_path)
+    with db_config.connections.connection(db_path) as conn:
+        cursor = conn.cursor()
+        schema_version = _schema_version(cursor)
+        with _ready_lock:
+            cached = _ready.get(key)
+            if cached is not None and cached[0] == schema_version:
+                return cached[1]
+
+            tokenizer = install_search_index(cursor)
+            conn.commit()
+            # 新建索引表或触发器会改变 schema_version
+            _ready[key] = (_schema_version(cursor), tokenizer)
+            return tokenizer
+
+
+def mark_search_index_ready(db_path, tokenizer):
+    """记录数据库已建立索引（由 init_db 调用）"""
+    with db_config.connections.connection(db_path) as conn:
+        schema_version = _schema_version(conn.cursor())
+    with _ready_lock:
+        _ready[os.path.abspath(db_path)] = (schema_version, tokenizer)
+
+
+def _match_expression(query, tokenizer):
+    """将用户输入转换为 FTS5 查询表达式，无法使用索引时返回 None"""
+    if tokenizer == 'trigram':
+        # trigram 按子串匹配（天然包含前缀匹配），查询至少需要 3 个字符
+        if len(query) < 3:
+            return None
+        return '"' + query.replace('"', '""') + '"'
+
+    # unicode61 分词：每个词按前缀匹配，多个词同时出现
+    terms = [term.replace('"', '""') for term in query.split()]
+    if not terms:
+        return None
+    return ' AND '.join(f'"{term}"*' for term in terms)
+
+
+def search_entries(cursor, query, tokenizer, scope=None, tag=None, limit=50, offset=0):
+    """搜索英文条目
+
+    scope 为语言名称（或 'key'）列表，限定在这些文本中匹配；
+    结果按相关度排序，返回 (总数, 英文表行列表)。
+    """
+    match = _match_expression(query, tokenizer)
+    if match is not None:
+        conditions = [f'{SEARCH_TABLE} MATCH ?']
+        params = [match]
+    else:
+        # 查询过短时退化为对索引表的 LIKE 扫描
+        escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        conditions = ["content LIKE ? ESCAPE '\\'"]
+        params = [f'%{escaped}%']
+
+    if scope:
+        slots = ','.join(str(search_slot(lang)) for lang in scope)
+        conditions.append(f'rowid % {SLOT_COUNT} IN ({slots})')
+
+    hits = f'''
+        SELECT rowid / {SLOT_COUNT} AS english_id, MIN(rank) AS score
+        FROM {SEARCH_TABLE}
+        WHERE {' AND '.join(conditions)}
+        GROUP BY english_id
+    '''
+
+    where_clause = ''
+    if tag and tag != 'all':
+        where_clause = f' WHERE {TAG_FILTER}'
+        params.append(tag)
+
+    cursor.execute(f'''
+        SELECT COUNT(*) FROM ({hits}) hits
+        JOIN english e ON e.id = hits.english_id{where_clause}
+    ''', params)
+    total_count = cursor.fetchone()[0]
+
+    cursor.execute(f'''
+        SELECT e.id, e.english_text, e.translation_key, t.name, e.created_at, e.updated_at
+        FROM ({hits}) hits
+        JOIN english e ON e.id = hits.english_id
+        {TAG_JOIN}{where_clause}
+        ORDER BY hits.score, e.id DESC
+        LIMIT ? OFFSET ?
+    ''', params + [limit, offset])
+
+    return total_count, cursor.fetchall()
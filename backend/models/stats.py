@@ -0,0 +1,255 @@
+"""
+翻译进度统计
+
+translation_stats 表按 (标签, 语言) 记录非空翻译的条目数，由触发器在写入时实时维护，
+读取完整的完成度矩阵只需读取 标签数 × 语言数 行，与条目总数无关。
+
+  tag_id    标签 id，未设置标签的条目记为 0
+  language  语言名称；'*' 行记录该标签下的条目总数
+  translated  条目数
+
+translated_languages 视图列出每个条目已有非空翻译的语言（英文除外），
+每语言表布局下语言表增删时需要调用 refresh_translated_languages_view 重建。
+"""
+
+from .database import LANGUAGES, LAYOUT_LONG, get_storage_layout
+
+STATS_TABLE = 'translation_stats'
+
+# 条目总数使用的语言名称
+TOTAL_KEY = '*'
+
+
+def _non_empty(column):
+    return f"{column} IS NOT NULL AND {column} != ''"
+
+
+def _add(tag_expr, language_expr, delta, source='', where='1'):
+    """累加统计值的 SQL（不存在时插入），source 为可选的 FROM 子句"""
+    return f'''
+        INSERT INTO {STATS_TABLE} (tag_id, language, translated)
+        SELECT {tag_expr}, {language_expr}, {delta}{source}
+        WHERE {where}
+        ON CONFLICT (tag_id, language) DO UPDATE SET translated = translated + excluded.translated;
+    '''
+
+
+# 通过英文条目获取标签（条目已被删除时不产生行）
+ENTRY_SOURCE = ' FROM english e'
+ENTRY_TAG = 'COALESCE(e.tag_id, 0)'
+
+
+def _language_tables(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    tables = {row[0] for row in cursor.fetchall()}
+    return [lang for lang in LANGUAGES if lang != 'english' and lang in tables]
+
+
+def refresh_translated_languages_view(cursor):
+    """按当前布局（及现有语言表）重建 translated_languages 视图"""
+    cursor.execute('DROP VIEW IF EXISTS translated_languages')
+
+    if get_storage_layout(cursor) == LAYOUT_LONG:
+        select = f'''
+            SELECT english_id, language FROM translations WHERE {_non_empty('text')}
+        '''
+    else:
+        arms = [
+            f"SELECT english_id, '{lang}' AS language FROM {lang} WHERE {_non_empty(lang + '_text')}"
+            for lang in _language_tables(cursor)
+        ]
+        select = '\nUNION ALL\n'.join(arms) or 'SELECT NULL AS english_id, NULL AS language WHERE 0'
+
+    cursor.execute(f'CREATE VIEW translated_languages AS {select}')
+
+
+def _install_english_stats_triggers(cursor):
+    old_tag = 'COALESCE(OLD.tag_id, 0)'
+    new_tag = 'COALESCE(NEW.tag_id, 0)'
+    old_languages = ' FROM (SELECT DISTINCT language FROM translated_languages WHERE english_id = OLD.id)'
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_english_ai AFTER INSERT ON english
+        BEGIN
+            {_add(new_tag, f"'{TOTAL_KEY}'", 1)}
+            {_add(new_tag, "'english'", 1, where=_non_empty('NEW.english_text'))}
+        END
+    ''')
+    # 修改标签时，条目的所有统计从原标签移到新标签
+    tag_changed = 'OLD.tag_id IS NOT NEW.tag_id'
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_english_au AFTER UPDATE OF english_text, tag_id ON english
+        BEGIN
+            {_add(old_tag, "'english'", -1, where=_non_empty('OLD.english_text'))}
+            {_add(new_tag, "'english'", 1, where=_non_empty('NEW.english_text'))}
+            {_add(old_tag, f"'{TOTAL_KEY}'", -1, where=tag_changed)}
+            {_add(new_tag, f"'{TOTAL_KEY}'", 1, where=tag_changed)}
+            {_add(old_tag, 'language', -1, old_languages, tag_changed)}
+            {_add(new_tag, 'language', 1, old_languages, tag_changed)}
+        END
+    ''')
+    # 删除条目时级联删除的翻译行已找不到所属条目，在删除前统一扣减
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_english_bd BEFORE DELETE ON english
+        BEGIN
+            {_add(old_tag, f"'{TOTAL_KEY}'", -1)}
+            {_add(old_tag, "'english'", -1, where=_non_empty('OLD.english_text'))}
+            {_add(old_tag, 'language', -1, old_languages)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_tags_ad AFTER DELETE ON tags
+        BEGIN
+            DELETE FROM {STATS_TABLE} WHERE tag_id = OLD.id;
+        END
+    ''')
+
+
+def install_language_stats_triggers(cursor, language):
+    """为语言表创建维护统计的触发器（同一条目有多行翻译时只计一次）"""
+    column = f'{language}_text'
+
+    def others(row):
+        return (
+            f'NOT EXISTS (SELECT 1 FROM {language} o WHERE o.english_id = {row}.english_id '
+            f'AND o.id != {row}.id AND {_non_empty("o." + column)})'
+        )
+
+    new_condition = f"e.id = NEW.english_id AND {_non_empty('NEW.' + column)} AND {others('NEW')}"
+    old_condition = f"e.id = OLD.english_id AND {_non_empty('OLD.' + column)} AND {others('OLD')}"
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_{language}_ai AFTER INSERT ON {language}
+        BEGIN
+            {_add(ENTRY_TAG, f"'{language}'", 1, ENTRY_SOURCE, new_condition)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_{language}_au AFTER UPDATE OF {column}, english_id ON {language}
+        BEGIN
+            {_add(ENTRY_TAG, f"'{language}'", -1, ENTRY_SOURCE, old_condition)}
+            {_add(ENTRY_TAG, f"'{language}'", 1, ENTRY_SOURCE, new_condition)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_{language}_ad AFTER DELETE ON {language}
+        BEGIN
+            {_add(ENTRY_TAG, f"'{language}'", -1, ENTRY_SOURCE, old_condition)}
+        END
+    ''')
+
+
+def install_long_format_stats_triggers(cursor):
+    """为长表 translations 创建维护统计的触发器"""
+    new_condition = f"e.id = NEW.english_id AND {_non_empty('NEW.text')}"
+    old_condition = f"e.id = OLD.english_id AND {_non_empty('OLD.text')}"
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_translations_ai AFTER INSERT ON translations
+        BEGIN
+            {_add(ENTRY_TAG, 'NEW.language', 1, ENTRY_SOURCE, new_condition)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_translations_au AFTER UPDATE OF text, english_id, language ON translations
+        BEGIN
+            {_add(ENTRY_TAG, 'OLD.language', -1, ENTRY_SOURCE, old_condition)}
+            {_add(ENTRY_TAG, 'NEW.language', 1, ENTRY_SOURCE, new_condition)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_translations_ad AFTER DELETE ON translations
+        BEGIN
+            {_add(ENTRY_TAG, 'OLD.language', -1, ENTRY_SOURCE, old_condition)}
+        END
+    ''')
+
+
+def rebuild_stats(cursor):
+    """根据现有数据重新计算全部统计"""
+    cursor.execute(f'DELETE FROM {STATS_TABLE}')
+    cursor.execute(f'''
+        INSERT INTO {STATS_TABLE} (tag_id, language, translated)
+        SELECT COALESCE(tag_id, 0), '{TOTAL_KEY}', COUNT(*) FROM english GROUP BY 1
+    ''')
+    cursor.execute(f'''
+        INSERT INTO {STATS_TABLE} (tag_id, language, translated)
+        SELECT COALESCE(tag_id, 0), 'english', COUNT(*) FROM english
+        WHERE {_non_empty('english_text')} GROUP BY 1
+    ''')
+    cursor.execute(f'''
+        INSERT INTO {STATS_TABLE} (tag_id, language, translated)
+        SELECT COALESCE(e.tag_id, 0), v.language, COUNT(*)
+        FROM (SELECT DISTINCT english_id, language FROM translated_languages) v
+        JOIN english e ON e.id = v.english_id
+        GROUP BY 1, 2
+    ''')
+
+
+def install_stats(cursor):
+    """创建统计表、视图与触发器，统计表为新建时根据已有数据计算"""
+    cursor.execute(f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{STATS_TABLE}'")
+    created = cursor.fetchone() is None
+
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+            tag_id INTEGER NOT NULL,
+            language TEXT NOT NULL,
+            translated INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (tag_id, language)
+        ) WITHOUT ROWID
+    ''')
+
+    refresh_translated_languages_view(cursor)
+    _install_english_stats_triggers(cursor)
+    if get_storage_layout(cursor) == LAYOUT_LONG:
+        install_long_format_stats_triggers(cursor)
+    else:
+        for lang in _language_tables(cursor):
+            install_language_stats_triggers(cursor, lang)
+
+    if created:
+        rebuild_stats(cursor)
+
+
+def remove_language_stats(cursor, language):
+    """删除某语言的全部统计（语言被停用时调用）"""
+    cursor.execute(f'DELETE FROM {STATS_TABLE} WHERE language = ?', (language,))
+
+
+def completion_matrix(cursor, languages):
+    """读取 标签 × 语言 的完成度矩阵
+
+    返回 (总计, 各标签列表)，每项包含条目总数 total、各语言已翻译数 translated
+    与完成度 completion（0~1）。未设置标签的条目作为 tag 为 None 的一项。
+    """
+    cursor.execute('SELECT id, name FROM tags ORDER BY name')
+    tag_rows = cursor.fetchall()
+
+    cursor.execute(f'SELECT tag_id, language, translated FROM {STATS_TABLE}')
+    counts = {}
+    for tag_id, language, translated in cursor.fetchall():
+        counts.setdefault(tag_id, {})[language] = translated
+
+    def summarize(tag_counts):
+        total = tag_counts.get(TOTAL_KEY, 0)
+        translated = {lang: tag_counts.get(lang, 0) for lang in languages}
+        return {
+            'total': total,
+            'translated': translated,
+            'completion': {lang: round(count / total, 4) if total else 0 for lang, count in translated.items()}
+        }
+
+    tags = []
+    for tag_id, name in tag_rows:
+        tags.append(dict(tag=name, **summarize(counts.get(tag_id, {}))))
+    untagged = counts.get(0, {})
+    if untagged.get(TOTAL_KEY):
+        tags.append(dict(tag=None, **summarize(untagged)))
+
+    overall = {}
+    for tag_counts in counts.values():
+        for language, translated in tag_counts.items():
+            overall[language] = overall.get(language, 0) + translated
+
+    return summarize(overall), tags
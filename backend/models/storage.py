@@ -0,0 +1,579 @@
+"""
+翻译存储布局
+
+支持两种布局，路由与各模块通过 get_storage() 获取的存储对象读写翻译，
+无需关心数据库使用哪一种：
+
+  PerLanguageStorage  每种语言一张表（{语言}.{语言}_text），为默认布局
+  LongFormatStorage   所有语言存放在 translations(english_id, language, text, updated_at) 单表中，
+                      主键为 (english_id, language)，读取一页或全部语言的翻译只需一次索引范围扫描
+
+migrate_to_long_format() 在服务运行期间将每语言表布局的数据库在线迁移为单表布局。
+"""
+
+import os
+import sqlite3
+import threading
+
+from .database import (
+    LANGUAGES, LAYOUT_LONG, LAYOUT_PER_LANGUAGE, db_config,
+    bump_data_version, get_storage_layout
+)
+from .metrics import metrics
+from .page_loader import MAX_BATCH_SIZE
+
+# 迁移时每批复制的行数（每批单独提交，避免长时间持有写锁）
+MIGRATION_BATCH_SIZE = 5000
+
+# 每次从游标读取的行数
+FETCH_BATCH_SIZE = 1000
+
+
+def _chunks(items, size=MAX_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _iter_rows(cursor):
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def _table_names(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def create_long_format_table(cursor):
+    """创建单表布局的 translations 表"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS translations (
+            english_id INTEGER NOT NULL,
+            language TEXT NOT NULL,
+            text TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (english_id, language),
+            FOREIGN KEY (english_id) REFERENCES english (id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    # 按语言读取、停用语言时使用
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_translations_language ON translations (language, english_id)
+    ''')
+
+
+class _LanguageStream:
+    """按 english_id 升序读取某语言表，供归并连接逐条推进"""
+
+    def __init__(self, conn, language):
+        cursor = conn.execute(f'''
+            SELECT english_id, {language}_text FROM {language}
+            ORDER BY english_id, id
+        ''')
+        self._rows = _iter_rows(cursor)
+        self._current = next(self._rows, None)
+
+    def text_for(self, english_id):
+        """推进到 english_id 并返回其翻译（同一条目有多条翻译时取最早的一条）"""
+        row = self._current
+        while row is not None and row[0] < english_id:
+            row = next(self._rows, None)
+
+        text = None
+        if row is not None and row[0] == english_id:
+            text = row[1]
+            while row is not None and row[0] == english_id:
+                row = next(self._rows, None)
+
+        self._current = row
+        return text
+
+
+class _PerLanguageMerger:
+    """每语言表布局：每种语言各一个有序游标"""
+
+    def __init__(self, conn, languages):
+        self._streams = {lang: _LanguageStream(conn, lang) for lang in languages}
+
+    def texts_for(self, english_id):
+        return {lang: stream.text_for(english_id) for lang, stream in self._streams.items()}
+
+
+class _LongFormatMerger:
+    """单表布局：一次按主键顺序扫描 translations，同一条目的各语言翻译相邻"""
+
+    def __init__(self, conn, languages):
+        self._languages = languages
+        if languages:
+            placeholders = ','.join('?' * len(languages))
+            cursor = conn.execute(f'''
+                SELECT english_id, language, text FROM translations
+                WHERE language IN ({placeholders})
+                ORDER BY english_id
+            ''', languages)
+            self._rows = _iter_rows(cursor)
+        else:
+            self._rows = iter(())
+        self._current = next(self._rows, None)
+
+    def texts_for(self, english_id):
+        texts = dict.fromkeys(self._languages)
+        row = self._current
+        while row is not None and row[0] < english_id:
+            row = next(self._rows, None)
+        while row is not None and row[0] == english_id:
+            texts[row[1]] = row[2]
+            row = next(self._rows, None)
+        self._current = row
+        return texts
+
+
+class PerLanguageStorage:
+    """每种语言一张表的存储布局"""
+
+    layout = LAYOUT_PER_LANGUAGE
+
+    def create_language(self, cursor, language):
+        """激活语言时创建语言表，并将写入同步到搜索索引"""
+        from .search import install_language_search_triggers
+        from .stats import install_language_stats_triggers, refresh_translated_languages_view
+
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {language} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                english_id INTEGER NOT NULL,
+                {language}_text TEXT,
+                translation_key TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (english_id) REFERENCES english (id) ON DELETE CASCADE
+            )
+        ''')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{language}_english_id ON {language} (english_id)')
+        install_language_search_triggers(cursor, language)
+        install_language_stats_triggers(cursor, language)
+        refresh_translated_languages_view(cursor)
+
+    def drop_language(self, cursor, language):
+        """删除语言的全部翻译及其搜索索引"""
+        from .search import remove_language_from_search_index
+        from .stats import refresh_translated_languages_view, remove_language_stats
+
+        remove_language_from_search_index(cursor, language)
+        cursor.execute(f'DROP TABLE IF EXISTS {language}')
+        remove_language_stats(cursor, language)
+        refresh_translated_languages_view(cursor)
+        bump_data_version(cursor)
+
+    def fetch_texts(self, cursor, languages, english_ids):
+        """批量获取指定条目在各语言下的翻译
+
+        返回 {语言: {english_id: 翻译内容}}，英文不在结果中（由调用方从英文表读取）。
+        """
+        english_ids = list(english_ids)
+        texts = {}
+
+        for lang in languages:
+            if lang == 'english':
+                continue
+
+            lang_texts = {}
+            for batch in _chunks(english_ids):
+                placeholders = ','.join('?' * len(batch))
+                cursor.execute(f'''
+                    SELECT english_id, {lang}_text FROM {lang}
+                    WHERE english_id IN ({placeholders})
+                    ORDER BY id
+                ''', batch)
+                for english_id, text in cursor.fetchall():
+                    # 与逐条查询时的 fetchone 行为保持一致，保留最早的一条翻译
+                    lang_texts.setdefault(english_id, text)
+
+            texts[lang] = lang_texts
+
+        return texts
+
+    def text_merger(self, conn, languages):
+        """按 english_id 升序归并读取各语言翻译，texts_for(english_id) 逐条推进"""
+        return _PerLanguageMerger(conn, [lang for lang in languages if lang != 'english'])
+
+    def language_export_query(self, language):
+        """导出单一语言的查询，结果为 (id, english_text, translation_key, translation)"""
+        return f'''
+            SELECT e.id, e.english_text, e.translation_key, l.{language}_text as translation
+            FROM english e
+            LEFT JOIN {language} l ON e.id = l.english_id
+            ORDER BY e.id
+        ''', ()
+
+    def add_texts(self, cursor, english_id, translations, key):
+        """为新建的条目写入各语言翻译（忽略空内容）"""
+        for lang, content in translations.items():
+            if content and lang != 'english':
+                cursor.execute(f'''
+                    INSERT INTO {lang} (english_id, {lang}_text, translation_key)
+                    VALUES (?, ?, ?)
+                ''', (english_id, content, key))
+
+    def set_texts(self, cursor, english_id, translations, key):
+        """修改条目的各语言翻译，不存在时插入"""
+        for lang, content in translations.items():
+            if lang == 'english':
+                continue
+
+            # 检查是否已存在翻译
+            cursor.execute(f'''
+                SELECT id FROM {lang} WHERE english_id = ?
+            ''', (english_id,))
+
+            if cursor.fetchone():
+                # 更新现有翻译
+                cursor.execute(f'''
+                    UPDATE {lang}
+                    SET {lang}_text = ?, translation_key = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE english_id = ?
+                ''', (content, key, english_id))
+            else:
+                # 插入新翻译
+                cursor.execute(f'''
+                    INSERT INTO {lang} (english_id, {lang}_text, translation_key)
+                    VALUES (?, ?, ?)
+                ''', (english_id, content, key))
+
+    def sync_keys(self, cursor, languages, english_ids):
+        """将条目在各语言表中的 translation_key 更新为英文表中的 key（与 set_texts 写入的 key 一致）"""
+        for lang in languages:
+            if lang == 'english':
+                continue
+            for batch in _chunks(list(english_ids)):
+                placeholders = ','.join('?' * len(batch))
+                cursor.execute(f'''
+                    UPDATE {lang}
+                    SET translation_key = (SELECT translation_key FROM english WHERE english.id = {lang}.english_id)
+                    WHERE english_id IN ({placeholders})
+                ''', batch)
+
+    def _translation_row_ids(self, cursor, language, english_ids):
+        """查询已有翻译的行，返回 {english_id: [行 id, ...]}"""
+        found = {}
+        for batch in _chunks(english_ids):
+            placeholders = ','.join('?' * len(batch))
+            cursor.execute(f'''
+                SELECT id, english_id FROM {language}
+                WHERE english_id IN ({placeholders})
+            ''', batch)
+            for row_id, english_id in cursor.fetchall():
+                found.setdefault(english_id, []).append(row_id)
+        return found
+
+    def upsert_texts(self, cursor, language, values):
+        """批量写入某语言的翻译 {english_id: 文本}：已有翻译按主键更新，其余插入"""
+        present = self._translation_row_ids(cursor, language, list(values))
+        cursor.executemany(f'''
+            UPDATE {language} SET {language}_text = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', [
+            (values[english_id], row_id)
+            for english_id, row_ids in present.items()
+            for row_id in row_ids
+        ])
+        cursor.executemany(f'''
+            INSERT INTO {language} (english_id, {language}_text)
+            VALUES (?, ?)
+        ''', [
+            (english_id, text)
+            for english_id, text in values.items()
+            if english_id not in present and text is not None
+        ])
+
+
+class LongFormatStorage:
+    """所有语言存放在 translations 单表中的存储布局"""
+
+    layout = LAYOUT_LONG
+
+    def create_language(self, cursor, language):
+        """单表布局下激活语言无需建表"""
+
+    def drop_language(self, cursor, language):
+        """删除语言的全部翻译及其搜索索引"""
+        from .search import remove_language_from_search_index
+        from .stats import remove_language_stats
+
+        remove_language_from_search_index(cursor, language)
+        cursor.execute('DELETE FROM translations WHERE language = ?', (language,))
+        remove_language_stats(cursor, language)
+        bump_data_version(cursor)
+
+    def fetch_texts(self, cursor, languages, english_ids):
+        """批量获取指定条目在各语言下的翻译，返回 {语言: {english_id: 翻译内容}}"""
+        languages = [lang for lang in languages if lang != 'english']
+        texts = {lang: {} for lang in languages}
+        if not languages:
+            return texts
+
+        language_placeholders = ','.join('?' * len(languages))
+        for batch in _chunks(list(english_ids), MAX_BATCH_SIZE - len(languages)):
+            placeholders = ','.join('?' * len(batch))
+            cursor.execute(f'''
+                SELECT english_id, language, text FROM translations
+                WHERE english_id IN ({placeholders}) AND language IN ({language_placeholders})
+            ''', batch + languages)
+            for english_id, lang, text in cursor.fetchall():
+                texts[lang][english_id] = text
+
+        return texts
+
+    def text_merger(self, conn, languages):
+        """按 english_id 升序读取各语言翻译，texts_for(english_id) 逐条推进"""
+        return _LongFormatMerger(conn, [lang for lang in languages if lang != 'english'])
+
+    def language_export_query(self, language):
+        """导出单一语言的查询，结果为 (id, english_text, translation_key, translation)"""
+        return '''
+            SELECT e.id, e.english_text, e.translation_key, t.text as translation
+            FROM english e
+            LEFT JOIN translations t ON t.english_id = e.id AND t.language = ?
+            ORDER BY e.id
+        ''', (language,)
+
+    def add_texts(self, cursor, english_id, translations, key):
+        """为新建的条目写入各语言翻译（忽略空内容）"""
+        cursor.executemany('''
+            INSERT INTO translations (english_id, language, text) VALUES (?, ?, ?)
+        ''', [
+            (english_id, lang, content)
+            for lang, content in translations.items()
+            if content and lang != 'english' and lang in LANGUAGES
+        ])
+
+    def set_texts(self, cursor, english_id, translations, key):
+        """修改条目的各语言翻译，不存在时插入"""
+        self._upsert(cursor, [
+            (english_id, lang, content)
+            for lang, content in translations.items()
+            if lang != 'english' and lang in LANGUAGES
+        ])
+
+    def sync_keys(self, cursor, languages, english_ids):
+        """单表布局的翻译不保存 key（读取时使用英文表中的 key）"""
+
+    def upsert_texts(self, cursor, language, values):
+        """批量写入某语言的翻译 {english_id: 文本}"""
+        # 与每语言表布局一致：值为 None 时只更新已有翻译，不新建
+        self._upsert(cursor, [
+            (english_id, language, text)
+            for english_id, text in values.items()
+            if text is not None
+        ])
+        cursor.executemany('''
+            UPDATE translations SET text = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE english_id = ? AND language = ?
+        ''', [
+            (english_id, language)
+            for english_id, text in values.items()
+            if text is None
+        ])
+
+    @staticmethod
+    def _upsert(cursor, rows):
+        cursor.executemany('''
+            INSERT INTO translations (english_id, language, text) VALUES (?, ?, ?)
+            ON CONFLICT (english_id, language)
+            DO UPDATE SET text = excluded.text, updated_at = CURRENT_TIMESTAMP
+        ''', rows)
+
+
+_STORAGES = {
+    LAYOUT_PER_LANGUAGE: PerLanguageStorage(),
+    LAYOUT_LONG: LongFormatStorage(),
+}
+
+# {数据库绝对路径: (schema_version, 存储对象)}
+# 迁移会修改表结构，schema_version 变化时重新读取布局（对其他进程的迁移同样有效）
+_storage_cache = {}
+_storage_lock = threading.Lock()
+
+
+def storage_for_layout(layout):
+    return _STORAGES[layout]
+
+
+def get_storage(db_path):
+    """获取数据库使用的存储对象"""
+    key = os.path.abspath(db_path)
+    with db_config.connections.connection(db_path) as conn:
+        cursor = conn.cursor()
+        schema_version = cursor.execute('PRAGMA schema_version').fetchone()[0]
+
+        with _storage_lock:
+            cached = _storage_cache.get(key)
+        hit = cached is not None and cached[0] == schema_version
+        metrics.record_cache('storage_layout', hit)
+        if hit:
+            return cached[1]
+
+        storage = _STORAGES[get_storage_layout(cursor)]
+
+    with _storage_lock:
+        _storage_cache[key] = (schema_version, storage)
+    return storage
+
+
+def invalidate_storage(db_path=None):
+    """使存储布局缓存失效，db_path 为空时清空全部缓存"""
+    with _storage_lock:
+        if db_path is None:
+            _storage_cache.clear()
+        else:
+            _storage_cache.pop(os.path.abspath(db_path), None)
+
+
+def _sync_trigger_names(language):
+    return [f'{language}_long_sync_{suffix}' for suffix in ('ai', 'au', 'ad')]
+
+
+def _install_sync_triggers(cursor, language):
+    """迁移期间将语言表的写入同步到 translations"""
+    column = f'{language}_text'
+    ai, au, ad = _sync_trigger_names(language)
+
+    # 同一条目已有翻译时保留最早的一条，与每语言表布局的读取结果一致
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {ai} AFTER INSERT ON {language}
+        BEGIN
+            INSERT OR IGNORE INTO translations (english_id, language, text)
+            VALUES (NEW.english_id, '{language}', NEW.{column});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {au} AFTER UPDATE OF {column}, english_id ON {language}
+        BEGIN
+            INSERT INTO translations (english_id, language, text)
+            VALUES (NEW.english_id, '{language}', NEW.{column})
+            ON CONFLICT (english_id, language)
+            DO UPDATE SET text = excluded.text, updated_at = CURRENT_TIMESTAMP;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {ad} AFTER DELETE ON {language}
+        BEGIN
+            DELETE FROM translations
+            WHERE english_id = OLD.english_id AND language = '{language}'
+              AND NOT EXISTS (SELECT 1 FROM {language} WHERE english_id = OLD.english_id);
+        END
+    ''')
+
+
+def _copy_language_rows(cursor, language, after_id=None, limit=None):
+    """将语言表中 id 大于 after_id 的行复制到 translations，返回复制到的最大 id"""
+    conditions = ['english_id IN (SELECT id FROM english)']
+    params = []
+    if after_id is not None:
+        conditions.append('id > ?')
+        params.append(after_id)
+
+    cursor.execute(f'''
+        SELECT MAX(id) FROM (
+            SELECT id FROM {language} WHERE {' AND '.join(conditions)}
+            ORDER BY id {'LIMIT ?' if limit else ''}
+        )
+    ''', params + ([limit] if limit else []))
+    last_id = cursor.fetchone()[0]
+    if last_id is None:
+        return None
+
+    # 按 id 升序插入，同一条目的重复翻译保留最早的一条
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO translations (english_id, language, text, updated_at)
+        SELECT english_id, '{language}', {language}_text, COALESCE(updated_at, CURRENT_TIMESTAMP)
+        FROM {language}
+        WHERE {' AND '.join(conditions)} AND id <= ?
+        ORDER BY id
+    ''', params + [last_id])
+    return last_id
+
+
+def migrate_to_long_format(db_path, batch_size=MIGRATION_BATCH_SIZE, progress=None):
+    """将每语言表布局的数据库在线迁移为单表布局
+
+    先用触发器把迁移期间的写入同步到 translations，再分批复制已有数据（每批单独提交，
+    服务可以继续读写），最后在一个短事务中删除语言表并切换布局。
+    progress(语言, 已复制到的行 id) 用于报告进度。返回 False 表示数据库已是单表布局。
+    """
+    from .search import ensure_search_index, install_long_format_search_triggers
+    from .stats import install_stats, rebuild_stats
+
+    # 确保搜索索引已建立（切换布局后复用已有索引数据）
+    ensure_search_index(db_path)
+
+    with db_config.connections.connection(db_path) as conn:
+        cursor = conn.cursor()
+        if get_storage_layout(cursor) == LAYOUT_LONG:
+            return False
+
+        tables = _table_names(cursor)
+        languages = [lang for lang in LANGUAGES if lang != 'english' and lang in tables]
+
+        create_long_format_table(cursor)
+        for lang in languages:
+            _install_sync_triggers(cursor, lang)
+        conn.commit()
+
+        # 分批复制已有数据
+        for lang in languages:
+            last_id = None
+            while True:
+                try:
+                    copied = _copy_language_rows(cursor, lang, last_id, batch_size)
+                except sqlite3.OperationalError:
+                    # 迁移期间语言被停用，语言表已删除
+                    if lang in _table_names(cursor):
+                        raise
+                    copied = None
+                conn.commit()
+                if copied is None:
+                    break
+                last_id = copied
+                if progress:
+                    progress(lang, last_id)
+
+        # 切换布局
+        cursor.execute('BEGIN IMMEDIATE')
+        tables = _table_names(cursor)
+        current = [lang for lang in LANGUAGES if lang != 'english' and lang in tables]
+
+        # 迁移期间新激活的语言表没有同步触发器，整表补充复制
+        for lang in current:
+            if lang not in languages:
+                _copy_language_rows(cursor, lang)
+
+        # 迁移期间被停用（表已删除）的语言
+        cursor.execute('SELECT DISTINCT language FROM translations')
+        removed = [row[0] for row in cursor.fetchall() if row[0] not in current]
+        for lang in removed:
+            cursor.execute('DELETE FROM translations WHERE language = ?', (lang,))
+
+        for lang in current:
+            for trigger in _sync_trigger_names(lang):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            # 语言表上的搜索索引触发器随表一起删除，索引数据保持不变
+            cursor.execute(f'DROP TABLE {lang}')
+
+        install_long_format_search_triggers(cursor)
+        bump_data_version(cursor)
+        cursor.execute('''
+            INSERT INTO app_meta (key, value) VALUES ('long_format', 1)
+            ON CONFLICT (key) DO UPDATE SET value = 1
+        ''')
+
+        # 统计改为由 translations 上的触发器维护，重新计算一次
+        install_stats(cursor)
+        rebuild_stats(cursor)
+        conn.commit()
+
+    invalidate_storage(db_path)
+    return True
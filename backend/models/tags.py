@@ -0,0 +1,81 @@
+"""
+标签
+
+英文条目通过 english.tag_id 引用 tags 表，每个标签的条目数量保存在 tags.entry_count 中，
+由 english 表上的触发器随新增、删除和修改标签实时维护，查询数量无需扫描英文表。
+"""
+
+from .page_loader import MAX_BATCH_SIZE
+
+# 查询英文条目时连接标签表，t.name 为标签名称
+TAG_JOIN = 'LEFT JOIN tags t ON t.id = e.tag_id'
+
+# 按标签名称筛选英文条目（使用 tag_id 索引）
+TAG_FILTER = 'e.tag_id = (SELECT id FROM tags WHERE name = ?)'
+
+
+def install_tag_count_triggers(cursor):
+    """创建维护 tags.entry_count 的触发器"""
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tags_count_ai AFTER INSERT ON english
+        WHEN NEW.tag_id IS NOT NULL
+        BEGIN
+            UPDATE tags SET entry_count = entry_count + 1 WHERE id = NEW.tag_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tags_count_au AFTER UPDATE OF tag_id ON english
+        WHEN OLD.tag_id IS NOT NEW.tag_id
+        BEGIN
+            UPDATE tags SET entry_count = entry_count - 1 WHERE id = OLD.tag_id;
+            UPDATE tags SET entry_count = entry_count + 1 WHERE id = NEW.tag_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tags_count_ad AFTER DELETE ON english
+        WHEN OLD.tag_id IS NOT NULL
+        BEGIN
+            UPDATE tags SET entry_count = entry_count - 1 WHERE id = OLD.tag_id;
+        END
+    ''')
+
+
+def recount_tags(cursor):
+    """根据英文表重新计算所有标签的条目数量"""
+    cursor.execute('''
+        UPDATE tags SET entry_count = (SELECT COUNT(*) FROM english WHERE tag_id = tags.id)
+    ''')
+
+
+def resolve_tag_ids(cursor, names):
+    """获取标签名称对应的 id，不存在的标签自动创建，返回 {标签名称: id}"""
+    names = list({name for name in names if name})
+    cursor.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(name,) for name in names])
+
+    ids = {}
+    for start in range(0, len(names), MAX_BATCH_SIZE):
+        batch = names[start:start + MAX_BATCH_SIZE]
+        placeholders = ','.join('?' * len(batch))
+        cursor.execute(f'SELECT name, id FROM tags WHERE name IN ({placeholders})', batch)
+        ids.update(cursor.fetchall())
+    return ids
+
+
+def resolve_tag_id(cursor, name):
+    """获取单个标签的 id（不存在时创建），名称为空时返回 None"""
+    if not name:
+        return None
+    return resolve_tag_ids(cursor, [name])[name]
+
+
+def tag_count(cursor, name):
+    """获取使用某标签的条目数量"""
+    cursor.execute('SELECT entry_count FROM tags WHERE name = ?', (name,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def list_tags(cursor):
+    """获取所有标签及其条目数量，返回 [(标签名称, 数量), ...]"""
+    cursor.execute('SELECT name, entry_count FROM tags ORDER BY name')
+    return cursor.fetchall()
@@ -0,0 +1,279 @@
+"""
+翻译记忆
+
+为英文内容建立 trigram 倒排索引，按相似度查找已有的相近条目，用于新增翻译时复用已有译文。
+
+  tm_grams      (gram, english_id) 倒排索引，另有 english_id 索引用于更新和删除
+  tm_entries    每个条目的 trigram 数量
+  tm_gram_df    每个 trigram 出现的条目数（用于挑选最少见的 trigram 生成候选）
+  tm_pending    内容有变化、尚未重建索引的条目
+
+英文表的新增、修改与删除由触发器记录到 tm_pending，写操作在提交前调用 flush_translation_memory
+在同一事务中增量更新这些条目的索引；查询只读取索引，不做任何写入。
+应用之外直接写入数据库的工具（例如基准测试的数据生成）可以调用 sync_translation_memory 补建索引。
+
+相似度为 trigram 集合的 Jaccard 系数。查询时只用查询文本中最少见的若干个 trigram
+生成候选（相似度不低于 min_score 的条目必然包含其中之一），再按条目长度过滤并精确计算相似度。
+读取的倒排列表总长度与候选数量都有上限，查询耗时与条目总数基本无关；
+查询文本全部由非常常见的 trigram 组成而超出上限时，结果为近似的 top-k。
+"""
+
+import math
+import re
+
+GRAMS_TABLE = 'tm_grams'
+ENTRIES_TABLE = 'tm_entries'
+DF_TABLE = 'tm_gram_df'
+PENDING_TABLE = 'tm_pending'
+
+# 默认的最低相似度
+DEFAULT_MIN_SCORE = 0.5
+
+# 每批重建索引的条目数（IN 查询的绑定参数不超过 SQLite 默认上限 999）
+INDEX_BATCH_SIZE = 500
+
+# 生成候选时读取的倒排列表总长度上限
+POSTINGS_BUDGET = 20000
+
+# 参与精确计算的候选条目数上限
+MAX_CANDIDATES = 300
+
+# 精确计算时每批的候选条目数与 trigram 数
+QUERY_BATCH_SIZE = 400
+
+# 查询文本只使用前若干个字符
+MAX_QUERY_LENGTH = 500
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(text):
+    """统一大小写与空白"""
+    return _WHITESPACE.sub(' ', (text or '').casefold()).strip()
+
+
+def trigrams(text):
+    """文本（规范化后首尾各补一个空格）的 trigram 集合"""
+    text = normalize(text)
+    if not text:
+        return set()
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _chunks(items, size=INDEX_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def install_translation_memory(cursor):
+    """创建索引表与触发器，索引表为新建时为已有条目建立索引"""
+    cursor.execute(f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{GRAMS_TABLE}'")
+    created = cursor.fetchone() is None
+
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {GRAMS_TABLE} (
+            gram TEXT NOT NULL,
+            english_id INTEGER NOT NULL,
+            PRIMARY KEY (gram, english_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{GRAMS_TABLE}_english_id ON {GRAMS_TABLE} (english_id)')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {ENTRIES_TABLE} (
+            english_id INTEGER PRIMARY KEY,
+            gram_count INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {DF_TABLE} (
+            gram TEXT PRIMARY KEY,
+            df INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {PENDING_TABLE} (english_id INTEGER PRIMARY KEY)')
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {PENDING_TABLE}_english_ai AFTER INSERT ON english
+        BEGIN
+            INSERT OR IGNORE INTO {PENDING_TABLE} (english_id) VALUES (NEW.id);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {PENDING_TABLE}_english_au AFTER UPDATE OF english_text ON english
+        WHEN OLD.english_text IS NOT NEW.english_text
+        BEGIN
+            INSERT OR IGNORE INTO {PENDING_TABLE} (english_id) VALUES (NEW.id);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {PENDING_TABLE}_english_ad AFTER DELETE ON english
+        BEGIN
+            INSERT OR IGNORE INTO {PENDING_TABLE} (english_id) VALUES (OLD.id);
+        END
+    ''')
+
+    if created:
+        rebuild_translation_memory(cursor)
+
+
+def rebuild_translation_memory(cursor):
+    """根据英文表重建全部索引数据"""
+    for table in (GRAMS_TABLE, ENTRIES_TABLE, DF_TABLE, PENDING_TABLE):
+        cursor.execute(f'DELETE FROM {table}')
+
+    cursor.execute('SELECT id, english_text FROM english')
+    df = {}
+    gram_rows = []
+    entry_rows = []
+    for english_id, text in cursor.fetchall():
+        grams = trigrams(text)
+        entry_rows.append((english_id, len(grams)))
+        for gram in grams:
+            gram_rows.append((gram, english_id))
+            df[gram] = df.get(gram, 0) + 1
+
+    cursor.executemany(f'INSERT INTO {GRAMS_TABLE} (gram, english_id) VALUES (?, ?)', gram_rows)
+    cursor.executemany(f'INSERT INTO {ENTRIES_TABLE} (english_id, gram_count) VALUES (?, ?)', entry_rows)
+    cursor.executemany(f'INSERT INTO {DF_TABLE} (gram, df) VALUES (?, ?)', df.items())
+
+
+def _reindex(cursor, english_ids):
+    """重建一批条目的索引（已删除的条目只删除索引）"""
+    placeholders = ','.join('?' * len(english_ids))
+
+    # 从出现次数中减去旧的 trigram
+    cursor.execute(f'''
+        SELECT gram, COUNT(*) FROM {GRAMS_TABLE}
+        WHERE english_id IN ({placeholders}) GROUP BY gram
+    ''', english_ids)
+    cursor.executemany(f'UPDATE {DF_TABLE} SET df = df - ? WHERE gram = ?',
+                       [(count, gram) for gram, count in cursor.fetchall()])
+
+    cursor.execute(f'DELETE FROM {GRAMS_TABLE} WHERE english_id IN ({placeholders})', english_ids)
+    cursor.execute(f'DELETE FROM {ENTRIES_TABLE} WHERE english_id IN ({placeholders})', english_ids)
+
+    cursor.execute(f'SELECT id, english_text FROM english WHERE id IN ({placeholders})', english_ids)
+    df = {}
+    gram_rows = []
+    entry_rows = []
+    for english_id, text in cursor.fetchall():
+        grams = trigrams(text)
+        entry_rows.append((english_id, len(grams)))
+        for gram in grams:
+            gram_rows.append((gram, english_id))
+            df[gram] = df.get(gram, 0) + 1
+
+    cursor.executemany(f'INSERT INTO {GRAMS_TABLE} (gram, english_id) VALUES (?, ?)', gram_rows)
+    cursor.executemany(f'INSERT INTO {ENTRIES_TABLE} (english_id, gram_count) VALUES (?, ?)', entry_rows)
+    cursor.executemany(f'''
+        INSERT INTO {DF_TABLE} (gram, df) VALUES (?, ?)
+        ON CONFLICT (gram) DO UPDATE SET df = df + excluded.df
+    ''', df.items())
+    cursor.execute(f'DELETE FROM {DF_TABLE} WHERE df <= 0')
+
+    cursor.execute(f'DELETE FROM {PENDING_TABLE} WHERE english_id IN ({placeholders})', english_ids)
+
+
+def flush_translation_memory(cursor):
+    """在调用方的写事务中为 tm_pending 中的条目更新索引，返回更新的条目数"""
+    cursor.execute(f'SELECT english_id FROM {PENDING_TABLE}')
+    english_ids = [row[0] for row in cursor.fetchall()]
+    for batch in _chunks(english_ids):
+        _reindex(cursor, batch)
+    return len(english_ids)
+
+
+def sync_translation_memory(conn):
+    """在单独的事务中为 tm_pending 中的条目更新索引，返回更新的条目数"""
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT 1 FROM {PENDING_TABLE} LIMIT 1')
+    if cursor.fetchone() is None:
+        return 0
+
+    # 加写锁后重新读取，避免多个进程重复处理同一批条目
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        count = flush_translation_memory(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return count
+
+
+def _search(cursor, grams, df, min_score, exclude_id):
+    """返回相似度不低于 min_score 的 [(english_id, 相似度)]"""
+    size = len(grams)
+    # 相似度不低于 min_score 的条目至少包含 required 个查询的 trigram
+    required = max(1, math.ceil(min_score * size - 1e-9))
+
+    # 只有最少见的 size - required + 1 个 trigram 可能产生候选（索引中不存在的 trigram 不产生候选）；
+    # 这些 trigram 的倒排列表总长度超过 POSTINGS_BUDGET 时只使用预算内最少见的若干个
+    prefix = []
+    postings = 0
+    for gram in sorted(grams, key=lambda gram: (df.get(gram, 0), gram))[:size - required + 1]:
+        count = df.get(gram, 0)
+        if not count:
+            continue
+        if prefix and postings + count > POSTINGS_BUDGET:
+            break
+        prefix.append(gram)
+        postings += count
+    if not prefix:
+        return []
+
+    # 按命中的 trigram 数量保留最多 MAX_CANDIDATES 个候选
+    cursor.execute(f'''
+        SELECT english_id FROM {GRAMS_TABLE}
+        WHERE gram IN ({','.join('?' * len(prefix))})
+        GROUP BY english_id
+        ORDER BY COUNT(*) DESC, english_id DESC
+        LIMIT ?
+    ''', prefix + [MAX_CANDIDATES + 1])
+    candidates = [row[0] for row in cursor.fetchall() if row[0] != exclude_id]
+
+    # 精确计算候选条目与查询共有的 trigram 数量（分批查询，控制绑定参数数量），
+    # 并按 trigram 数量过滤：|B| 在 [min_score * |A|, |A| / min_score] 之间
+    shared = {}
+    gram_counts = {}
+    gram_list = sorted(grams)
+    for candidate_batch in _chunks(candidates, QUERY_BATCH_SIZE):
+        for gram_batch in _chunks(gram_list, QUERY_BATCH_SIZE):
+            cursor.execute(f'''
+                SELECT g.english_id, COUNT(*), e.gram_count
+                FROM {GRAMS_TABLE} g
+                JOIN {ENTRIES_TABLE} e ON e.english_id = g.english_id
+                WHERE g.english_id IN ({','.join('?' * len(candidate_batch))})
+                  AND g.gram IN ({','.join('?' * len(gram_batch))})
+                  AND e.gram_count BETWEEN ? AND ?
+                GROUP BY g.english_id
+            ''', candidate_batch + gram_batch + [required, math.floor(size / min_score + 1e-9)])
+            for english_id, count, gram_count in cursor.fetchall():
+                shared[english_id] = shared.get(english_id, 0) + count
+                gram_counts[english_id] = gram_count
+
+    scored = []
+    for english_id, count in shared.items():
+        score = count / (size + gram_counts[english_id] - count)
+        if score >= min_score:
+            scored.append((english_id, round(score, 4)))
+
+    return scored
+
+
+def find_similar(cursor, text, limit=5, min_score=DEFAULT_MIN_SCORE, exclude_id=None):
+    """查找与 text 相似的英文条目，返回按相似度从高到低排列的 [(english_id, 相似度)]"""
+    grams = trigrams(normalize(text)[:MAX_QUERY_LENGTH])
+    if not grams:
+        return []
+
+    df = {}
+    for gram_batch in _chunks(sorted(grams), QUERY_BATCH_SIZE):
+        cursor.execute(f'SELECT gram, df FROM {DF_TABLE} WHERE gram IN ({",".join("?" * len(gram_batch))})', gram_batch)
+        df.update(cursor.fetchall())
+
+    min_score = min(max(min_score, 0.01), 1.0)
+    scored = _search(cursor, grams, df, min_score, exclude_id)
+    scored.sort(key=lambda item: (-item[1], -item[0]))
+    return scored[:limit]
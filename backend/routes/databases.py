@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 import sqlite3
 import os
-from models.database import db_config, init_db, add_operation_log
+from models.database import db_config, init_db, add_operation_log, LAYOUT_PER_LANGUAGE, LAYOUT_LONG
+from models.migrations import migrate_database
 
 databases_bp = Blueprint('databases', __name__)
 
@@ -32,9 +33,15 @@ def create_database():
         data = request.get_json()
         db_name = data.get('name')
         
+        # 存储布局：per_language（默认，每种语言一张表）或 long（所有翻译存放在一张表中）
+        layout = data.get('storage', LAYOUT_PER_LANGUAGE)
+        
         if not db_name:
             return jsonify({'success': False, 'error': '数据库名称不能为空'}), 400
         
+        if layout not in (LAYOUT_PER_LANGUAGE, LAYOUT_LONG):
+            return jsonify({'success': False, 'error': '不支持的存储布局'}), 400
+        
         # 验证数据库名称格式
         if not db_name.replace('_', '').replace('.', '').isalnum():
             return jsonify({'success': False, 'error': '数据库名称只能包含字母、数字和下划线'}), 400
@@ -44,7 +51,7 @@ def create_database():
         if success:
             # 初始化新数据库
             db_path = result
-            init_db(db_path)
+            init_db(db_path, layout)
             
             # 记录操作日志
             add_operation_log(db_path, '新增', 1, f"创建新数据库: {db_name}")
@@ -61,7 +68,11 @@ def create_database():
 
 @databases_bp.route('/api/databases/switch', methods=['POST'])
 def switch_database():
-    """切换数据库"""
+    """切换数据库
+
+    客户端通过 X-Transflow-Database 请求头（或 /api/db/<数据库名>/ 前缀）选择数据库时，
+    切换只对该客户端生效；未指定数据库的客户端切换的是所有工作进程共享的当前数据库。
+    """
     try:
         data = request.get_json()
         db_name = data.get('name')
@@ -74,8 +85,13 @@ def switch_database():
         if db_name not in databases:
             return jsonify({'success': False, 'error': f'数据库 {db_name} 不存在'}), 404
         
-        # 切换数据库
-        db_config.set_current_db(db_name)
+        # 启动后复制进来的数据库需要先升级结构
+        db_path = os.path.join(db_config.db_dir, db_name)
+        migrate_database(db_path)
+        
+        # 通过请求头选择数据库的客户端只验证数据库，不改变其他客户端使用的当前数据库
+        if not db_config.request_selects_database():
+            db_config.set_current_db(db_name)
         
         return jsonify({
             'success': True,
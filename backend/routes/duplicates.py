@@ -0,0 +1,129 @@
+from flask import Blueprint, request, jsonify
+import os
+import subprocess
+import sys
+import threading
+from models.database import db_config, get_data_version
+from models.duplicates import DEFAULT_THRESHOLD, finish_scan, load_report, scan_status, start_scan
+
+duplicates_bp = Blueprint('duplicates', __name__)
+
+# 报告摘要中的字段（不含簇列表）
+SUMMARY_FIELDS = (
+    'generated_at', 'data_version', 'threshold', 'entries',
+    'exact_clusters', 'near_clusters', 'redundant_entries', 'seconds'
+)
+
+# 执行检测的脚本
+FIND_DUPLICATES_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'find_duplicates.py')
+
+
+def _launch_scan(db_path, threshold):
+    """在独立进程中运行检测脚本，不占用处理请求的工作进程"""
+    process = subprocess.Popen(
+        [sys.executable, FIND_DUPLICATES_SCRIPT, os.path.abspath(db_path), '--threshold', str(threshold), '--started'],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, start_new_session=True
+    )
+    threading.Thread(target=_reap_scan, args=(process, db_path), daemon=True).start()
+
+
+def _reap_scan(process, db_path):
+    """回收结束的子进程；检测异常退出时清除检测标记，不必等到超时才能重新检测"""
+    if process.wait() != 0:
+        with db_config.connections.connection(db_path) as conn:
+            finish_scan(conn)
+
+
+@duplicates_bp.route('/api/duplicates', methods=['GET'])
+def get_duplicates():
+    """获取最近一次的重复条目检测报告
+
+    参数 kind 只返回 exact（完全重复）或 near（近似重复）的簇，page / limit 对簇分页。
+    报告生成后数据有变化时 stale 为 true；还没有检测过时 report 为 null；
+    scanning 为进行中的检测 {started_at, threshold}，没有时为 null。
+    """
+    try:
+        kind = request.args.get('kind')
+        try:
+            page = max(int(request.args.get('page', 1)), 1)
+            limit = min(max(int(request.args.get('limit', 20)), 1), 200)
+        except ValueError:
+            return jsonify({'success': False, 'error': '无效的参数'}), 400
+
+        if kind not in (None, 'exact', 'near'):
+            return jsonify({'success': False, 'error': '无效的重复类型'}), 400
+
+        db_path = db_config.get_current_db()
+        conn = db_config.connect(db_path)
+        cursor = conn.cursor()
+
+        report = load_report(cursor)
+        if report is None:
+            return jsonify({
+                'success': True,
+                'report': None,
+                'stale': True,
+                'scanning': scan_status(cursor),
+                'clusters': [],
+                'total': 0
+            })
+
+        clusters = [cluster for cluster in report['clusters'] if kind is None or cluster['kind'] == kind]
+
+        return jsonify({
+            'success': True,
+            'report': {field: report[field] for field in SUMMARY_FIELDS},
+            'stale': report['data_version'] != get_data_version(cursor),
+            'scanning': scan_status(cursor),
+            'clusters': clusters[(page - 1) * limit:page * limit],
+            'total': len(clusters),
+            'page': page,
+            'limit': limit
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@duplicates_bp.route('/api/duplicates/scan', methods=['POST'])
+def scan_duplicates():
+    """在后台启动重复与近似重复条目的检测（find_duplicates.py），完成后通过 /api/duplicates 查看报告
+
+    参数 threshold 为近似重复的最低相似度（0.5~1，trigram 集合的 Jaccard 系数）。
+    已有检测在进行时返回 409。
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            threshold = float(data.get('threshold', DEFAULT_THRESHOLD))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': '无效的相似度阈值'}), 400
+
+        if not 0.5 <= threshold <= 1:
+            return jsonify({'success': False, 'error': '相似度阈值应在 0.5 到 1 之间'}), 400
+
+        db_path = db_config.get_current_db()
+        conn = db_config.connect(db_path)
+
+        # 先标记检测开始，同时提交的多个请求只有一个会启动检测
+        if not start_scan(conn, threshold):
+            return jsonify({
+                'success': False,
+                'error': '已有重复检测正在进行',
+                'scanning': scan_status(conn.cursor())
+            }), 409
+
+        try:
+            _launch_scan(db_path, threshold)
+        except Exception:
+            finish_scan(conn)
+            raise
+
+        return jsonify({
+            'success': True,
+            'message': '重复检测已开始',
+            'scanning': scan_status(conn.cursor())
+        }), 202
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
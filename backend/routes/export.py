@@ -1,14 +1,107 @@
-from flask import Blueprint, request, jsonify
-import sqlite3
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 import json
-from models.database import db_config, LANGUAGES, get_language_activation_status
+from models.database import db_config, LANGUAGES, get_language_activation_status, get_data_version, active_languages as get_active_languages
+from models.export_engine import DictSink, export_all_languages, EXPORT_BATCH_SIZE
+from models.export_cache import export_cache, build_artifact
+from models.storage import get_storage
+from utils.conditional import gzip_etag, matching_etag
 
 export_bp = Blueprint('export', __name__)
 
+def _iter_language_entries(cursor, language, stats):
+    """逐批读取查询结果，生成可导出的 (key, 翻译内容)，同时累计统计信息"""
+    while True:
+        rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+        if not rows:
+            break
+        
+        for row in rows:
+            stats['total'] += 1
+            
+            if language == 'english':
+                english_id, content, key = row
+                translation = content
+            else:
+                english_id, content, key, translation = row
+            
+            # 只导出有翻译内容且有key的记录
+            if translation and translation.strip() and key and key.strip():
+                stats['exported'] += 1
+                stats['with_key'] += 1
+                
+                # 使用key作为键，翻译内容作为值
+                yield key, translation
+
+def _stream_json(entries, stats):
+    """以 JSON 格式流式输出，统计信息作为末尾字段输出"""
+    yield '{"success": true, "data": {'
+    
+    first = True
+    chunk = []
+    for key, translation in entries:
+        prefix = '' if first else ', '
+        first = False
+        chunk.append(f'{prefix}{json.dumps(key)}: {json.dumps(translation)}')
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    
+    if chunk:
+        yield ''.join(chunk)
+    
+    yield '}, "stats": ' + json.dumps(stats) + '}\n'
+
+def _stream_ndjson(entries, stats):
+    """以 NDJSON 格式流式输出，每行一条记录，最后一行为统计信息"""
+    chunk = []
+    for key, translation in entries:
+        chunk.append(json.dumps({'key': key, 'value': translation}) + '\n')
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    
+    if chunk:
+        yield ''.join(chunk)
+    
+    yield json.dumps({'stats': stats}) + '\n'
+
+def _artifact_response(artifact, mimetype):
+    """返回缓存的导出结果，支持 If-None-Match 协商与 gzip 压缩
+
+    gzip 压缩的响应体与未压缩的响应体使用不同的 ETag。
+    """
+    matched = matching_etag(artifact.etag)
+    if matched:
+        response = Response(status=304)
+        etag = matched
+    elif 'gzip' in request.accept_encodings:
+        response = Response(artifact.gzip_body, mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+        etag = gzip_etag(artifact.etag)
+    else:
+        response = Response(artifact.body, mimetype=mimetype)
+        etag = artifact.etag
+    
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    # 客户端每次都需要重新验证（命中时返回 304）
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @export_bp.route('/api/export/<language>', methods=['GET'])
 def export_language_data(language):
-    """导出指定语言的数据"""
+    """导出指定语言的数据
+
+    参数 format 为 json（默认）或 ndjson；stream=1 时流式输出，内存占用与数据量无关。
+    非流式的导出结果按数据版本缓存，支持 ETag 协商。
+    """
     try:
+        export_format = request.args.get('format', 'json')
+        stream = request.args.get('stream') in ('1', 'true')
+        
+        if export_format not in ('json', 'ndjson'):
+            return jsonify({'success': False, 'error': '不支持的导出格式'}), 400
+        
         db_path = db_config.get_current_db()
         
         if language not in LANGUAGES:
@@ -18,59 +111,48 @@ def export_language_data(language):
         if not get_language_activation_status(db_path, language):
             return jsonify({'success': False, 'error': f'语言 {language} 未激活'}), 400
         
-        conn = sqlite3.connect(db_path)
+        conn = db_config.connect(db_path)
         cursor = conn.cursor()
         
+        mimetype = 'application/x-ndjson' if export_format == 'ndjson' else 'application/json'
+        
+        # 数据版本未变化时直接返回缓存的导出结果
+        version = get_data_version(cursor)
+        cache_key = export_cache.key(db_path, language, export_format)
+        artifact = export_cache.get(cache_key, version)
+        if artifact is not None:
+            return _artifact_response(artifact, mimetype)
+        
         # 获取所有翻译数据
         if language == 'english':
             cursor.execute('''
-                SELECT e.id, e.english_text, e.translation_key, e.tag
+                SELECT e.id, e.english_text, e.translation_key
                 FROM english e
                 ORDER BY e.id
             ''')
         else:
-            cursor.execute(f'''
-                SELECT e.id, e.english_text, e.translation_key, e.tag, l.{language}_text as translation
-                FROM english e
-                LEFT JOIN {language} l ON e.id = l.english_id
-                ORDER BY e.id
-            ''')
+            cursor.execute(*get_storage(db_path).language_export_query(language))
         
-        data = {}
-        total_count = 0
-        exported_count = 0
-        with_key_count = 0
+        stats = {
+            'total': 0,
+            'exported': 0,
+            'with_key': 0
+        }
+        entries = _iter_language_entries(cursor, language, stats)
         
-        for row in cursor.fetchall():
-            total_count += 1
-            
-            if language == 'english':
-                english_id, content, key, tag = row
-                translation = content
-            else:
-                english_id, content, key, tag, translation = row
-            
-            # 只导出有翻译内容且有key的记录
-            if translation and translation.strip() and key and key.strip():
-                exported_count += 1
-                with_key_count += 1
-                
-                # 使用key作为键，翻译内容作为值
-                data[key] = translation
+        if export_format == 'ndjson':
+            body = _stream_ndjson(entries, stats)
+        else:
+            body = _stream_json(entries, stats)
         
-        conn.close()
+        if stream:
+            # 流式输出不缓存，保证内存占用与数据量无关；请求上下文（及数据库连接）保持到输出结束
+            return Response(stream_with_context(body), mimetype=mimetype)
         
-        stats = {
-            'total': total_count,
-            'exported': exported_count,
-            'with_key': with_key_count
-        }
+        artifact = build_artifact(version, ''.join(body).encode('utf-8'))
+        export_cache.put(cache_key, artifact)
         
-        return jsonify({
-            'success': True,
-            'data': data,
-            'stats': stats
-        })
+        return _artifact_response(artifact, mimetype)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -82,55 +164,31 @@ def export_data():
         db_path = db_config.get_current_db()
         
         # 获取激活的语言列表
-        active_languages = []
-        for lang in LANGUAGES:
-            if get_language_activation_status(db_path, lang):
-                active_languages.append(lang)
+        active_languages = get_active_languages(db_path)
         
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = db_config.connect(db_path)
         
-        # 获取所有英文数据
-        cursor.execute('''
-            SELECT id, english_text, translation_key, tag
-            FROM english
-            ORDER BY id
-        ''')
+        # 数据版本未变化时直接返回缓存的导出结果
+        version = get_data_version(conn.cursor())
+        cache_key = export_cache.key(db_path, '*', 'json')
+        artifact = export_cache.get(cache_key, version)
+        if artifact is not None:
+            return _artifact_response(artifact, 'application/json')
         
-        data = {}
-        for lang in active_languages:
-            data[lang] = {}
+        # 英文表与各语言翻译各顺序读取一次，按 english_id 归并
+        sink = DictSink(active_languages)
+        export_all_languages(conn, get_storage(db_path), active_languages, sink)
+        data = sink.data
         
-        for row in cursor.fetchall():
-            english_id, content, key, tag = row
-            
-            # 只处理有key的记录
-            if not key or not key.strip():
-                continue
-                
-            # 为每种语言添加数据
-            for lang in active_languages:
-                if lang == 'english':
-                    translation = content
-                else:
-                    cursor.execute(f'''
-                        SELECT {lang}_text FROM {lang} WHERE english_id = ?
-                    ''', (english_id,))
-                    result = cursor.fetchone()
-                    translation = result[0] if result else None
-                
-                # 只导出有翻译内容且有key的记录
-                if translation and translation.strip():
-                    # 使用key作为键，翻译内容作为值
-                    data[lang][key] = translation
-        
-        conn.close()
-        
-        return jsonify({
+        body = json.dumps({
             'success': True,
             'data': data,
             'languages': active_languages
         })
+        artifact = build_artifact(version, body.encode('utf-8'))
+        export_cache.put(cache_key, artifact)
+        
+        return _artifact_response(artifact, 'application/json')
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from models.metrics import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """以 Prometheus 文本格式输出运行指标"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
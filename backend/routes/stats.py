@@ -0,0 +1,31 @@
+from flask import Blueprint, jsonify
+from models.database import db_config, active_languages as get_active_languages
+from models.stats import completion_matrix
+
+stats_bp = Blueprint('stats', __name__)
+
+@stats_bp.route('/api/stats', methods=['GET'])
+def get_stats():
+    """获取翻译进度统计
+
+    返回各标签在各激活语言下的已翻译条目数与完成度，数据来自触发器维护的统计表，
+    读取量只与标签数和语言数有关。
+    """
+    try:
+        db_path = db_config.get_current_db()
+        active_languages = get_active_languages(db_path)
+        
+        conn = db_config.connect(db_path)
+        cursor = conn.cursor()
+        
+        overall, tags = completion_matrix(cursor, active_languages)
+        
+        return jsonify({
+            'success': True,
+            'languages': active_languages,
+            'overall': overall,
+            'tags': tags
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,32 +1,37 @@
 from flask import Blueprint, request, jsonify
-import sqlite3
-import os
-from models.database import db_config, add_operation_log, get_operation_logs
+from models.database import db_config, add_operation_log, bump_data_version, get_operation_logs, get_log_version
+from models.counts import count_translations, invalidate_translation_counts
+from models.row_cache import invalidate_row_fragments
+from models.tags import list_tags, tag_count
+from models.log_archive import decode_log_cursor, list_archives
+from utils.conditional import conditional
 
 tags_bp = Blueprint('tags', __name__)
 
 @tags_bp.route('/api/tags', methods=['GET'])
+@conditional()
 def get_tags():
-    """获取标签列表"""
+    """获取标签列表
+
+    with_counts=1 时同时返回每个标签的条目数量 tag_counts（由触发器维护，无需扫描英文表）。
+    """
     try:
-        db_path = db_config.get_current_db()
+        with_counts = request.args.get('with_counts') in ('1', 'true')
         
-        # 检查数据库文件是否存在，如果不存在则让get_current_db自动创建
-        if not os.path.exists(db_path):
-            db_path = db_config.get_current_db()
+        db_path = db_config.get_current_db()
         
-        conn = sqlite3.connect(db_path)
+        conn = db_config.connect(db_path)
         cursor = conn.cursor()
         
-        cursor.execute('SELECT name FROM tags ORDER BY name')
-        tags = [row[0] for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return jsonify({
+        tag_rows = list_tags(cursor)
+        result = {
             'success': True,
-            'tags': tags
-        })
+            'tags': [name for name, count in tag_rows]
+        }
+        if with_counts:
+            result['tag_counts'] = dict(tag_rows)
+        
+        return jsonify(result)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -42,19 +47,20 @@ def create_tag():
             return jsonify({'success': False, 'error': '标签名称不能为空'}), 400
         
         db_path = db_config.get_current_db()
-        conn = sqlite3.connect(db_path)
+        conn = db_config.connect(db_path)
         cursor = conn.cursor()
         
         # 检查标签是否已存在
         cursor.execute('SELECT id FROM tags WHERE name = ?', (tag_name,))
         if cursor.fetchone():
-            conn.close()
             return jsonify({'success': False, 'error': '标签已存在'}), 400
         
         # 创建标签
         cursor.execute('INSERT INTO tags (name) VALUES (?)', (tag_name,))
+        version = bump_data_version(cursor)
         conn.commit()
-        conn.close()
+        # 新标签不影响已有条目，只推进缓存的数据版本
+        invalidate_row_fragments(db_path, [], version)
         
         # 记录操作日志
         add_operation_log(db_path, '新增标签', 1, f"创建标签: {tag_name}")
@@ -73,18 +79,11 @@ def get_tag_info(tag_name):
     try:
         db_path = db_config.get_current_db()
         
-        # 检查数据库文件是否存在，如果不存在则让get_current_db自动创建
-        if not os.path.exists(db_path):
-            db_path = db_config.get_current_db()
-        
-        conn = sqlite3.connect(db_path)
+        conn = db_config.connect(db_path)
         cursor = conn.cursor()
         
         # 获取使用该标签的翻译数量
-        cursor.execute('SELECT COUNT(*) FROM english WHERE tag = ?', (tag_name,))
-        translation_count = cursor.fetchone()[0]
-        
-        conn.close()
+        translation_count = count_translations(cursor, db_path, tag_name)
         
         return jsonify({
             'success': True,
@@ -99,21 +98,25 @@ def delete_tag(tag_name):
     """删除标签"""
     try:
         db_path = db_config.get_current_db()
-        conn = sqlite3.connect(db_path)
+        conn = db_config.connect(db_path)
         cursor = conn.cursor()
         
         # 获取使用该标签的翻译数量
-        cursor.execute('SELECT COUNT(*) FROM english WHERE tag = ?', (tag_name,))
-        translation_count = cursor.fetchone()[0]
+        translation_count = tag_count(cursor, tag_name)
+        
+        # 清除使用该标签的翻译的标签字段（按 tag_id 索引更新）
+        cursor.execute('''
+            UPDATE english SET tag_id = NULL
+            WHERE tag_id = (SELECT id FROM tags WHERE name = ?)
+        ''', (tag_name,))
         
         # 删除标签
         cursor.execute('DELETE FROM tags WHERE name = ?', (tag_name,))
         
-        # 清除使用该标签的翻译的标签字段
-        cursor.execute('UPDATE english SET tag = NULL WHERE tag = ?', (tag_name,))
-        
+        version = bump_data_version(cursor)
         conn.commit()
-        conn.close()
+        invalidate_translation_counts(db_path)
+        invalidate_row_fragments(db_path, None, version)
         
         # 记录操作日志
         add_operation_log(db_path, '删除标签', translation_count, f"删除标签: {tag_name}")
@@ -127,24 +130,44 @@ def delete_tag(tag_name):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @tags_bp.route('/api/logs', methods=['GET'])
+@conditional(get_log_version)
 def get_logs():
-    """获取操作日志"""
+    """获取操作日志
+
+    按时间倒序分页：cursor 为上一页返回的 next_cursor，数据库中的日志读完后继续返回归档中的日志。
+    """
     try:
         limit = int(request.args.get('limit', 10))
+        
+        before = None
+        if request.args.get('cursor'):
+            try:
+                before = decode_log_cursor(request.args['cursor'])
+            except ValueError:
+                return jsonify({'success': False, 'error': '无效的分页游标'}), 400
+        
         db_path = db_config.get_current_db()
         
-        # 检查数据库文件是否存在
-        if not os.path.exists(db_path):
-            return jsonify({
-                'success': True,
-                'logs': []
-            })
+        logs, next_cursor = get_operation_logs(db_path, limit, before)
+        
+        return jsonify({
+            'success': True,
+            'logs': logs,
+            'next_cursor': next_cursor
+        })
         
-        logs = get_operation_logs(db_path, limit)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@tags_bp.route('/api/logs/archives', methods=['GET'])
+def get_log_archives():
+    """获取操作日志归档文件列表（按月份）"""
+    try:
+        db_path = db_config.get_current_db()
         
         return jsonify({
             'success': True,
-            'logs': logs
+            'archives': list_archives(db_path)
         })
         
     except Exception as e:
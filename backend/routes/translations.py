@@ -1,11 +1,21 @@
 from flask import Blueprint, request, jsonify
-import sqlite3
-import os
-from models.database import db_config, add_operation_log, get_language_activation_status, LANGUAGES
+import json
+from models.database import db_config, add_operation_log, bump_data_version, get_data_version, active_languages as get_active_languages
+from models.page_loader import load_translation_page, encode_cursor, decode_cursor
+from models.row_cache import load_translation_fragments, fragment_response, invalidate_row_fragments
+from models.counts import count_translations, invalidate_translation_counts
+from models.search import ensure_search_index, search_entries
+from models.translation_memory import DEFAULT_MIN_SCORE, find_similar, flush_translation_memory
+from models.importer import parse_json_payload, parse_csv, import_records
+from models.batch import batch_update, batch_delete
+from models.storage import get_storage
+from models.tags import TAG_JOIN, TAG_FILTER, resolve_tag_id
+from utils.conditional import conditional
 
 translations_bp = Blueprint('translations', __name__)
 
 @translations_bp.route('/api/translations', methods=['GET'])
+@conditional()
 def get_translations():
     """获取翻译数据"""
     try:
@@ -14,99 +24,103 @@ def get_translations():
         tag = request.args.get('tag')
         language = request.args.get('language')
         
+        # 游标分页：cursor 为上一页返回的游标，也可直接传 after_id / before_id
+        direction, anchor_id = None, None
+        try:
+            if request.args.get('cursor'):
+                direction, anchor_id = decode_cursor(request.args['cursor'])
+            elif request.args.get('after_id'):
+                direction, anchor_id = 'after', int(request.args['after_id'])
+            elif request.args.get('before_id'):
+                direction, anchor_id = 'before', int(request.args['before_id'])
+        except ValueError:
+            return jsonify({'success': False, 'error': '无效的分页游标'}), 400
+        
         offset = (page - 1) * limit
         
         db_path = db_config.get_current_db()
         
-        # 检查数据库文件是否存在，如果不存在则让get_current_db自动创建
-        if not os.path.exists(db_path):
-            db_path = db_config.get_current_db()
-        
-        conn = sqlite3.connect(db_path)
+        conn = db_config.connect(db_path)
         cursor = conn.cursor()
         
+        # 在查询条目之前读取数据版本，用于校验条目片段缓存
+        version = get_data_version(cursor)
+        
         # 构建查询条件
         where_conditions = []
         params = []
         
         if tag and tag != 'all':
-            where_conditions.append("e.tag = ?")
+            where_conditions.append(TAG_FILTER)
             params.append(tag)
+        else:
+            tag = None
+        
+        if direction == 'after':
+            where_conditions.append("e.id < ?")
+            params.append(anchor_id)
+        elif direction == 'before':
+            where_conditions.append("e.id > ?")
+            params.append(anchor_id)
         
         where_clause = " WHERE " + " AND ".join(where_conditions) if where_conditions else ""
         
-        # 获取总数
-        count_query = f"SELECT COUNT(*) FROM english e{where_clause}"
-        cursor.execute(count_query, params)
-        total_count = cursor.fetchone()[0]
+        # 获取总数（带缓存）
+        total_count = count_translations(cursor, db_path, tag)
         
         # 获取英文数据
-        query = f"""
-            SELECT e.id, e.english_text, e.translation_key, e.tag, e.created_at, e.updated_at
-            FROM english e{where_clause}
-            ORDER BY e.id DESC
-            LIMIT ? OFFSET ?
-        """
-        cursor.execute(query, params + [limit, offset])
-        
-        translations = []
-        for row in cursor.fetchall():
-            english_id, content, key, tag, created_at, updated_at = row
-            
-            # 获取所有语言的翻译
-            translations_dict = {}
-            tags_list = [tag] if tag else []
-            
-            # 获取激活的语言列表
-            active_languages = []
-            for lang in LANGUAGES:
-                if get_language_activation_status(db_path, lang):
-                    active_languages.append(lang)
-            
-            for lang in active_languages:
-                if lang == 'english':
-                    translations_dict[lang] = content
-                else:
-                    cursor.execute(f'''
-                        SELECT {lang}_text FROM {lang} WHERE english_id = ?
-                    ''', (english_id,))
-                    result = cursor.fetchone()
-                    translations_dict[lang] = result[0] if result else None
-            
-            # 如果指定了特定语言，只返回该语言的翻译
-            if language and language in translations_dict:
-                filtered_translations = {language: translations_dict[language]}
+        columns = "e.id, e.english_text, e.translation_key, t.name, e.created_at, e.updated_at"
+        if direction is None:
+            cursor.execute(f"""
+                SELECT {columns}
+                FROM english e {TAG_JOIN}{where_clause}
+                ORDER BY e.id DESC
+                LIMIT ? OFFSET ?
+            """, params + [limit, offset])
+            rows = cursor.fetchall()
+            has_older = (page * limit) < total_count
+            has_newer = page > 1
+        else:
+            # 多取一条用于判断该方向上是否还有数据
+            order = "DESC" if direction == 'after' else "ASC"
+            cursor.execute(f"""
+                SELECT {columns}
+                FROM english e {TAG_JOIN}{where_clause}
+                ORDER BY e.id {order}
+                LIMIT ?
+            """, params + [limit + 1])
+            rows = cursor.fetchall()
+            has_extra = len(rows) > limit
+            rows = rows[:limit]
+            if direction == 'after':
+                has_older, has_newer = has_extra, True
             else:
-                filtered_translations = translations_dict
-            
-            translation_data = {
-                'english_id': english_id,
-                'english': content,
-                'key': key,
-                'tag': tag,
-                'tags': tags_list,
-                'translations': filtered_translations,
-                'created_at': created_at,
-                'updated_at': updated_at
-            }
-            
-            translations.append(translation_data)
+                rows.reverse()
+                has_older, has_newer = True, has_extra
         
-        conn.close()
+        # 获取激活的语言列表
+        active_languages = get_active_languages(db_path)
+        
+        # 整页条目序列化后的 JSON 片段（缓存未命中的条目批量加载各语言翻译）
+        fragments = load_translation_fragments(
+            cursor, get_storage(db_path), rows, active_languages, language, db_path, version
+        )
         
         # 计算分页信息
-        has_more = (page * limit) < total_count
+        next_cursor = encode_cursor('after', rows[-1][0]) if rows and has_older else None
+        prev_cursor = encode_cursor('before', rows[0][0]) if rows and has_newer else None
         
-        return jsonify({
+        return fragment_response({
             'success': True,
-            'translations': translations,
             'pagination': {
-                'page': page,
+                'page': page if direction is None else None,
                 'limit': limit,
                 'total': total_count,
-                'has_more': has_more
+                'has_more': next_cursor is not None,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor
             }
-        })
+        }, 'translations', fragments)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -125,27 +139,27 @@ def add_translation():
             return jsonify({'success': False, 'error': '英文内容不能为空'}), 400
         
         db_path = db_config.get_current_db()
-        conn = sqlite3.connect(db_path)
+        conn = db_config.connect(db_path)
         cursor = conn.cursor()
         
         # 插入英文内容
         cursor.execute('''
-            INSERT INTO english (english_text, translation_key, tag)
+            INSERT INTO english (english_text, translation_key, tag_id)
             VALUES (?, ?, ?)
-        ''', (english, key, tag))
+        ''', (english, key, resolve_tag_id(cursor, tag)))
         
         english_id = cursor.lastrowid
         
         # 插入各语言翻译
-        for lang, content in translations.items():
-            if content and lang != 'english':
-                cursor.execute(f'''
-                    INSERT INTO {lang} (english_id, {lang}_text, translation_key)
-                    VALUES (?, ?, ?)
-                ''', (english_id, content, key))
+        get_storage(db_path).add_texts(cursor, english_id, translations, key)
+        
+        # 在同一事务中更新翻译记忆索引
+        flush_translation_memory(cursor)
         
+        version = bump_data_version(cursor)
         conn.commit()
-        conn.close()
+        invalidate_translation_counts(db_path)
+        invalidate_row_fragments(db_path, [english_id], version)
         
         # 记录操作日志
         add_operation_log(db_path, '新增', 1, f"新增翻译: {english[:50]}...")
@@ -155,6 +169,150 @@ def add_translation():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@translations_bp.route('/api/translations/import', methods=['POST'])
+def import_translations():
+    """批量导入翻译
+
+    支持 JSON 请求体、上传的 JSON 语言文件（表单字段 language、tag）以及 CSV 文件，
+    按 translation_key 在一个事务中新增或更新。
+    """
+    try:
+        db_path = db_config.get_current_db()
+        
+        # 获取激活的语言列表
+        active_languages = get_active_languages(db_path)
+        
+        try:
+            upload = request.files.get('file')
+            if upload is not None:
+                text = upload.read().decode('utf-8-sig')
+                if upload.filename.lower().endswith('.csv') or upload.mimetype == 'text/csv':
+                    records = parse_csv(text, active_languages)
+                else:
+                    data = json.loads(text)
+                    if isinstance(data, dict) and ('entries' in data or 'data' in data):
+                        payload = data
+                    else:
+                        payload = {
+                            'language': request.form.get('language'),
+                            'data': data,
+                            'tag': request.form.get('tag')
+                        }
+                    records = parse_json_payload(payload)
+            elif request.mimetype == 'text/csv':
+                records = parse_csv(request.get_data(as_text=True), active_languages)
+            else:
+                records = parse_json_payload(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if not records:
+            return jsonify({'success': False, 'error': '没有可导入的数据'}), 400
+        
+        conn = db_config.connect(db_path)
+        cursor = conn.cursor()
+        
+        # 在一个事务中批量写入
+        stats, errors = import_records(cursor, get_storage(db_path), records, active_languages)
+        
+        # 在同一事务中更新翻译记忆索引
+        flush_translation_memory(cursor)
+        
+        version = bump_data_version(cursor)
+        conn.commit()
+        invalidate_translation_counts(db_path)
+        invalidate_row_fragments(db_path, None, version)
+        
+        # 记录一条汇总的操作日志
+        add_operation_log(
+            db_path, '导入', stats['created'] + stats['updated'],
+            f"批量导入: 新增 {stats['created']} 条, 更新 {stats['updated']} 条, 失败 {stats['failed']} 条"
+        )
+        
+        return jsonify({
+            'success': True,
+            'stats': stats,
+            'errors': errors
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@translations_bp.route('/api/translations/batch', methods=['PUT'])
+def batch_update_translations():
+    """批量更新翻译"""
+    try:
+        data = request.get_json(silent=True) or {}
+        entries = data.get('entries')
+        
+        if not isinstance(entries, list) or not entries:
+            return jsonify({'success': False, 'error': '更新条目不能为空'}), 400
+        
+        db_path = db_config.get_current_db()
+        active_languages = get_active_languages(db_path)
+        conn = db_config.connect(db_path)
+        cursor = conn.cursor()
+        
+        # 在一个事务中完成全部更新
+        results, updated_count = batch_update(cursor, get_storage(db_path), entries, active_languages)
+        
+        # 在同一事务中更新翻译记忆索引
+        flush_translation_memory(cursor)
+        
+        version = bump_data_version(cursor)
+        conn.commit()
+        invalidate_translation_counts(db_path)
+        invalidate_row_fragments(db_path, [result['english_id'] for result in results if result['success']], version)
+        
+        # 记录操作日志
+        add_operation_log(db_path, '批量更新', updated_count, f"批量更新翻译: {updated_count} 条")
+        
+        return jsonify({
+            'success': True,
+            'updated': updated_count,
+            'results': results
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@translations_bp.route('/api/translations/batch', methods=['DELETE'])
+def batch_delete_translations():
+    """批量删除翻译"""
+    try:
+        data = request.get_json(silent=True) or {}
+        ids = data.get('ids')
+        
+        if not isinstance(ids, list) or not ids:
+            return jsonify({'success': False, 'error': '删除条目不能为空'}), 400
+        
+        db_path = db_config.get_current_db()
+        conn = db_config.connect(db_path)
+        cursor = conn.cursor()
+        
+        # 删除英文记录（级联删除所有翻译）
+        results, deleted_count = batch_delete(cursor, ids)
+        
+        # 在同一事务中更新翻译记忆索引
+        flush_translation_memory(cursor)
+        
+        version = bump_data_version(cursor)
+        conn.commit()
+        invalidate_translation_counts(db_path)
+        invalidate_row_fragments(db_path, [result['english_id'] for result in results if result['success']], version)
+        
+        # 记录操作日志
+        add_operation_log(db_path, '批量删除', deleted_count, f"批量删除翻译: {deleted_count} 条")
+        
+        return jsonify({
+            'success': True,
+            'deleted': deleted_count,
+            'results': results
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @translations_bp.route('/api/translations/<int:english_id>', methods=['PUT'])
 def update_translation(english_id):
     """更新翻译"""
@@ -169,40 +327,26 @@ def update_translation(english_id):
             return jsonify({'success': False, 'error': '英文内容不能为空'}), 400
         
         db_path = db_config.get_current_db()
-        conn = sqlite3.connect(db_path)
+        conn = db_config.connect(db_path)
         cursor = conn.cursor()
         
         # 更新英文内容
         cursor.execute('''
             UPDATE english 
-            SET english_text = ?, translation_key = ?, tag = ?, updated_at = CURRENT_TIMESTAMP
+            SET english_text = ?, translation_key = ?, tag_id = ?, updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
-        ''', (english, key, tag, english_id))
+        ''', (english, key, resolve_tag_id(cursor, tag), english_id))
         
         # 更新各语言翻译
-        for lang, content in translations.items():
-            if lang != 'english':
-                # 检查是否已存在翻译
-                cursor.execute(f'''
-                    SELECT id FROM {lang} WHERE english_id = ?
-                ''', (english_id,))
-                
-                if cursor.fetchone():
-                    # 更新现有翻译
-                    cursor.execute(f'''
-                        UPDATE {lang} 
-                        SET {lang}_text = ?, translation_key = ?, updated_at = CURRENT_TIMESTAMP
-                        WHERE english_id = ?
-                    ''', (content, key, english_id))
-                else:
-                    # 插入新翻译
-                    cursor.execute(f'''
-                        INSERT INTO {lang} (english_id, {lang}_text, translation_key)
-                        VALUES (?, ?, ?)
-                    ''', (english_id, content, key))
+        get_storage(db_path).set_texts(cursor, english_id, translations, key)
         
+        # 在同一事务中更新翻译记忆索引
+        flush_translation_memory(cursor)
+        
+        version = bump_data_version(cursor)
         conn.commit()
-        conn.close()
+        invalidate_translation_counts(db_path)
+        invalidate_row_fragments(db_path, [english_id], version)
         
         # 记录操作日志
         add_operation_log(db_path, '更新', 1, f"更新翻译: {english[:50]}...")
@@ -217,7 +361,7 @@ def delete_translation(english_id):
     """删除翻译"""
     try:
         db_path = db_config.get_current_db()
-        conn = sqlite3.connect(db_path)
+        conn = db_config.connect(db_path)
         cursor = conn.cursor()
         
         # 获取英文内容用于日志
@@ -231,8 +375,13 @@ def delete_translation(english_id):
         # 删除英文记录（级联删除所有翻译）
         cursor.execute('DELETE FROM english WHERE id = ?', (english_id,))
         
+        # 在同一事务中更新翻译记忆索引
+        flush_translation_memory(cursor)
+        
+        version = bump_data_version(cursor)
         conn.commit()
-        conn.close()
+        invalidate_translation_counts(db_path)
+        invalidate_row_fragments(db_path, [english_id], version)
         
         # 记录操作日志
         add_operation_log(db_path, '删除', 1, f"删除翻译: {english_content[:50]}...")
@@ -243,86 +392,112 @@ def delete_translation(english_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @translations_bp.route('/api/search', methods=['GET'])
+@conditional()
 def search_translations():
     """搜索翻译"""
     try:
-        query = request.args.get('q', '')
+        query = request.args.get('q', '').strip()
         tag = request.args.get('tag')
         language = request.args.get('language')
+        # 限定搜索范围的语言列表（逗号分隔，'key' 表示翻译key），默认搜索全部
+        scope = request.args.get('scope')
+        page = int(request.args.get('page', 1))
+        limit = int(request.args.get('limit', 50))
         
         if not query:
             return jsonify({'success': False, 'error': '搜索关键词不能为空'}), 400
         
         db_path = db_config.get_current_db()
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        tokenizer = ensure_search_index(db_path)
         
-        # 构建搜索条件
-        where_conditions = ["(e.english_text LIKE ? OR e.translation_key LIKE ?)"]
-        params = [f'%{query}%', f'%{query}%']
+        # 获取激活的语言列表
+        active_languages = get_active_languages(db_path)
         
-        if tag and tag != 'all':
-            where_conditions.append("e.tag = ?")
-            params.append(tag)
+        scope_languages = None
+        if scope:
+            scope_languages = [lang.strip() for lang in scope.split(',') if lang.strip()]
+            invalid = [lang for lang in scope_languages if lang != 'key' and lang not in active_languages]
+            if invalid:
+                return jsonify({'success': False, 'error': f"不支持的搜索语言: {', '.join(invalid)}"}), 400
         
-        where_clause = " WHERE " + " AND ".join(where_conditions)
+        conn = db_config.connect(db_path)
+        cursor = conn.cursor()
         
-        # 搜索英文内容
-        query_sql = f"""
-            SELECT e.id, e.english_text, e.translation_key, e.tag, e.created_at, e.updated_at
-            FROM english e{where_clause}
-            ORDER BY e.id DESC
-        """
-        cursor.execute(query_sql, params)
+        version = get_data_version(cursor)
         
-        translations = []
-        for row in cursor.fetchall():
-            english_id, content, key, tag, created_at, updated_at = row
-            
-            # 获取所有语言的翻译
-            translations_dict = {}
-            tags_list = [tag] if tag else []
-            
-            # 获取激活的语言列表
-            active_languages = []
-            for lang in LANGUAGES:
-                if get_language_activation_status(db_path, lang):
-                    active_languages.append(lang)
-            
-            for lang in active_languages:
-                if lang == 'english':
-                    translations_dict[lang] = content
-                else:
-                    cursor.execute(f'''
-                        SELECT {lang}_text FROM {lang} WHERE english_id = ?
-                    ''', (english_id,))
-                    result = cursor.fetchone()
-                    translations_dict[lang] = result[0] if result else None
-            
-            # 如果指定了特定语言，只返回该语言的翻译
-            if language and language in translations_dict:
-                filtered_translations = {language: translations_dict[language]}
-            else:
-                filtered_translations = translations_dict
-            
-            translation_data = {
-                'english_id': english_id,
-                'english': content,
-                'key': key,
-                'tag': tag,
-                'tags': tags_list,
-                'translations': filtered_translations,
-                'created_at': created_at,
-                'updated_at': updated_at
+        # 通过全文索引搜索，按相关度排序并分页
+        total_count, rows = search_entries(
+            cursor, query, tokenizer,
+            scope=scope_languages, tag=tag,
+            limit=limit, offset=(page - 1) * limit
+        )
+        
+        # 整页条目序列化后的 JSON 片段（缓存未命中的条目批量加载各语言翻译）
+        fragments = load_translation_fragments(
+            cursor, get_storage(db_path), rows, active_languages, language, db_path, version
+        )
+        
+        return fragment_response({
+            'success': True,
+            'pagination': {
+                'page': page,
+                'limit': limit,
+                'total': total_count,
+                'has_more': (page * limit) < total_count
             }
-            
-            translations.append(translation_data)
+        }, 'translations', fragments)
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@translations_bp.route('/api/translations/suggest', methods=['GET'])
+@conditional()
+def suggest_translations():
+    """翻译记忆：查找与输入的英文相似的已有条目及其各语言翻译
+
+    参数 q 为英文内容，limit 为返回数量，min_score 为最低相似度（0~1），
+    exclude_id 排除指定条目（编辑已有条目时使用），language 只返回指定语言的翻译。
+    结果按相似度 score 从高到低排列。
+    """
+    try:
+        query = request.args.get('q', '')
+        language = request.args.get('language')
+        try:
+            limit = min(max(int(request.args.get('limit', 5)), 1), 50)
+            min_score = float(request.args.get('min_score', DEFAULT_MIN_SCORE))
+            exclude_id = int(request.args['exclude_id']) if request.args.get('exclude_id') else None
+        except ValueError:
+            return jsonify({'success': False, 'error': '无效的参数'}), 400
+        
+        if not query.strip():
+            return jsonify({'success': False, 'error': '英文内容不能为空'}), 400
         
-        conn.close()
+        db_path = db_config.get_current_db()
+        conn = db_config.connect(db_path)
+        cursor = conn.cursor()
+        
+        # 只读取索引（写操作提交前已更新索引）
+        matches = find_similar(cursor, query, limit, min_score, exclude_id)
+        
+        suggestions = []
+        if matches:
+            scores = dict(matches)
+            placeholders = ','.join('?' * len(scores))
+            cursor.execute(f"""
+                SELECT e.id, e.english_text, e.translation_key, t.name, e.created_at, e.updated_at
+                FROM english e {TAG_JOIN}
+                WHERE e.id IN ({placeholders})
+            """, list(scores))
+            rows = sorted(cursor.fetchall(), key=lambda row: (-scores[row[0]], -row[0]))
+            
+            active_languages = get_active_languages(db_path)
+            suggestions = load_translation_page(cursor, get_storage(db_path), rows, active_languages, language)
+            for suggestion in suggestions:
+                suggestion['score'] = scores[suggestion['english_id']]
         
         return jsonify({
             'success': True,
-            'translations': translations
+            'suggestions': suggestions
         })
         
     except Exception as e:
@@ -0,0 +1,191 @@
+"""
+生产环境服务入口（预加载 + 多进程）
+
+用法：
+    python serve.py [--host 0.0.0.0] [--port 5000] [--workers 4] [--timeout 30]
+
+主进程加载应用（数据库结构迁移、日志归档只在这里执行一次）并监听端口，然后 fork 出
+指定数量的工作进程共享该端口。每个工作进程使用多线程处理请求，并拥有独立的数据库连接池。
+
+信号：
+    SIGTERM / SIGINT  平滑停止：不再接受新连接，等待处理中的请求完成后退出
+    SIGHUP            平滑重启工作进程：先启动新的工作进程，再平滑停止旧的工作进程
+                      （应用代码已在主进程中预加载，更新代码需要重启主进程）
+
+工作进程异常退出时主进程会自动重新启动。只依赖标准库与 Werkzeug，仅支持 Linux 等 POSIX 系统。
+
+工作进程之间不共享内存，进程内的状态都以数据库或文件为准，读取时核对：
+    语言激活状态、条目数量、条目片段、导出结果   按数据库的 data_version 缓存（写操作递增）
+    存储布局、搜索索引检查                       按数据库的 schema_version 缓存（表结构变化时递增）
+    当前数据库                                   记录在数据库目录的 .current_db 文件中
+因此任一工作进程的写操作、语言增删或切换数据库对其他工作进程立即生效。
+/api/metrics 的统计只包含处理该请求的工作进程。
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+
+def _listen(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock, args):
+    """工作进程：在共享的监听端口上处理请求，收到 SIGTERM / SIGINT 时平滑退出"""
+
+    class RequestHandler(WSGIRequestHandler):
+        # 读取请求与保持连接的超时时间（秒）
+        timeout = args.timeout
+
+    server = make_server(
+        args.host, args.port, app,
+        threaded=True, request_handler=RequestHandler, fd=sock.fileno()
+    )
+    # 退出时等待处理中的请求完成
+    server.daemon_threads = False
+    server.block_on_close = True
+
+    def stop(signum, frame):
+        # shutdown() 会等待 serve_forever 返回，不能在同一线程中直接调用
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    server.serve_forever()
+    server.server_close()
+
+
+def _spawn_worker(app, sock, args):
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # 子进程：不返回主进程的循环，退出前写入缓冲的操作日志
+    from models.database import db_config, operation_log_writer
+
+    code = 0
+    try:
+        _run_worker(app, sock, args)
+    except Exception as e:
+        print(f'工作进程 {os.getpid()} 异常退出: {e}', file=sys.stderr)
+        code = 1
+    finally:
+        try:
+            operation_log_writer.close()
+            db_config.connections.close_all()
+        finally:
+            os._exit(code)
+
+
+def _stop_workers(pids, graceful_timeout):
+    """平滑停止工作进程，超时后强制结束"""
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    deadline = time.monotonic() + graceful_timeout
+    remaining = set(pids)
+    while remaining and time.monotonic() < deadline:
+        for pid in list(remaining):
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                remaining.discard(pid)
+        time.sleep(0.1)
+
+    for pid in remaining:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+
+
+def serve(args):
+    # 预加载应用：数据库迁移等启动工作只在主进程执行一次
+    from app import app
+    from models.database import db_config, operation_log_writer
+    from models.metrics import metrics
+
+    metrics.slow_query_threshold = args.slow_query_ms or None
+
+    sock = _listen(args.host, args.port)
+
+    # fork 前写入缓冲的日志并关闭连接，避免子进程继承主进程的 SQLite 连接和后台线程
+    operation_log_writer.close()
+    db_config.connections.close_all()
+
+    signals = []
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, lambda signum, frame: signals.append(signum))
+
+    workers = {_spawn_worker(app, sock, args) for _ in range(args.workers)}
+    print(f'服务地址: http://{args.host}:{args.port}（{args.workers} 个工作进程，主进程 {os.getpid()}）')
+
+    while True:
+        while signals:
+            signum = signals.pop(0)
+            if signum == signal.SIGHUP:
+                print('重新启动工作进程...')
+                old_workers = workers
+                workers = {_spawn_worker(app, sock, args) for _ in range(args.workers)}
+                _stop_workers(old_workers, args.graceful_timeout)
+            else:
+                print('正在停止服务...')
+                _stop_workers(workers, args.graceful_timeout)
+                sock.close()
+                return 0
+
+        # 回收退出的工作进程，非主动停止的自动重新启动
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid and pid in workers:
+            workers.discard(pid)
+            print(f'工作进程 {pid} 已退出（状态 {status}），重新启动', file=sys.stderr)
+            workers.add(_spawn_worker(app, sock, args))
+            continue
+
+        time.sleep(0.2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='以多进程方式运行翻译管理系统后端')
+    parser.add_argument('--host', default='0.0.0.0', help='监听地址')
+    parser.add_argument('--port', type=int, default=5000, help='监听端口')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='工作进程数量')
+    parser.add_argument('--timeout', type=float, default=30, help='读取请求与保持连接的超时时间（秒）')
+    parser.add_argument('--slow-query-ms', type=float, default=100,
+                        help='记录慢查询（SQL 与参数形状）的耗时阈值（毫秒），0 表示不记录')
+    parser.add_argument('--graceful-timeout', type=float, default=30,
+                        help='停止或重启时等待处理中请求完成的时间（秒），超时后强制结束工作进程')
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, 'fork'):
+        print('serve.py 需要支持 fork 的系统（Linux 等），Windows 下请使用 run_backend.py', file=sys.stderr)
+        return 1
+
+    return serve(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
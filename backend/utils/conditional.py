@@ -0,0 +1,99 @@
+"""
+只读接口的条件请求与压缩
+
+ETag 由数据库路径、数据库的变更版本（写操作递增的 data_version 等）与请求的路径和参数生成，
+gzip 压缩的响应体使用加了 -gzip 后缀的 ETag，与未压缩的响应体区分。
+请求的 If-None-Match 与当前 ETag 一致时直接返回 304，不执行接口中的查询；
+否则执行接口，为成功的响应设置 ETag，并在客户端支持时对较大的响应体进行 gzip 压缩。
+"""
+
+import gzip
+import hashlib
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from models.database import db_config, get_data_version
+
+# 超过该字节数的响应体才压缩
+GZIP_MIN_SIZE = 1024
+
+GZIP_LEVEL = 6
+
+
+def data_version(db_path):
+    """数据版本号（翻译、标签、语言状态等写操作后递增）"""
+    with db_config.connections.connection(db_path) as conn:
+        return get_data_version(conn.cursor())
+
+
+def _etag(db_path, version):
+    query = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+    raw = f'{db_path}\0{version}\0{request.path}\0{query}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+
+def gzip_etag(etag):
+    """gzip 压缩后的响应体使用的 ETag"""
+    return f'{etag}-gzip'
+
+
+def matching_etag(etag):
+    """If-None-Match 中与 etag 对应且本次请求可以接受的编码的 ETag，没有时返回 None"""
+    candidates = [etag]
+    if 'gzip' in request.accept_encodings:
+        candidates.append(gzip_etag(etag))
+    for candidate in candidates:
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+
+def _revalidate(response, etag):
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    # 客户端每次都需要重新验证（数据未变化时返回 304）
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def compress_response(response):
+    """客户端支持 gzip 时压缩较大的响应体"""
+    if (response.status_code != 200 or response.direct_passthrough or
+            'Content-Encoding' in response.headers or 'gzip' not in request.accept_encodings):
+        return response
+
+    body = response.get_data()
+    if len(body) < GZIP_MIN_SIZE:
+        return response
+
+    response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(gzip_etag(etag), weak)
+    return response
+
+
+def conditional(version=data_version):
+    """为只读接口添加 ETag 协商与 gzip 压缩，version(db_path) 返回数据库当前的变更版本"""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            db_path = db_config.get_current_db()
+            etag = _etag(db_path, version(db_path))
+
+            matched = matching_etag(etag)
+            if matched:
+                return _revalidate(Response(status=304), matched)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            return compress_response(_revalidate(response, etag))
+
+        return wrapper
+
+    return decorator
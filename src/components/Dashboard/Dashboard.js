@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Layout, message, Form } from 'antd';
 import axios from 'axios';
 import { useLanguage } from '../../contexts/LanguageContext';
@@ -9,6 +9,12 @@ import './Dashboard.css';
 
 const { Content } = Layout;
 
+// 通过请求头选择数据库，切换数据库只影响当前页面，不影响其他用户
+const DATABASE_HEADER = 'X-Transflow-Database';
+const selectDatabase = (dbName) => {
+  axios.defaults.headers.common[DATABASE_HEADER] = dbName;
+};
+
 const Dashboard = () => {
   const { locale, changeLanguage } = useLanguage();
   
@@ -27,6 +33,7 @@ const Dashboard = () => {
   const [isDatabaseModalVisible, setIsDatabaseModalVisible] = useState(false);
   const [databaseForm] = Form.useForm();
   const [tags, setTags] = useState([]);
+  const [tagCounts, setTagCounts] = useState({});
   const [logs, setLogs] = useState([]);
   const [currentTag, setCurrentTag] = useState('all');
   const [selectedLanguage, setSelectedLanguage] = useState(null);
@@ -39,6 +46,8 @@ const Dashboard = () => {
   const [pageSize] = useState(10);
   const [totalCount, setTotalCount] = useState(0);
   const [hasMore, setHasMore] = useState(false);
+  // 游标分页：加载更多时使用上一页返回的游标，避免深分页的 OFFSET 扫描
+  const nextCursorRef = useRef(null);
   const [loadingMore, setLoadingMore] = useState(false);
   
   // 语言管理相关状态
@@ -77,7 +86,11 @@ const Dashboard = () => {
       if (selectedLanguage) {
         params.append('language', selectedLanguage);
       }
-      params.append('page', page.toString());
+      if (append && nextCursorRef.current) {
+        params.append('cursor', nextCursorRef.current);
+      } else {
+        params.append('page', page.toString());
+      }
       params.append('limit', pageSize.toString());
       
       const response = await axios.get(`/api/translations?${params.toString()}`);
@@ -90,9 +103,10 @@ const Dashboard = () => {
           setTranslations(newTranslations);
         }
         
-        setCurrentPage(pagination.page);
+        setCurrentPage(page);
         setTotalCount(pagination.total);
         setHasMore(pagination.has_more);
+        nextCursorRef.current = pagination.next_cursor || null;
       }
     } catch (error) {
       message.error(getMessage('getTranslationsFailed', locale));
@@ -104,9 +118,11 @@ const Dashboard = () => {
 
   const fetchTags = useCallback(async () => {
     try {
-      const response = await axios.get('/api/tags');
+      // 一次请求获取所有标签及其条目数量
+      const response = await axios.get('/api/tags?with_counts=1');
       if (response.data.success) {
         setTags(response.data.tags);
+        setTagCounts(response.data.tag_counts || {});
       }
     } catch (error) {
       message.error(getMessage('getTagsFailed', locale));
@@ -135,6 +151,7 @@ const Dashboard = () => {
           const defaultDb = response.data.current_database || response.data.databases[0];
           console.log('Setting default database:', defaultDb);
           if (defaultDb) {
+            selectDatabase(defaultDb);
             setCurrentDatabase(defaultDb);
           }
         }
@@ -476,6 +493,7 @@ const Dashboard = () => {
         setActiveTab('all');
         setSearchQuery('');
         
+        selectDatabase(dbName);
         setCurrentDatabase(dbName);
       }
     } catch (error) {
@@ -561,7 +579,8 @@ const Dashboard = () => {
       'korean': { zh: '韩语', en: 'Korean' }
     };
     
-    const langNames = languageNameMap[langCode];
+    // 优先使用后端语言注册表返回的名称
+    const langNames = languageNames[langCode] || languageNameMap[langCode];
     if (langNames) {
       return langNames[locale] || langNames.zh;
     }
@@ -598,6 +617,7 @@ const Dashboard = () => {
           
           // 标签相关
           tags={tags}
+          tagCounts={tagCounts}
           currentTag={currentTag}
           selectedLanguage={selectedLanguage}
           isTagModalVisible={isTagModalVisible}
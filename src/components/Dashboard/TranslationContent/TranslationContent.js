@@ -45,6 +45,7 @@ const TranslationContent = ({
   
   // 标签相关
   tags,
+  tagCounts,
   currentTag,
   selectedLanguage,
   isTagModalVisible,
@@ -679,6 +680,9 @@ const TranslationContent = ({
                   <span style={{ fontSize: '14px', color: '#24292f' }}>
                     {tag}
                   </span>
+                  <span style={{ fontSize: '12px', color: '#57606a' }}>
+                    {tagCounts?.[tag] ?? 0}
+                  </span>
                   <Popconfirm
                     title={getMessage('confirmDeleteTag', locale)}
                     onConfirm={async () => {